@@ -10,4 +10,7 @@ curl "https://en.wikipedia.org/wiki/Wikipedia:Lists_of_common_misspellings/For_m
   | grep -v '^$' \
   | sed 's/->.*//' \
   | grep -v "^ok$" \
-  >> "${OUTPUT_FILE}"
\ No newline at end of file
+  >> "${OUTPUT_FILE}"
+
+# Rebuild the memory-mapped lexicon file, which is shared by the worker processes
+cd src && python build_lexicon_file.py
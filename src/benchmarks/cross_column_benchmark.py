@@ -0,0 +1,83 @@
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_datasets import get_synthetic_dataset
+from error_types import ErrorType
+from imdb_detector import IMDBDetector
+from label_matrix import LabelMatrix
+from utils.generic_label_utils import is_a_number
+from weather_detector import WeatherDetector
+
+NUMBER_OF_ROWS = 200000
+
+
+def label_weather_with_frame_copies(dataset: pd.DataFrame, labels: LabelMatrix):
+    """
+    The weather transposition rules before the rule engine: every rule checks its columns with apply(is_a_number), builds a
+    filtered copy of the dataset and converts the columns with astype(float) again.
+    """
+    for column_names, condition in [
+        (["MinTemp", "MaxTemp"], lambda rows: rows["MinTemp"].astype(float) > rows["MaxTemp"].astype(float)),
+        (["Rainfall", "Evaporation"], lambda rows: rows["Rainfall"].astype(float) == 15.3712),
+        (["Sunshine", "Evaporation"], lambda rows: (rows["Sunshine"].astype(float) == 15.3712) | (rows["Evaporation"].astype(float) == 14.03)),
+        (["Rainfall", "Evaporation"], lambda rows: rows["Rainfall"].astype(float) == 14.03),
+    ]:
+        numeric_rows = dataset[dataset[column_names[0]].apply(is_a_number) & dataset[column_names[1]].apply(is_a_number)]
+        labels.set_cells(numeric_rows[condition(numeric_rows)].index, column_names, ErrorType.WORD_TRANSPOSITION.value)
+    labels.replace(ErrorType.MISSPELLING.value, ErrorType.NO_ERROR.value)
+
+
+def label_imdb_with_frame_copies(dataset: pd.DataFrame, labels: LabelMatrix):
+    person_note_in_braces = dataset[dataset["person_note"].str.startswith("(") & dataset["person_note"].str.endswith(")")]
+    labels.set_cells(person_note_in_braces.index, ["cast_note", "person_note"], ErrorType.WORD_TRANSPOSITION.value)
+
+    both_numeric = dataset["cast_id"].apply(is_a_number) & dataset["cast_person_id"].apply(is_a_number)
+    labels.set_cells(dataset[both_numeric & (dataset["cast_id"].astype(str).str.len() != 8)].index, ["cast_id", "cast_person_id"], ErrorType.WORD_TRANSPOSITION.value)
+
+    all_numeric = dataset["title_id"].apply(is_a_number) & dataset["person_movie_id"].apply(is_a_number) & dataset["cast_movie_id"].apply(is_a_number)
+    title_id, person_movie_id, cast_movie_id = dataset["title_id"], dataset["person_movie_id"], dataset["cast_movie_id"]
+    labels.set_cells(dataset.index[all_numeric & (title_id != person_movie_id) & (title_id == cast_movie_id)], ["person_movie_id"], ErrorType.OCR.value)
+    labels.set_cells(dataset.index[all_numeric & (title_id != cast_movie_id) & (title_id == person_movie_id)], ["cast_movie_id"], ErrorType.OCR.value)
+    labels.set_cells(dataset.index[all_numeric & (title_id != cast_movie_id) & (cast_movie_id == person_movie_id)], ["title_id"], ErrorType.OCR.value)
+
+
+def main():
+    """
+    Compares the cross-column rules of the detectors (one numeric view per column, boolean masks, one batched write) with the
+    rules on filtered DataFrame copies, on synthetic weather and IMDB datasets, and checks that both give the same labels.
+    The columns are labeled first, so the numeric views can reuse the generic labels of the NumericRule columns.
+    Run from the src folder with `python -m benchmarks.cross_column_benchmark`.
+    """
+    total_mismatches = 0
+    for detector_class, schema_name, label_with_frame_copies in [
+        (WeatherDetector, "weather", label_weather_with_frame_copies),
+        (IMDBDetector, "imdb", label_imdb_with_frame_copies),
+    ]:
+        dataset_path, _ = get_synthetic_dataset(schema_name, NUMBER_OF_ROWS)
+        detector = detector_class(dataset_path, use_cache=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            detector._label_columns() # like in a detection, the cross-column rules run on the labeled columns
+        expected_labels = LabelMatrix(detector.dataset.index, detector.dataset.columns)
+        expected_labels.values[:] = detector.labels.values
+
+        start = time.perf_counter()
+        label_with_frame_copies(detector.dataset, expected_labels)
+        frame_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        detector._label_cross_column_errors()
+        rule_time = time.perf_counter() - start
+
+        mismatches = int(np.count_nonzero(expected_labels.values != detector.labels.values))
+        total_mismatches += mismatches
+        print(f"{schema_name} ({NUMBER_OF_ROWS} rows): frame copies {frame_time:.3f} s, rule engine {rule_time:.3f} s ({frame_time / rule_time:.1f}x), {mismatches} mismatches")
+
+    assert total_mismatches == 0, "the rule engine labels differ from the rules on frame copies"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_datasets import SCHEMAS, get_synthetic_dataset
+from error_types import ErrorType
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "datasets", "benchmark_results")
+WARM_WORD_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "datasets", ".cache", "benchmarks", "word_classifications.sqlite")
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+LARGE_DATASET_ROWS = 1_000_000 # datasets with more rows are streamed, unless a chunk size is given
+LARGE_DATASET_CHUNK_SIZE = 500_000
+EVALUATION_CHUNK_SIZE = 500_000
+DETECTOR_PHASES = {
+    "label_columns": "_label_columns",
+    "cross_column": "_label_cross_column_errors",
+}
+
+
+def get_detector_class(schema_name: str):
+    if schema_name == "weather":
+        from weather_detector import WeatherDetector
+        return WeatherDetector
+    if schema_name == "medical":
+        from medical_detector import MedicalDetector
+        return MedicalDetector
+    from imdb_detector import IMDBDetector
+    return IMDBDetector
+
+
+def run_detector(schema_name: str, dataset_path: str, n_workers: int, chunk_size: int, word_cache: str, use_dataset_cache: bool, verbose: bool, profile: bool = False) -> dict:
+    """
+    Runs a detector on a dataset and returns the seconds spent in each phase and the peak memory.
+    Runs in a fresh process, so that every run loads the vocabularies and pays the imports like a real run, and the peak
+    memory is the one of this run only. The phases are timed by wrapping the detector methods in the class, the worker
+    processes get the unwrapped class. With profile, the report of a Profiler is added to the results.
+    """
+    phase_times = {"load_modules": 0.0, "import_dataset": 0.0, "label_columns": 0.0, "cross_column": 0.0, "export": 0.0}
+    total_start = start = time.perf_counter()
+    detector_class = get_detector_class(schema_name)
+    from io_handler import IOHandler
+    from profiler import Profiler
+    from utils import specific_label_utils
+    from word_cache import WordClassificationCache
+    phase_times["load_modules"] += time.perf_counter() - start
+
+    if word_cache == "off":
+        specific_label_utils.word_classification_cache = None
+    elif word_cache == "cold":
+        specific_label_utils.word_classification_cache = WordClassificationCache(os.path.join(tempfile.mkdtemp(), "word_classifications.sqlite"))
+    else:
+        specific_label_utils.word_classification_cache = WordClassificationCache(WARM_WORD_CACHE_PATH)
+
+    def timed(function, phase):
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                phase_times[phase] += time.perf_counter() - start
+        return timed_function
+
+    for phase, method_name in DETECTOR_PHASES.items():
+        setattr(detector_class, method_name, timed(getattr(detector_class, method_name), phase))
+    for method_name in ("export_labels", "export_label_chunk"):
+        setattr(IOHandler, method_name, timed(getattr(IOHandler, method_name), "export"))
+
+    output = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        profiler = Profiler() if profile else None
+        detector = detector_class(dataset_path, n_workers=n_workers, chunk_size=chunk_size, use_cache=use_dataset_cache, profiler=profiler)
+        phase_times["import_dataset"] += time.perf_counter() - start
+        detector.detect()
+        detector.export()
+    total_time = time.perf_counter() - total_start
+
+    phase_times["other"] = max(total_time - sum(phase_times.values()), 0.0) # e.g. the chunks read in the streaming mode
+    results = {
+        "phase_seconds": phase_times,
+        "total_seconds": total_time,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_worker_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+    if profiler is not None:
+        results["profile"] = profiler.get_report()
+    return results
+
+
+def evaluate_labels(labels_path: str, true_labels_path: str) -> dict:
+    """
+    Compares the exported labels with the true labels, chunk by chunk. For each error type (and for any error, ignoring the
+    type) a cell counts as true positive if both have the label, as false positive if only the detector has it and as false
+    negative if only the true labels have it.
+    """
+    true_labels = np.load(true_labels_path, mmap_mode="r")
+    error_types = [error_type for error_type in ErrorType if error_type != ErrorType.NO_ERROR]
+    counts = {name: {"true_positives": 0, "false_positives": 0, "false_negatives": 0} for name in [error_type.name for error_type in error_types] + ["ANY_ERROR"]}
+    start = 0
+    for chunk in pd.read_csv(labels_path, chunksize=EVALUATION_CHUNK_SIZE, dtype=np.uint8):
+        predicted = chunk.to_numpy()
+        expected = true_labels[start:start + len(chunk)]
+        start += len(chunk)
+        for name, predicted_cells, expected_cells in [(error_type.name, predicted == error_type.value, expected == error_type.value) for error_type in error_types] + [("ANY_ERROR", predicted != 0, expected != 0)]:
+            counts[name]["true_positives"] += int(np.count_nonzero(predicted_cells & expected_cells))
+            counts[name]["false_positives"] += int(np.count_nonzero(predicted_cells & ~expected_cells))
+            counts[name]["false_negatives"] += int(np.count_nonzero(~predicted_cells & expected_cells))
+    if start != len(true_labels):
+        raise ValueError(f"{labels_path} has {start} rows, expected {len(true_labels)}.")
+
+    for name, count in counts.items():
+        predicted_positives = count["true_positives"] + count["false_positives"]
+        positives = count["true_positives"] + count["false_negatives"]
+        count["precision"] = count["true_positives"] / predicted_positives if predicted_positives else None
+        count["recall"] = count["true_positives"] / positives if positives else None
+    return counts
+
+
+def get_git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_size(size: str) -> int:
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def print_run(run: dict):
+    phases = ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in run["phase_seconds"].items())
+    print(f"{run['schema']} {run['rows']} rows: {run['total_seconds']:.2f} s ({run['rows_per_second']:.0f} rows/s), peak RSS {run['peak_rss_mb']:.0f} MB (workers {run['peak_worker_rss_mb']:.0f} MB)")
+    print(f"  {phases}")
+    for name, count in run["accuracy"].items():
+        precision = "-" if count["precision"] is None else f"{count['precision']:.3f}"
+        recall = "-" if count["recall"] is None else f"{count['recall']:.3f}"
+        print(f"  {name}: \tprecision {precision}, recall {recall}")
+
+
+def main():
+    """
+    Runs the detectors on synthetic datasets with injected errors and known labels, and reports the time of each phase, the
+    rows per second, the peak memory and the precision and recall per error type. The results are written to a JSON file,
+    so that runs of different commits can be compared. Run from the src folder with `python -m benchmarks.detector_benchmark`,
+    e.g. with `--sizes 10k 1M --n-workers 4`.
+    The datasets are generated once and kept in datasets/.cache/benchmarks. The dataset cache and the word classification
+    cache are not used by default, so every run measures the cold path.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the detectors on synthetic datasets.")
+    parser.add_argument("--schemas", nargs="+", choices=sorted(SCHEMAS), default=["weather", "medical", "imdb"])
+    parser.add_argument("--sizes", nargs="+", default=["10k"], help="number of rows, e.g. 10k, 100k, 1M, 10M or 25000")
+    parser.add_argument("--n-workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=None, help=f"stream the datasets in chunks (default: only above {LARGE_DATASET_ROWS} rows)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--word-cache", choices=["off", "cold", "warm"], default="cold", help="cold: an empty cache per run, warm: a cache kept between runs")
+    parser.add_argument("--dataset-cache", action="store_true", help="load the parsed datasets from the dataset cache")
+    parser.add_argument("--output", default=None, help="the JSON file of the results (default: datasets/benchmark_results/<time>.json)")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the detectors")
+    parser.add_argument("--profile", action="store_true", help="add the time and memory of each phase, column and rule to the results")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    runs = []
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        number_of_rows = parse_size(size)
+        chunk_size = args.chunk_size
+        if chunk_size is None and number_of_rows > LARGE_DATASET_ROWS:
+            chunk_size = LARGE_DATASET_CHUNK_SIZE
+        for schema_name in args.schemas:
+            start = time.perf_counter()
+            dataset_path, true_labels_path = get_synthetic_dataset(schema_name, number_of_rows, args.seed)
+            generation_time = time.perf_counter() - start
+
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                run = executor.submit(
+                    run_detector, schema_name, dataset_path, args.n_workers, chunk_size, args.word_cache, args.dataset_cache, args.verbose, args.profile,
+                ).result()
+            labels_path = dataset_path.replace("w_errors", "error_mappings")
+            run = {
+                "schema": schema_name,
+                "rows": number_of_rows,
+                "n_workers": args.n_workers,
+                "chunk_size": chunk_size,
+                "rows_per_second": number_of_rows / run["total_seconds"],
+                "generation_seconds": generation_time,
+                **run,
+                "accuracy": evaluate_labels(labels_path, true_labels_path),
+            }
+            runs.append(run)
+            print_run(run)
+
+    results = {
+        "started_at": started_at.isoformat(),
+        "git_commit": get_git_commit(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+        "runs": runs,
+    }
+    output_path = args.output or os.path.join(RESULTS_FOLDER, f"{started_at.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_datasets import get_synthetic_dataset
+from constants import KEYBOARD_NEIGHBORS, OCR_DICT
+from domains import BoundedIntegerDomain, get_bounded_integer_domain
+from lexicon import get_categorical_lexicon
+from medical_detector import NO_STEADY_UP_DOWN_VALUES
+from utils import specific_label_utils
+from utils.specific_label_utils import classify_flawed_words, get_categorical_domain, is_key_error, label_categorical_words, label_year
+
+NUMBER_OF_YEAR_TOKENS = 20000
+NUMBER_OF_MEDICAL_ROWS = 500000
+DRUG_COLUMNS = ["metformin", "repaglinide", "nateglinide", "glipizide", "glyburide", "pioglitazone", "rosiglitazone", "insulin"]
+
+
+def label_year_with_year_list(token: str, min_value: int = 1880, max_value: int = 2025) -> int:
+    """
+    label_year before the year table: builds the list of years and checks the key errors against it for every token.
+    """
+    token = token.lower()
+    if len(token) != 4:
+        return 2
+    string_years = [str(i) for i in range(min_value, max_value)]
+    return 2 if is_key_error(token, string_years) else 3
+
+
+def generate_year_tokens(number_of_tokens: int) -> list[str]:
+    """
+    Flawed tokens like the ones of series_years: years with a key error, an OCR confusion or a random digit, and a few tokens
+    with a wrong length.
+    """
+    rnd = random.Random(0)
+    tokens = []
+    for _ in range(number_of_tokens):
+        year = str(rnd.randint(1880, 2024))
+        position = rnd.randrange(4)
+        error = rnd.randrange(4)
+        if error == 0:
+            year = year[:position] + rnd.choice(KEYBOARD_NEIGHBORS[year[position]]) + year[position + 1:]
+        elif error == 1 and year[position] in OCR_DICT:
+            year = year[:position] + rnd.choice(OCR_DICT[year[position]]) + year[position + 1:]
+        elif error == 2:
+            year = year[:position] + rnd.choice("0123456789") + year[position + 1:]
+        else:
+            year = year[:position] + year[position + 1:] if rnd.random() < 0.5 else year + rnd.choice("0123456789")
+        tokens.append(year)
+    return tokens
+
+
+def get_flawed_drug_values() -> np.ndarray:
+    """
+    The unique values of the drug columns of a synthetic medical dataset which aren't No, Steady, Up or Down.
+    """
+    dataset_path, _ = get_synthetic_dataset("medical", NUMBER_OF_MEDICAL_ROWS)
+    values = pd.unique(pd.read_csv(dataset_path, dtype=str, usecols=DRUG_COLUMNS).to_numpy(dtype=object).ravel())
+    return np.array([value for value in values if isinstance(value, str) and value.strip() not in NO_STEADY_UP_DOWN_VALUES], dtype=object)
+
+
+def benchmark_categorical_domain() -> int:
+    """
+    Labels the flawed values of the drug columns with the classifier of the flawed words and with the variant table of the
+    CategoricalDomain, both without the word caches of earlier runs. Returns the number of mismatches.
+    """
+    words = get_flawed_drug_values()
+    categorical_values = tuple(NO_STEADY_UP_DOWN_VALUES)
+    specific_label_utils.word_classification_cache = None
+    specific_label_utils._flawed_word_labels.clear()
+    start = time.perf_counter()
+    word_labels = classify_flawed_words(words, get_categorical_lexicon(categorical_values))
+    expected_labels = np.array([word_labels[word] for word in words])
+    classify_time = time.perf_counter() - start
+
+    specific_label_utils._flawed_word_labels.clear()
+    get_categorical_domain.cache_clear()
+    start = time.perf_counter()
+    get_categorical_domain(categorical_values).lookup(words[:1])
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    labels = label_categorical_words(words, categorical_values)
+    table_time = time.perf_counter() - start
+    covered = np.count_nonzero(get_categorical_domain(categorical_values).lookup(words))
+
+    mismatches = int(np.count_nonzero(labels != expected_labels))
+    print(
+        f"Drug columns ({len(words)} flawed values, {covered} in the variant table): classified {classify_time:.3f} s, "
+        f"variant table {table_time:.3f} s + {build_time:.3f} s to build the table once, {mismatches} mismatches"
+    )
+    return mismatches
+
+
+def main():
+    """
+    Compares label_year with the list of years per token and label_year with the precomputed table of the
+    BoundedIntegerDomain on flawed year tokens (and the candidate check of domains too large for a table), and the classification of the flawed values of the drug columns with the
+    table of their CategoricalDomain. Checks that both ways give the same labels.
+    Run from the src folder with `python -m benchmarks.domain_benchmark`.
+    """
+    tokens = generate_year_tokens(NUMBER_OF_YEAR_TOKENS)
+    start = time.perf_counter()
+    expected_labels = np.array([label_year_with_year_list(token) for token in tokens])
+    list_time = time.perf_counter() - start
+
+    get_bounded_integer_domain.cache_clear()
+    start = time.perf_counter()
+    get_bounded_integer_domain(1880, 2024)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    labels = np.array([label_year(token) for token in tokens])
+    table_time = time.perf_counter() - start
+
+    years_without_table = BoundedIntegerDomain(1880, 2024)
+    years_without_table.key_error_variants = None # like a domain with more than MAX_DOMAIN_SIZE values
+    candidate_labels = np.array([2 if len(token) != 4 or years_without_table.is_key_error(token) else 3 for token in tokens])
+
+    mismatches = int(np.count_nonzero(labels != expected_labels)) + int(np.count_nonzero(candidate_labels != expected_labels))
+    print(
+        f"label_year ({len(tokens)} tokens): year list {list_time:.3f} s, year table {table_time:.3f} s ({list_time / table_time:.0f}x) "
+        f"+ {build_time * 1000:.1f} ms to build the table once, {mismatches} mismatches"
+    )
+    assert mismatches == 0, "the labels of the year table differ from the year list"
+    assert benchmark_categorical_domain() == 0, "the labels of the variant table differ from the classified words"
+
+
+if __name__ == "__main__":
+    main()
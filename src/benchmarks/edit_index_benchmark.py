@@ -0,0 +1,79 @@
+import random
+import time
+
+from constants import KEYBOARD_NEIGHBORS, OCR_DICT
+from lexicon import get_misspellings, get_spell_vocabulary
+from utils.specific_label_utils import _classify_new_flawed_words, classify_flawed_word, get_edit_index
+
+NUMBER_OF_WORDS = 5000
+
+
+def generate_flawed_words(number_of_words: int) -> list[str]:
+    """
+    Generates tokens like the flawed tokens of the IMDB title and name columns: dictionary words and capitalized names
+    with one typo, an OCR substitution or a misspelling, plus some random garbage.
+    """
+    random.seed(0)
+    dictionary_words = sorted(word for word in get_spell_vocabulary().words if word.isascii() and len(word) > 2)
+    misspellings = sorted(word for word in get_misspellings() if word.isascii() and " " not in word)
+
+    words = []
+    for _ in range(number_of_words):
+        word = random.choice(dictionary_words)
+        if random.random() < 0.4:
+            word = word.capitalize()
+        i = random.randrange(len(word) - 1)
+        error = random.randrange(7)
+        if error == 0:
+            word = word[:i] + word[i+1] + word[i] + word[i+2:]
+        elif error == 1 and word[i].lower() in KEYBOARD_NEIGHBORS:
+            word = word[:i] + random.choice(KEYBOARD_NEIGHBORS[word[i].lower()]) + word[i+1:]
+        elif error == 2:
+            word = word[:i] + word[i] + word[i:]
+        elif error == 3:
+            word = word[:i] + word[i+1:]
+        elif error == 4:
+            ocr_chars = [char for char in word if char in OCR_DICT]
+            if ocr_chars:
+                char = random.choice(ocr_chars)
+                word = word.replace(char, random.choice(OCR_DICT[char]), 1)
+        elif error == 5:
+            word = random.choice(misspellings)
+        else:
+            word = "".join(random.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=len(word)))
+        words.append(word)
+    return list(dict.fromkeys(word for word in words if word))
+
+
+def main():
+    """
+    Compares the classification of flawed words with and without the edit index and checks that both give the same labels.
+    The edit index is timed without the caches of classify_flawed_words (the classified words and the persistent word cache).
+    Run from the src folder with `python -m benchmarks.edit_index_benchmark`.
+    """
+    words = generate_flawed_words(NUMBER_OF_WORDS)
+    spell = get_spell_vocabulary()
+
+    start = time.perf_counter()
+    expected_labels = {word: classify_flawed_word(word, spell) for word in words}
+    candidate_generation_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_edit_index(spell).find_candidates(["warmup"])
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = _classify_new_flawed_words(words, spell)
+    index_time = time.perf_counter() - start
+
+    mismatches = [word for word in words if labels[word] != expected_labels[word]]
+    print(f"Classified {len(words)} unique flawed words, {len(mismatches)} mismatches.")
+    print(f"Candidate generation: \t{candidate_generation_time / len(words) * 1e6:.1f} µs per word")
+    print(f"Edit index: \t\t{index_time / len(words) * 1e6:.1f} µs per word (one-time build: {build_time:.2f}s)")
+    print(f"Speedup: \t\t{candidate_generation_time / index_time:.1f}x")
+    if mismatches:
+        raise AssertionError(f"Labels differ for: {mismatches[:10]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import time
+
+NUMBER_OF_SHOWN_MODULES = 15
+SRC_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import_times(module_name: str) -> list[tuple[str, int, int]]:
+    """
+    Imports the module in a fresh interpreter with `python -X importtime`. Returns (module, self µs, cumulative µs) per imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"], cwd=SRC_FOLDER, capture_output=True, text=True, check=True,
+    )
+    import_times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative_time, name = line[len("import time:"):].split("|")
+        import_times.append((name.strip(), int(self_time), int(cumulative_time)))
+    return import_times
+
+
+def main():
+    """
+    Reports the import time of main.py like `python -X importtime`, the modules with the highest own import time, and the time
+    the lazily loaded resources take on their first use. Run from the src folder with `python -m benchmarks.import_time_benchmark`.
+    """
+    import_times = measure_import_times("main")
+    total_time = next(cumulative_time for name, _, cumulative_time in import_times if name == "main")
+
+    print(f"Import of main: {total_time / 1e6:.3f} s")
+    print(f"{'module':<50} {'self [ms]':>10} {'cumulative [ms]':>16}")
+    for name, self_time, cumulative_time in sorted(import_times, key=lambda import_time: -import_time[1])[:NUMBER_OF_SHOWN_MODULES]:
+        print(f"{name:<50} {self_time / 1e3:>10.1f} {cumulative_time / 1e3:>16.1f}")
+
+    start = time.perf_counter()
+    import main
+    from resources import resources
+    import_time = time.perf_counter() - start
+    loaded_at_import = [name for name in resources.names if resources.is_loaded(name)]
+    assert not loaded_at_import, f"resources loaded at import time: {loaded_at_import}"
+
+    resources.preload()
+    print(f"\nImport in this process: {import_time:.3f} s, no resource loaded at import time.")
+    for name, load_time in resources.load_times.items():
+        print(f"First use of {name}: \t{load_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import random
+import timeit
+
+from constants import get_misspellings_list
+from lexicon import get_misspellings
+
+NUMBER_OF_LOOKUPS = 2000
+
+
+def main():
+    """
+    Compares the per-lookup cost of the misspellings list, which was scanned linearly for every flawed word,
+    with the hashed lexicon. Run from the src folder with `python -m benchmarks.lexicon_benchmark`.
+    """
+    misspellings_list = get_misspellings_list()
+    misspellings = get_misspellings()
+    random.seed(0)
+    hits = random.sample(misspellings_list, NUMBER_OF_LOOKUPS // 2)
+    misses = [word + "qx" for word in random.sample(misspellings_list, NUMBER_OF_LOOKUPS // 2)]
+    words = hits + misses
+
+    list_time = timeit.timeit(lambda: [word in misspellings_list for word in words], number=1)
+    lexicon_time = timeit.timeit(lambda: [word in misspellings for word in words], number=100) / 100
+
+    print(f"Misspellings: {len(misspellings_list)} entries, {len(misspellings)} unique.")
+    print(f"List lookup: \t{list_time / len(words) * 1e6:.3f} µs per word")
+    print(f"Lexicon lookup: \t{lexicon_time / len(words) * 1e6:.3f} µs per word")
+    print(f"Speedup: \t\t{list_time / lexicon_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_datasets import get_synthetic_dataset
+from column_schema import NumericView
+from utils.specific_label_utils import label_number_with_ocr_or_typo, label_numbers_with_ocr_or_typo
+
+NUMBER_OF_ROWS = 500000
+NUMBER_COLUMNS = [ # the number columns labeled with label_number_with_ocr_or_typo and their value ranges in the detectors
+    ("weather", ["MinTemp", "MaxTemp", "Rainfall", "Evaporation", "Sunshine", "WindGustSpeed", "WindSpeed9am", "WindSpeed3pm"], None, None),
+    ("medical", ["age", "weight"], None, None),
+    ("medical", ["time_in_hospital"], 0, 30),
+]
+
+
+def get_flawed_numbers(schema_name: str, column_names: list[str]) -> np.ndarray:
+    """
+    The unique values of the number columns of a synthetic dataset which are no numbers, like the flawed words of a NumericRule.
+    """
+    dataset_path, _ = get_synthetic_dataset(schema_name, NUMBER_OF_ROWS)
+    dataset = pd.read_csv(dataset_path, dtype=str, usecols=column_names)
+    flawed_numbers = [dataset[column_name][~NumericView(dataset[column_name]).is_number & dataset[column_name].notna()] for column_name in dataset.columns]
+    return pd.unique(pd.concat(flawed_numbers).to_numpy(dtype=object))
+
+
+def main():
+    """
+    Compares label_number_with_ocr_or_typo per word with the vectorized label_numbers_with_ocr_or_typo on the flawed numbers
+    of synthetic weather and medical datasets, with the value ranges of the detectors, and checks that both give the same labels.
+    Run from the src folder with `python -m benchmarks.number_label_benchmark`.
+    """
+    total_mismatches = 0
+    for schema_name, column_names, min_value, max_value in NUMBER_COLUMNS:
+        flawed_numbers = get_flawed_numbers(schema_name, column_names)
+        start = time.perf_counter()
+        expected_labels = np.array([label_number_with_ocr_or_typo(word, min_value, max_value) for word in flawed_numbers], dtype=np.uint8)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        labels = label_numbers_with_ocr_or_typo(flawed_numbers, min_value, max_value)
+        vectorized_time = time.perf_counter() - start
+
+        mismatches = int(np.count_nonzero(labels != expected_labels))
+        total_mismatches += mismatches
+        print(
+            f"{schema_name} {', '.join(column_names)} ({len(flawed_numbers)} flawed numbers): per word {loop_time:.3f} s, "
+            f"vectorized {vectorized_time:.3f} s ({loop_time / vectorized_time:.1f}x), {mismatches} mismatches"
+        )
+
+    assert total_mismatches == 0, "the vectorized labels differ from label_number_with_ocr_or_typo"
+
+
+if __name__ == "__main__":
+    main()
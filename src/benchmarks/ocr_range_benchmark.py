@@ -0,0 +1,156 @@
+import itertools
+import random
+import time
+
+import numpy as np
+
+from constants import OCR_NUMBER_TO_NUMBER_MAPPING
+from ocr_range_search import DIGIT_CHOICES, MAX_SEARCHED_CHARACTERS, SEARCHABLE_NUMBER, find_ocr_correction_in_range
+
+NUMBER_OF_SHORT_WORDS = 20000
+MAX_BRUTE_FORCE_LENGTH = 7
+NUMBER_OF_LONG_WORDS = 2000
+OCR_DIGITS = "0135789" # the digits with confusions in OCR_NUMBER_TO_NUMBER_MAPPING
+SMALL_RANGES = [(0, 0), (0, 30), (1880, 2024), (-10, 10)] # value ranges of the detectors, far below long IDs
+MAX_SECONDS_PER_WORD = 0.05 # no word may take longer than this, so a single long value can't stall the labeling of a column
+BASELINE_CASES = [ # words which are in range as they are and have no single replacement in range, TYPOs before the search
+    ("6", 0, 30), ("2", 0, 30), ("16", 0, 30), ("30", 0, 30), ("-0", 0, 30), ("1944", 1880, 2025),
+]
+
+
+def has_reading_in_range(word: str, min_value: float, max_value: float) -> bool:
+    """
+    The search without pruning: tries every combination of the OCR confusions with at least one replacement.
+    """
+    sign, integer_part, fraction_part = SEARCHABLE_NUMBER.fullmatch(word).groups()
+    characters = integer_part + (fraction_part or "")
+    for digits in itertools.product(*(DIGIT_CHOICES[char] for char in characters)):
+        if list(digits) == list(characters):
+            continue
+        reading = sign + "".join(digits[:len(integer_part)]) + ("." + "".join(digits[len(integer_part):]) if fraction_part is not None else "")
+        if min_value <= float(reading) <= max_value:
+            return True
+    return False
+
+
+def has_single_replacement_in_range(word: str, min_value: float, max_value: float) -> bool:
+    """
+    is_replaced_ocr_in_range before the search: replaces all occurrences of one digit with one of its confusions at a time.
+    The search has to find every word this finds.
+    """
+    for char in word:
+        for replacement_num in OCR_NUMBER_TO_NUMBER_MAPPING.get(char, []):
+            if min_value <= float(word.replace(char, replacement_num)) <= max_value:
+                return True
+    return False
+
+
+def generate_short_words(number_of_words: int) -> list[tuple[str, float, float]]:
+    """
+    Short numbers with many OCR digits and ranges around a random value, so that many words have a reading just in or out of range.
+    """
+    rnd = random.Random(0)
+    words = []
+    for _ in range(number_of_words):
+        length = rnd.randint(1, MAX_BRUTE_FORCE_LENGTH)
+        word = "".join(rnd.choice(OCR_DIGITS + "246") for _ in range(length))
+        if length > 1 and rnd.random() < 0.3:
+            point = rnd.randrange(1, length)
+            word = word[:point] + "." + word[point:]
+        if rnd.random() < 0.2:
+            word = "-" + word
+        center = rnd.choice([-1, 1]) * rnd.random() * 10 ** rnd.randint(0, length)
+        width = rnd.random() * 10 ** rnd.randint(-2, length)
+        words.append((word, center - width, center + width))
+    return words
+
+
+def generate_long_words(number_of_words: int) -> list[tuple[str, float, float]]:
+    """
+    IDs like encounter_id (9 digits) up to 20 digits, only of OCR digits, with narrow ranges, so that the pruning can't stop early.
+    """
+    rnd = random.Random(1)
+    words = []
+    for _ in range(number_of_words):
+        length = rnd.choice([9, 12, 16, 20])
+        word = "".join(rnd.choice(OCR_DIGITS) for _ in range(length))
+        target = float("".join(rnd.choice(DIGIT_CHOICES[char]) for char in word)) # a reading in range or just next to it
+        width = rnd.choice([0, 1, 1000])
+        offset = rnd.choice([0, 0, width + 1])
+        words.append((word, target + offset - width, target + offset + width))
+    return words
+
+
+def generate_long_words_in_small_ranges(number_of_words: int) -> list[tuple[str, float, float]]:
+    """
+    IDs of up to MAX_SEARCHED_CHARACTERS OCR digits in small ranges like the ones of the detectors, so that almost all readings
+    are far out of range and the intervals of the prefixes are much wider than the range.
+    """
+    rnd = random.Random(2)
+    words = [("8" * MAX_SEARCHED_CHARACTERS, 0, 0), ("8" * MAX_SEARCHED_CHARACTERS, 0, 30), ("8" * 22, 0, 30), ("9" * MAX_SEARCHED_CHARACTERS, 1880, 2024)]
+    for _ in range(number_of_words - len(words)):
+        length = rnd.randint(9, MAX_SEARCHED_CHARACTERS)
+        words.append(("".join(rnd.choice(OCR_DIGITS) for _ in range(length)), *rnd.choice(SMALL_RANGES)))
+    return words
+
+
+def measure_latencies(words: list[tuple[str, float, float]]) -> np.ndarray:
+    """
+    Returns the seconds of the search per word, without the memoized results.
+    """
+    find_ocr_correction_in_range.cache_clear()
+    latencies = []
+    for word in words:
+        start = time.perf_counter()
+        find_ocr_correction_in_range(*word)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies)
+
+
+def main():
+    """
+    Checks the OCR range search against the enumeration of all readings on short numbers and against the single replacements
+    of the check before the search, and measures the latency per word of the search on long IDs (cold, i.e. without the memoized
+    results) and of memoized lookups. Long IDs in the small ranges of the detectors have to stay below MAX_SECONDS_PER_WORD.
+    Run from the src folder with `python -m benchmarks.ocr_range_benchmark`.
+    """
+    short_words = generate_short_words(NUMBER_OF_SHORT_WORDS)
+    start = time.perf_counter()
+    expected = [has_reading_in_range(*word) for word in short_words]
+    brute_force_time = time.perf_counter() - start
+    find_ocr_correction_in_range.cache_clear()
+    start = time.perf_counter()
+    found = [find_ocr_correction_in_range(*word) is not None for word in short_words]
+    search_time = time.perf_counter() - start
+    mismatches = sum(expected_in_range != found_in_range for expected_in_range, found_in_range in zip(expected, found))
+    missed_single_replacements = sum(has_single_replacement_in_range(*word) and not found_in_range for word, found_in_range in zip(short_words, found))
+    baseline_mismatches = sum(has_single_replacement_in_range(*word) != (find_ocr_correction_in_range(*word) is not None) for word in BASELINE_CASES)
+    print(f"Single replacements in range the search missed: {missed_single_replacements}, mismatches with the single replacements on {BASELINE_CASES}: {baseline_mismatches}")
+    print(f"Short numbers ({len(short_words)}, up to {MAX_BRUTE_FORCE_LENGTH} digits, {sum(expected)} in range): all readings {brute_force_time:.3f} s, search {search_time:.3f} s, {mismatches} mismatches")
+
+    long_words = generate_long_words(NUMBER_OF_LONG_WORDS)
+    latencies = measure_latencies(long_words)
+    start = time.perf_counter()
+    for word in long_words:
+        find_ocr_correction_in_range(*word)
+    memoized_latency = (time.perf_counter() - start) / len(long_words)
+    readings = np.mean([np.prod([float(len(DIGIT_CHOICES[char])) for char in word]) for word, _, _ in long_words])
+    print(
+        f"Long IDs ({len(long_words)}, 9 to 20 digits, on average {readings:.1e} readings): search per word mean {latencies.mean() * 1e6:.0f} us, "
+        f"p99 {np.percentile(latencies, 99) * 1e6:.0f} us, max {latencies.max() * 1e6:.0f} us, memoized {memoized_latency * 1e6:.1f} us"
+    )
+
+    small_range_words = generate_long_words_in_small_ranges(NUMBER_OF_LONG_WORDS)
+    small_range_latencies = measure_latencies(small_range_words)
+    print(
+        f"Long IDs in small ranges ({len(small_range_words)}, 9 to {MAX_SEARCHED_CHARACTERS} digits): search per word mean "
+        f"{small_range_latencies.mean() * 1e6:.0f} us, p99 {np.percentile(small_range_latencies, 99) * 1e6:.0f} us, max {small_range_latencies.max() * 1e6:.0f} us"
+    )
+
+    assert mismatches == 0, "the OCR range search differs from the enumeration of all readings"
+    assert missed_single_replacements == 0 and baseline_mismatches == 0, "the OCR range search differs from the single replacements"
+    assert max(latencies.max(), small_range_latencies.max()) <= MAX_SECONDS_PER_WORD, f"a word took longer than {MAX_SECONDS_PER_WORD} s"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import contextlib
+import io
+import random
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import imdb_detector
+from benchmarks.detector_benchmark import get_detector_class
+from benchmarks.synthetic_datasets import SCHEMAS, get_synthetic_dataset
+from utils import specific_label_utils
+from utils.specific_label_utils import label_flawed_words, label_number_with_ocr_or_typo
+
+NUMBER_OF_ROWS = 200000
+DETECTOR_ROWS = 5000 # the per-row labeling classifies every flawed cell on its own
+FLAWED_SHARE = 0.25
+NUMBER_OF_FLAWED_WORDS = 5000
+
+
+def generate_generic_labels(number_of_rows: int) -> pd.Series:
+    """
+    Generates a generic labeled number column: 0 for correct cells, the offending value for flawed cells.
+    """
+    random.seed(0)
+    flawed_words = [
+        random.choice("123456789") + "".join(random.choices("0123456789.,-lOoSsBZ ", k=random.randint(1, 5)))
+        for _ in range(NUMBER_OF_FLAWED_WORDS)
+    ]
+    labels = np.zeros(number_of_rows, dtype=object)
+    flawed_rows = np.flatnonzero(np.random.default_rng(0).random(number_of_rows) < FLAWED_SHARE)
+    labels[flawed_rows] = [random.choice(flawed_words) for _ in flawed_rows]
+    return pd.Series(labels)
+
+
+def label_with_loc_loop(data_column: pd.Series, generic_labeled_cell_indices: pd.Index, generic_labeled_dataset: pd.Series) -> pd.Series:
+    """
+    The remapping of the specific label functions before label_flawed_words: one .loc assignment per flawed cell.
+    """
+    label_column = pd.Series(0, index=data_column.index, dtype=int)
+    flawed_words_series = generic_labeled_dataset.loc[generic_labeled_cell_indices]
+    typo_word_map = {word: label_number_with_ocr_or_typo(word) for word in flawed_words_series.unique()}
+
+    for index, word in flawed_words_series.items():
+        if typo_word_map.get(word, False):
+            label_column.loc[index] = typo_word_map[word]
+    return label_column
+
+
+def label_flawed_words_per_row(data_column: pd.Series, generic_labeled_cell_indices: pd.Index, generic_labeled_dataset: pd.Series, classify_words: callable) -> pd.Series:
+    """
+    label_flawed_words without the deduplication: every flawed cell is classified on its own and its label is written with
+    one .loc assignment.
+    """
+    label_column = pd.Series(0, index=data_column.index, dtype=int)
+    for index, word in generic_labeled_dataset.loc[generic_labeled_cell_indices].items():
+        word_labels = classify_words(np.array([word], dtype=object))
+        label = word_labels[0] if isinstance(word_labels, np.ndarray) else word_labels.get(word, 0)
+        label_column.loc[index] = int(label or 0)
+    return label_column
+
+
+def run_detection(schema_name: str, dataset_path: str) -> pd.DataFrame:
+    """
+    Runs the detector of the schema in the main process and returns its labels. The classified words of earlier runs are
+    forgotten, so each run classifies all flawed words again.
+    """
+    specific_label_utils._flawed_word_labels.clear()
+    with contextlib.redirect_stdout(io.StringIO()), mock.patch.object(specific_label_utils, "word_classification_cache", None):
+        detector = get_detector_class(schema_name)(dataset_path, n_workers=1)
+        detector.detect()
+    return detector.labels.to_frame()
+
+
+def compare_detector_labels() -> int:
+    """
+    Runs the detectors of all synthetic schemas with label_flawed_words and with the per-row labeling, which is patched into
+    all specific label functions, and checks that both give the same label frame. Returns the number of mismatched cells.
+    """
+    mismatches = 0
+    for schema_name in SCHEMAS:
+        dataset_path, _ = get_synthetic_dataset(schema_name, DETECTOR_ROWS)
+        labels = run_detection(schema_name, dataset_path)
+        with mock.patch.object(specific_label_utils, "label_flawed_words", label_flawed_words_per_row), \
+                mock.patch.object(imdb_detector, "label_flawed_words", label_flawed_words_per_row):
+            expected_labels = run_detection(schema_name, dataset_path)
+        schema_mismatches = int((labels.to_numpy() != expected_labels.to_numpy()).sum())
+        print(f"{schema_name} ({DETECTOR_ROWS} rows): per-row and deduplicated labels, mismatches: {schema_mismatches}")
+        pd.testing.assert_frame_equal(labels, expected_labels, check_dtype=False, obj=f"{schema_name} labels")
+        mismatches += schema_mismatches
+    return mismatches
+
+
+def main():
+    """
+    Compares the per-cell .loc remapping with the vectorized remapping of label_flawed_words and checks that both give the
+    same labels. Then checks that the detectors of the synthetic schemas give the same labels with the per-row labeling as
+    with the deduplication of label_flawed_words. Run from the src folder with `python -m benchmarks.remap_benchmark`.
+    """
+    generic_labels = generate_generic_labels(NUMBER_OF_ROWS)
+    data_column = generic_labels.astype(str)
+    generic_labeled_cell_indices = generic_labels[generic_labels != 0].index
+
+    start = time.perf_counter()
+    expected_labels = label_with_loc_loop(data_column, generic_labeled_cell_indices, generic_labels)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = label_flawed_words(
+        data_column, generic_labeled_cell_indices, generic_labels,
+        lambda unique_flawed_words: {word: label_number_with_ocr_or_typo(word) for word in unique_flawed_words},
+    )
+    vectorized_time = time.perf_counter() - start
+
+    mismatches = (labels != expected_labels).sum()
+    print(f"Rows: {NUMBER_OF_ROWS}, flawed cells: {len(generic_labeled_cell_indices)}, unique flawed words: {generic_labels[generic_labeled_cell_indices].nunique()}")
+    print(f".loc loop: \t{loop_time:.3f} s")
+    print(f"Vectorized: \t{vectorized_time:.3f} s")
+    print(f"Speedup: \t{loop_time / vectorized_time:.0f}x")
+    print(f"Mismatches: \t{mismatches}")
+    assert mismatches == 0 and labels.dtype == expected_labels.dtype, "vectorized remapping differs from the .loc loop"
+
+    detector_mismatches = compare_detector_labels()
+    assert detector_mismatches == 0, "the detector labels with label_flawed_words differ from the per-row labeling"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import multiprocessing
+import random
+import time
+
+import psutil
+from spellchecker import SpellChecker
+
+from constants import get_misspellings_list
+from lexicon import Lexicon, MappedLexicon, SpellVocabulary, get_spell_checker_vocabulary, load_lexicon_file
+
+NUMBER_OF_WORKERS = 4
+NUMBER_OF_LOOKUPS = 100000
+
+
+def load_vocabularies(use_lexicon_file: bool) -> tuple[SpellVocabulary, Lexicon]:
+    if use_lexicon_file:
+        lexicon_file = load_lexicon_file()
+        spell_vocabulary = SpellVocabulary(lexicon_file.get_table("spell_vocabulary"), lexicon_file.get_metadata("spell_vocabulary")["longest_word_length"])
+        return spell_vocabulary, MappedLexicon(lexicon_file.get_table("misspellings"), lexicon_file.get_table("misspellings_lowercase"))
+    return get_spell_checker_vocabulary(SpellChecker()), Lexicon(get_misspellings_list())
+
+
+def measure_worker_memory(use_lexicon_file: bool, words: list[str]) -> tuple[float, float]:
+    """
+    Runs in a spawned worker: loads the vocabularies, looks up all words (which touches the pages of the vocabularies) and
+    returns the private memory (USS) and the proportional memory (PSS) the vocabularies added, in MB.
+    """
+    process = psutil.Process()
+    before = process.memory_full_info()
+    spell_vocabulary, misspellings = load_vocabularies(use_lexicon_file)
+    [word in spell_vocabulary or word in misspellings for word in words]
+    after = process.memory_full_info()
+    return (after.uss - before.uss) / 1e6, (after.pss - before.pss) / 1e6
+
+
+def main():
+    """
+    Compares the memory of spawned workers which each build the vocabularies as frozensets with workers which map the shared
+    lexicon file, and checks that both give the same lookups. Run from the src folder with `python -m benchmarks.shared_lexicon_benchmark`.
+    """
+    load_lexicon_file() # build the file before the workers start
+    spell_vocabulary, misspellings = load_vocabularies(use_lexicon_file=False)
+    mapped_spell_vocabulary, mapped_misspellings = load_vocabularies(use_lexicon_file=True)
+
+    random.seed(0)
+    words = random.sample(sorted(spell_vocabulary.words), NUMBER_OF_LOOKUPS // 2) + random.sample(sorted(misspellings.words), NUMBER_OF_LOOKUPS // 4)
+    words += [word[::-1] for word in words[:NUMBER_OF_LOOKUPS // 4]]
+
+    start = time.perf_counter()
+    expected = [(word in spell_vocabulary, word in misspellings, spell_vocabulary.is_unknown(word)) for word in words]
+    set_time = time.perf_counter() - start
+    start = time.perf_counter()
+    mapped = [(word in mapped_spell_vocabulary, word in mapped_misspellings, mapped_spell_vocabulary.is_unknown(word)) for word in words]
+    mapped_time = time.perf_counter() - start
+    mismatches = sum(a != b for a, b in zip(expected, mapped))
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{NUMBER_OF_WORKERS} spawned workers, {len(words)} lookups per worker")
+    for use_lexicon_file in (False, True):
+        with context.Pool(NUMBER_OF_WORKERS) as pool:
+            memory = pool.starmap(measure_worker_memory, [(use_lexicon_file, words)] * NUMBER_OF_WORKERS)
+        uss = sum(worker_uss for worker_uss, _ in memory)
+        pss = sum(worker_pss for _, worker_pss in memory)
+        print(f"{'Mapped lexicon file' if use_lexicon_file else 'Frozensets per worker'}: \tprivate {uss:.1f} MB, proportional {pss:.1f} MB (all workers)")
+
+    print(f"Lookups: frozensets {set_time / len(words) * 1e6:.3f} µs, mapped file {mapped_time / len(words) * 1e6:.3f} µs per word")
+    print(f"Mismatches: \t{mismatches}")
+    assert mismatches == 0, "the mapped lexicons differ from the frozensets"
+
+
+if __name__ == "__main__":
+    main()
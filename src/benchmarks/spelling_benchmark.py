@@ -0,0 +1,76 @@
+import random
+import time
+
+from spellchecker import SpellChecker
+
+from lexicon import SpellVocabulary, get_spell_checker_vocabulary
+
+NUMBER_OF_TOKENS = 200000
+UNKNOWN_SHARE = 0.3
+
+
+def generate_tokens(vocabulary: SpellVocabulary, number_of_tokens: int) -> list[str]:
+    """
+    Generates tokens like the tokenized text columns: dictionary words in different cases, misspelled words and numbers.
+    """
+    random.seed(0)
+    dictionary_words = sorted(vocabulary.words)
+    tokens = []
+    for _ in range(number_of_tokens):
+        word = random.choice(dictionary_words)
+        kind = random.random()
+        if kind < UNKNOWN_SHARE:
+            position = random.randrange(len(word) + 1)
+            word = word[:position] + random.choice("qxzj") + word[position:]
+        elif kind < UNKNOWN_SHARE + 0.1:
+            word = str(random.randint(0, 100000))
+        elif kind < UNKNOWN_SHARE + 0.3:
+            word = word.capitalize()
+        tokens.append(word)
+    return tokens + ["nan", "NaN", "-", "1e5", "x" * 60]
+
+
+def main():
+    """
+    Compares the startup cost and the lookup throughput of the SpellChecker with the frozen SpellVocabulary and checks that both
+    find the same unknown words and the same dictionary words. Run from the src folder with `python -m benchmarks.spelling_benchmark`.
+    """
+    start = time.perf_counter()
+    spell_checker = SpellChecker()
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vocabulary = get_spell_checker_vocabulary(spell_checker)
+    export_time = time.perf_counter() - start
+
+    tokens = generate_tokens(vocabulary, NUMBER_OF_TOKENS)
+
+    start = time.perf_counter()
+    expected_unknown = [bool(spell_checker.unknown([token])) for token in tokens]
+    unknown_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    unknown = vocabulary.unknown_many(tokens)
+    unknown_many_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected_contained = [token in spell_checker for token in tokens]
+    contains_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    contained = [token in vocabulary for token in tokens]
+    vocabulary_contains_time = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(unknown.tolist(), expected_unknown)) + sum(a != b for a, b in zip(contained, expected_contained))
+    print(f"Vocabulary: {len(vocabulary)} words, tokens: {len(tokens)}, unknown: {unknown.sum()}")
+    print(f"Startup: \tSpellChecker() {load_time:.3f} s, export to SpellVocabulary {export_time:.3f} s")
+    print(f"spell.unknown([token]): \t{unknown_time / len(tokens) * 1e6:.3f} µs per token")
+    print(f"unknown_many(tokens): \t{unknown_many_time / len(tokens) * 1e6:.3f} µs per token ({unknown_time / unknown_many_time:.1f}x)")
+    print(f"token in SpellChecker: \t{contains_time / len(tokens) * 1e6:.3f} µs per token")
+    print(f"token in SpellVocabulary: \t{vocabulary_contains_time / len(tokens) * 1e6:.3f} µs per token ({contains_time / vocabulary_contains_time:.1f}x)")
+    print(f"Mismatches: \t{mismatches}")
+    assert mismatches == 0, "the SpellVocabulary differs from the SpellChecker"
+
+
+if __name__ == "__main__":
+    main()
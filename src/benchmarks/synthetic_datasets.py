@@ -0,0 +1,365 @@
+import os
+import random
+import string
+
+import numpy as np
+import pandas as pd
+
+from constants import KEYBOARD_NEIGHBORS, MEDICAL_SPECIALTY_VALUES, OCR_DICT, get_misspellings_list
+from error_types import ErrorType
+
+BENCHMARK_DATASET_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "datasets", ".cache", "benchmarks")
+GENERATOR_VERSION = 1 # increase when the generated data changes, so that old datasets are generated again
+BLOCK_SIZE = 100000 # rows generated and written at once, so the memory doesn't grow with the size of the dataset
+PHRASE_POOL_SIZE = 5000 # distinct phrases per block of a word column
+DEFAULT_ERROR_RATE = 0.03 # share of the cells of a column with an injected error
+DEFAULT_TRANSPOSITION_RATE = 0.02 # share of the rows in which the values of a column pair are swapped
+
+TYPO, OCR, MISSPELLING = ErrorType.TYPO.value, ErrorType.OCR.value, ErrorType.MISSPELLING.value
+NUMBER_ERRORS = (TYPO, OCR)
+ID_ERRORS = (OCR,)
+WORD_ERRORS = (TYPO, OCR, MISSPELLING)
+
+WORDS = (
+    "the of and love story night day house war man woman dark light city star king queen blood game life death return secret "
+    "world black white red blue summer winter river road home last first little big great lost school family heart time"
+).split()
+FIRST_NAMES = ["John", "Mary", "Peter", "Anna", "James", "Linda", "Robert", "Susan", "Michael", "Karen", "David", "Laura"]
+LOCATIONS = [
+    "Sydney", "Melbourne", "Brisbane", "Perth", "Adelaide", "Hobart", "Darwin", "Canberra", "Newcastle", "Cairns",
+    "Townsville", "Launceston", "Wollongong", "Ballarat", "Bendigo", "Portland", "Richmond", "Dartmoor", "Sale", "Walpole",
+]
+WIND_DIRECTIONS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+DIABETES_MEDICATIONS = [
+    "metformin", "repaglinide", "nateglinide", "chlorpropamide", "glimepiride", "acetohexamide", "glipizide", "glyburide",
+    "tolbutamide", "pioglitazone", "rosiglitazone", "acarbose", "miglitol", "troglitazone", "tolazamide", "examide",
+    "citoglipton", "insulin", "glyburide-metformin", "glipizide-metformin", "glimepiride-pioglitazone",
+    "metformin-rosiglitazone", "metformin-pioglitazone",
+]
+
+
+class ColumnSpec():
+    """
+    A column of a synthetic dataset.
+
+    Parameters:
+    - name: str - The column name, the same as in the detector mappings.
+    - generate: callable - Returns the clean values of a block, called with the random generator, the number of rows and the
+      clean columns generated before (so columns can depend on each other).
+    - error_types: tuple - The ErrorType values injected into the column, one per flawed cell, chosen uniformly.
+    - error_rate: float - The share of the cells with an injected error.
+    """
+    def __init__(self, name: str, generate, error_types: tuple = NUMBER_ERRORS, error_rate: float = DEFAULT_ERROR_RATE):
+        self.name = name
+        self.generate = generate
+        self.error_types = error_types
+        self.error_rate = error_rate
+
+
+class SyntheticSchema():
+    """
+    A generator of datasets shaped like one of the real datasets, with known labels.
+    The transpositions are column pairs whose values are swapped in some rows. Both cells of a swapped row are labeled as
+    WORD_TRANSPOSITION and get no other error, every other flawed cell has exactly one injected error.
+    """
+    def __init__(self, name: str, columns: list[ColumnSpec], transpositions: list[tuple[str, str]], transposition_rate: float = DEFAULT_TRANSPOSITION_RATE):
+        self.name = name
+        self.columns = columns
+        self.transpositions = transpositions
+        self.transposition_rate = transposition_rate
+
+    @property
+    def column_names(self) -> list[str]:
+        return [column.name for column in self.columns]
+
+    def generate_block(self, number_of_rows: int, seed: int) -> tuple[pd.DataFrame, np.ndarray]:
+        """
+        Returns a block of the dataset and its labels (uint8, one column per dataset column).
+        """
+        rng = np.random.default_rng(seed)
+        rnd = random.Random(seed)
+        values = {}
+        for column in self.columns:
+            values[column.name] = np.asarray(column.generate(rng, number_of_rows, values), dtype=object)
+
+        column_positions = {name: position for position, name in enumerate(self.column_names)}
+        labels = np.zeros((number_of_rows, len(self.columns)), dtype=np.uint8)
+        for column_a, column_b in self.transpositions:
+            is_swapped = (rng.random(number_of_rows) < self.transposition_rate) & (values[column_a] != values[column_b])
+            is_swapped &= (labels[:, column_positions[column_a]] == 0) & (labels[:, column_positions[column_b]] == 0)
+            values[column_a][is_swapped], values[column_b][is_swapped] = values[column_b][is_swapped], values[column_a][is_swapped]
+            labels[is_swapped, column_positions[column_a]] = ErrorType.WORD_TRANSPOSITION.value
+            labels[is_swapped, column_positions[column_b]] = ErrorType.WORD_TRANSPOSITION.value
+
+        for column in self.columns:
+            column_labels = labels[:, column_positions[column.name]]
+            flawed_rows = np.flatnonzero((rng.random(number_of_rows) < column.error_rate) & (column_labels == 0))
+            error_types = rng.choice(column.error_types, size=len(flawed_rows))
+            column_values = values[column.name]
+            for row, error_type in zip(flawed_rows.tolist(), error_types.tolist()):
+                flawed_value = ERROR_INJECTORS[error_type](column_values[row], rnd)
+                if flawed_value is not None and flawed_value != column_values[row]:
+                    column_values[row] = flawed_value
+                    column_labels[row] = error_type
+        return pd.DataFrame(values, columns=self.column_names), labels
+
+
+def inject_typo(value: str, rnd: random.Random) -> str:
+    """
+    Swaps two neighboring characters, replaces a character with a neighboring key, deletes or doubles a character.
+    """
+    position = rnd.randrange(len(value))
+    kind = rnd.randrange(4)
+    if kind == 0 and len(value) > 1:
+        position = min(position, len(value) - 2)
+        return value[:position] + value[position + 1] + value[position] + value[position + 2:]
+    if kind == 1 and value[position].lower() in KEYBOARD_NEIGHBORS:
+        return value[:position] + rnd.choice(KEYBOARD_NEIGHBORS[value[position].lower()]) + value[position + 1:]
+    if kind == 2 and len(value) > 1:
+        return value[:position] + value[position + 1:]
+    return value[:position] + value[position] + value[position:]
+
+
+def inject_ocr(value: str, rnd: random.Random) -> str:
+    """
+    Replaces one occurrence of an OCR_DICT key with one of its confusions. Returns None if the value contains no key.
+    """
+    occurrences = [(position, key) for key in OCR_DICT for position in _find_all(value, key)]
+    if not occurrences:
+        return None
+    position, key = rnd.choice(occurrences)
+    return value[:position] + rnd.choice(OCR_DICT[key]) + value[position + len(key):]
+
+
+def inject_misspelling(value: str, rnd: random.Random) -> str:
+    """
+    Replaces one word of at least three letters with a word from the misspellings list. Returns None if there is no such word.
+    """
+    words = value.split(" ")
+    positions = [position for position, word in enumerate(words) if len(word) >= 3 and word.isalpha()]
+    if not positions:
+        return None
+    words[rnd.choice(positions)] = rnd.choice(_get_misspellings())
+    return " ".join(words)
+
+
+ERROR_INJECTORS = {TYPO: inject_typo, OCR: inject_ocr, MISSPELLING: inject_misspelling}
+
+_misspellings = None
+
+def _get_misspellings() -> list[str]:
+    global _misspellings
+    if _misspellings is None:
+        _misspellings = [word for word in get_misspellings_list() if word.isalpha()]
+    return _misspellings
+
+
+def _find_all(value: str, key: str):
+    position = value.find(key)
+    while position != -1:
+        yield position
+        position = value.find(key, position + 1)
+
+
+def integers(low: int, high: int, suffix: str = ""):
+    """
+    Uniform integers in [low, high), e.g. with suffix ".0" for columns which were stored as floats.
+    """
+    return lambda rng, n, columns: np.char.add(rng.integers(low, high, n).astype(str), suffix)
+
+def digits(number_of_digits: int):
+    return integers(10**(number_of_digits - 1), 10**number_of_digits)
+
+def decimals(low: float, high: float, number_of_decimals: int = 1):
+    return lambda rng, n, columns: np.char.mod(f"%.{number_of_decimals}f", rng.uniform(low, high, n))
+
+def choices(values: list, weights: list = None):
+    probabilities = None if weights is None else np.asarray(weights) / np.sum(weights)
+    return lambda rng, n, columns: rng.choice(np.asarray(values, dtype=object), size=n, p=probabilities)
+
+def mostly(value: str, share: float, otherwise):
+    """
+    The given value in a share of the rows, like the "15.3712" which fills 57% of the real evaporation column.
+    """
+    def generate(rng, n, columns):
+        values = np.asarray(otherwise(rng, n, columns), dtype=object)
+        values[rng.random(n) < share] = value
+        return values
+    return generate
+
+def copy_of(column_name: str):
+    return lambda rng, n, columns: columns[column_name].copy()
+
+def dates(first_year: int, last_year: int):
+    def generate(rng, n, columns):
+        first_day = np.datetime64(f"{first_year}-01-01")
+        number_of_days = (np.datetime64(f"{last_year + 1}-01-01") - first_day).astype(int)
+        return (first_day + rng.integers(0, number_of_days, n)).astype(str)
+    return generate
+
+def phrases(words: list[str], min_words: int, max_words: int, template: str = "{}"):
+    """
+    Phrases of random words, drawn from a pool of PHRASE_POOL_SIZE phrases, so word columns repeat values like the real ones.
+    """
+    def generate(rng, n, columns):
+        lengths = rng.integers(min_words, max_words + 1, PHRASE_POOL_SIZE)
+        pool = np.array([template.format(" ".join(rng.choice(words, size=length))) for length in lengths], dtype=object)
+        return pool[rng.integers(0, PHRASE_POOL_SIZE, n)]
+    return generate
+
+def greater_decimals(column_name: str, low: float, high: float):
+    """
+    Decimals greater than the values of another column, like MaxTemp > MinTemp.
+    """
+    return lambda rng, n, columns: np.char.mod("%.1f", columns[column_name].astype(float) + rng.uniform(low, high, n))
+
+def series_years(column_name: str):
+    def generate(rng, n, columns):
+        first_years = np.char.partition(columns[column_name].astype(str), ".")[:, 0].astype(int)
+        return np.char.add(np.char.add(first_years.astype(str), "-"), (first_years + rng.integers(0, 10, n)).astype(str))
+    return generate
+
+def hashes():
+    return lambda rng, n, columns: np.array(["".join(row) for row in rng.choice(list("0123456789abcdef"), size=(n, 32))], dtype=object)
+
+def phonetic_codes():
+    return lambda rng, n, columns: np.char.add(rng.choice(list(string.ascii_uppercase), size=n), rng.integers(100, 10000, n).astype(str))
+
+def names():
+    def generate(rng, n, columns):
+        return np.char.add(np.char.add(rng.choice([word.capitalize() for word in WORDS], size=n), ", "), rng.choice(FIRST_NAMES, size=n))
+    return generate
+
+
+WEATHER_SCHEMA = SyntheticSchema(
+    "weather",
+    [
+        ColumnSpec("Date", dates(2008, 2017), error_types=ID_ERRORS),
+        ColumnSpec("Location", choices(LOCATIONS), error_types=(TYPO, OCR)),
+        ColumnSpec("MinTemp", decimals(-5, 20)),
+        ColumnSpec("MaxTemp", greater_decimals("MinTemp", 1, 15)),
+        ColumnSpec("Rainfall", decimals(0, 12)),
+        ColumnSpec("Evaporation", mostly("15.3712", 0.57, decimals(0, 12))),
+        ColumnSpec("Sunshine", mostly("14.03", 0.65, decimals(0, 12))),
+        ColumnSpec("WindGustDir", choices(WIND_DIRECTIONS), error_types=ID_ERRORS),
+        ColumnSpec("WindGustSpeed", integers(10, 100, ".0")),
+        ColumnSpec("WindDir9am", choices(WIND_DIRECTIONS), error_types=ID_ERRORS),
+        ColumnSpec("WindDir3pm", choices(WIND_DIRECTIONS), error_types=ID_ERRORS),
+        ColumnSpec("WindSpeed9am", integers(0, 60, ".0")),
+        ColumnSpec("WindSpeed3pm", integers(0, 60, ".0")),
+        ColumnSpec("Humidity9am", integers(10, 100, ".0")),
+        ColumnSpec("Humidity3pm", integers(10, 100, ".0")),
+        ColumnSpec("Pressure9am", decimals(990, 1040), error_types=ID_ERRORS),
+        ColumnSpec("Pressure3pm", decimals(990, 1040), error_types=ID_ERRORS),
+        ColumnSpec("Cloud9am", integers(0, 9, ".0")),
+        ColumnSpec("Cloud3pm", integers(0, 9, ".0")),
+        ColumnSpec("Temp9am", decimals(0, 30)),
+        ColumnSpec("Temp3pm", decimals(5, 35)),
+        ColumnSpec("RainToday", choices(["No", "Yes"], [3, 1]), error_types=ID_ERRORS),
+        ColumnSpec("RainTomorrow", choices(["No", "Yes"], [3, 1]), error_types=ID_ERRORS),
+    ],
+    transpositions=[("MinTemp", "MaxTemp"), ("Rainfall", "Evaporation"), ("Sunshine", "Evaporation")],
+)
+
+MEDICAL_SCHEMA = SyntheticSchema(
+    "medical",
+    [
+        ColumnSpec("encounter_id", digits(8)),
+        ColumnSpec("patient_nbr", digits(7)),
+        ColumnSpec("race", choices(["Caucasian", "AfricanAmerican", "Asian", "Hispanic", "Other"], [6, 2, 1, 1, 1]), error_types=(TYPO, OCR)),
+        ColumnSpec("gender", choices(["Male", "Female"]), error_types=(TYPO, OCR)),
+        ColumnSpec("age", integers(1, 10, "0")),
+        ColumnSpec("weight", integers(40, 150)),
+        ColumnSpec("admission_type_id", integers(1, 9)),
+        ColumnSpec("discharge_disposition_id", integers(1, 26)),
+        ColumnSpec("admission_source_id", integers(1, 21)),
+        ColumnSpec("time_in_hospital", integers(1, 15)),
+        ColumnSpec("payer_code", choices(["MC"]), error_types=(TYPO, OCR)),
+        ColumnSpec("medical_specialty", choices(MEDICAL_SPECIALTY_VALUES), error_types=WORD_ERRORS),
+        ColumnSpec("num_lab_procedures", integers(1, 100)),
+        ColumnSpec("num_procedures", integers(0, 7)),
+        ColumnSpec("num_medications", integers(1, 60)),
+        ColumnSpec("number_outpatient", integers(0, 6)),
+        ColumnSpec("number_emergency", integers(0, 4)),
+        ColumnSpec("number_inpatient", integers(0, 5)),
+        ColumnSpec("diag_1", integers(1, 1000)),
+        ColumnSpec("diag_2", choices(["diabetes", "hypertension", "asthma", "anemia", "pneumonia"]), error_types=WORD_ERRORS),
+        ColumnSpec("diag_3", choices(["diabetes", "hypertension", "asthma", "anemia", "pneumonia"]), error_types=WORD_ERRORS),
+        ColumnSpec("number_diagnoses", choices(["one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]), error_types=WORD_ERRORS),
+        ColumnSpec("max_glu_serum", choices(["Norm", "Not Available", ">200", ">300"], [1, 6, 1, 1]), error_types=(TYPO, OCR)),
+        ColumnSpec("A1Cresult", choices(["Norm", "Not Available", ">7", ">8"], [1, 6, 1, 1]), error_types=(TYPO, OCR)),
+        *(ColumnSpec(name, choices(["No", "Steady", "Up", "Down"], [6, 2, 1, 1]), error_types=(TYPO, OCR)) for name in DIABETES_MEDICATIONS),
+        ColumnSpec("change", choices(["No", "Ch"]), error_types=WORD_ERRORS),
+        ColumnSpec("diabetesMed", choices(["Yes", "No"]), error_types=WORD_ERRORS),
+        ColumnSpec("readmitted", choices(["NO", "Yes"]), error_types=WORD_ERRORS),
+        ColumnSpec("admission_type_desc", choices(["Emergency", "Urgent", "Elective"]), error_types=WORD_ERRORS),
+        ColumnSpec("admission_source_desc", choices(["Emergency Room", "Physician Referral", "Transfer from a hospital"]), error_types=WORD_ERRORS),
+        ColumnSpec("discharge_disposition_desc", choices(["Discharged to home", "Expired", "Left against medical advice"]), error_types=WORD_ERRORS),
+    ],
+    transpositions=[("diabetesMed", "change")],
+)
+
+IMDB_SCHEMA = SyntheticSchema(
+    "imdb",
+    [
+        ColumnSpec("cast_id", digits(8), error_types=ID_ERRORS),
+        ColumnSpec("cast_person_id", digits(7), error_types=ID_ERRORS),
+        ColumnSpec("title_id", digits(7), error_types=ID_ERRORS),
+        ColumnSpec("cast_movie_id", copy_of("title_id"), error_types=ID_ERRORS),
+        ColumnSpec("cast_person_role_id", choices(["999999.0"]), error_types=ID_ERRORS),
+        ColumnSpec("cast_note", phrases(["voice", "uncredited", "archive footage", "credit only", "singing voice"], 1, 1, "({})"), error_types=WORD_ERRORS),
+        ColumnSpec("cast_nr_order", integers(1, 50), error_types=ID_ERRORS),
+        ColumnSpec("cast_role_id", integers(1, 12), error_types=ID_ERRORS),
+        ColumnSpec("person_id", digits(7), error_types=ID_ERRORS),
+        ColumnSpec("person_movie_id", copy_of("title_id"), error_types=ID_ERRORS),
+        ColumnSpec("person_info_type_id", integers(1, 40), error_types=ID_ERRORS),
+        ColumnSpec("extra_info", phrases(WORDS, 2, 5), error_types=WORD_ERRORS),
+        ColumnSpec("person_note", choices(["director", "producer", "writer", "actor", "editor"]), error_types=WORD_ERRORS),
+        ColumnSpec("title", phrases(WORDS, 1, 4), error_types=WORD_ERRORS),
+        ColumnSpec("imdb_index", choices(["I", "II", "III", "IV", "V"]), error_types=ID_ERRORS),
+        ColumnSpec("kind_id", integers(1, 8), error_types=ID_ERRORS),
+        ColumnSpec("production_year", integers(1900, 2021, ".0"), error_types=ID_ERRORS),
+        ColumnSpec("phonetic_code", phonetic_codes(), error_types=(TYPO, OCR)),
+        ColumnSpec("episode_of_id", digits(7), error_types=ID_ERRORS),
+        ColumnSpec("season_nr", integers(1, 30), error_types=ID_ERRORS),
+        ColumnSpec("episode_nr", integers(1, 40), error_types=ID_ERRORS),
+        ColumnSpec("series_years", series_years("production_year"), error_types=(TYPO, OCR)),
+        ColumnSpec("md5sum", hashes(), error_types=ID_ERRORS),
+        ColumnSpec("name", names(), error_types=ID_ERRORS),
+    ],
+    transpositions=[("cast_note", "person_note"), ("cast_id", "cast_person_id")],
+)
+
+SCHEMAS = {schema.name: schema for schema in (WEATHER_SCHEMA, MEDICAL_SCHEMA, IMDB_SCHEMA)}
+
+
+def get_synthetic_dataset(schema_name: str, number_of_rows: int, seed: int = 0, folder: str = BENCHMARK_DATASET_FOLDER) -> tuple[str, str]:
+    """
+    Returns the paths of the dataset CSV file and of its labels (a uint8 .npy matrix, rows x columns). The files are generated
+    on the first call and reused afterwards, the seed and the generator version are part of their names.
+    The labels file is written last, so a dataset is only reused if its generation finished.
+    """
+    base_name = f"{schema_name}_synthetic_{number_of_rows}_s{seed}_v{GENERATOR_VERSION}"
+    dataset_path = os.path.join(folder, f"{base_name}_w_errors.csv")
+    labels_path = os.path.join(folder, f"{base_name}_labels.npy")
+    if not (os.path.exists(dataset_path) and os.path.exists(labels_path)):
+        os.makedirs(folder, exist_ok=True)
+        write_synthetic_dataset(SCHEMAS[schema_name], number_of_rows, dataset_path, labels_path, seed)
+    return dataset_path, labels_path
+
+
+def write_synthetic_dataset(schema: SyntheticSchema, number_of_rows: int, dataset_path: str, labels_path: str, seed: int = 0):
+    """
+    Generates the dataset block by block. Each block has its own seed, so the content doesn't depend on the block size of
+    the reader and datasets of any size can be generated with little memory.
+    """
+    labels = np.lib.format.open_memmap(labels_path + ".tmp.npy", mode="w+", dtype=np.uint8, shape=(number_of_rows, len(schema.columns)))
+    with open(dataset_path + ".tmp", "w", newline="") as f:
+        for block_number, start in enumerate(range(0, number_of_rows, BLOCK_SIZE)):
+            block, block_labels = schema.generate_block(min(BLOCK_SIZE, number_of_rows - start), seed=seed * 1_000_003 + block_number)
+            block.to_csv(f, index=False, header=block_number == 0)
+            labels[start:start + len(block)] = block_labels
+    labels.flush()
+    del labels
+    os.replace(dataset_path + ".tmp", dataset_path)
+    os.replace(labels_path + ".tmp.npy", labels_path)
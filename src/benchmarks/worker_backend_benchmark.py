@@ -0,0 +1,108 @@
+import contextlib
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.detector_benchmark import get_detector_class
+from benchmarks.synthetic_datasets import get_synthetic_dataset
+from detector import COLUMNS_IN_FLIGHT_PER_WORKER, Detector, _map_in_order
+from shared_dataset import SharedColumn, SharedDataset, start_resource_tracker
+from utils.column_utils import factorize
+
+SCHEMA_NAME = "medical" # the widest schema
+NUMBER_OF_ROWS = 200000
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def receive_pickled_column(column: pd.Series) -> pd.Series:
+    """
+    The transfer of the pickle backend without the labeling: the column is unpickled and factorized in the worker (like in
+    detect_column) and a label column like the one of a specific label function is pickled back.
+    """
+    factorize(column)
+    return pd.Series(0, index=column.index)
+
+
+def receive_shared_column(column: SharedColumn) -> None:
+    """
+    The transfer of the shared memory backend without the labeling: the column and its codes (factorized by the main process)
+    are loaded from the shared memory and its labels are written into the shared label matrix.
+    """
+    data_column, _, _ = column.load()
+    column.write_labels(np.zeros(len(data_column), dtype=np.uint8))
+
+
+def measure_transfer(dataset: pd.DataFrame, n_workers: int, worker_backend: str) -> float:
+    """
+    Returns the seconds to hand all columns of the dataset to the workers and get their labels back, without labeling them.
+    The factorization is included, as the shared memory backend moves it from the workers to the main process. The workers
+    are started before the time is taken.
+    """
+    start_resource_tracker()
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(abs, range(n_workers)))
+        start = time.perf_counter()
+        if worker_backend == "pickle":
+            labels = np.zeros(dataset.shape, dtype=np.uint8, order="F")
+            for position, label_column in enumerate(executor.map(receive_pickled_column, (dataset[column_name] for column_name in dataset.columns))):
+                labels[:, position] = np.asarray(label_column, dtype=np.uint8)
+        else:
+            with SharedDataset(dataset) as shared_dataset:
+                handles = ((shared_dataset.get_handle(column_name),) for column_name in dataset.columns)
+                for column_name, _ in zip(dataset.columns, _map_in_order(executor, receive_shared_column, handles, n_workers * COLUMNS_IN_FLIGHT_PER_WORKER)):
+                    shared_dataset.release_column(column_name)
+                labels = shared_dataset.labels.copy()
+        return time.perf_counter() - start
+
+
+def run_detection(dataset_path: str, n_workers: int, worker_backend: str) -> tuple[Detector, float]:
+    """
+    Runs the detector without exporting the labels. Returns the detector and the seconds of the detection.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        detector = get_detector_class(SCHEMA_NAME)(dataset_path, n_workers=n_workers, worker_backend=worker_backend)
+        start = time.perf_counter()
+        detector.detect()
+    return detector, time.perf_counter() - start
+
+
+def main():
+    """
+    Measures the cost of handing the columns to the worker processes and getting their labels back (IPC, the transfer without
+    the factorization) with the pickle and the shared memory backend at 1, 2, 4 and 8 workers, and the whole detection with
+    both backends. Checks that both backends give the same labels as the detection in the main process.
+    Run from the src folder with `python -m benchmarks.worker_backend_benchmark`.
+    """
+    dataset_path, _ = get_synthetic_dataset(SCHEMA_NAME, NUMBER_OF_ROWS)
+    run_detection(dataset_path, 1, "pickle") # loads the vocabularies, which the workers inherit
+    detector, serial_time = run_detection(dataset_path, 1, "pickle")
+    dataset, expected_labels = detector.dataset, detector.labels.values # the dataset like the detectors import it
+    start = time.perf_counter()
+    for column_name in dataset.columns:
+        factorize(dataset[column_name])
+    factorize_time = time.perf_counter() - start
+    print(f"{SCHEMA_NAME} ({dataset.shape[0]} rows, {dataset.shape[1]} columns, {dataset.memory_usage(deep=True).sum() / 1e6:.0f} MB)")
+    print(f"Detection in the main process: {serial_time:.2f} s, factorizing all columns: {factorize_time:.2f} s")
+
+    mismatches = 0
+    for n_workers in WORKER_COUNTS:
+        results = []
+        for worker_backend in ("pickle", "shared_memory"):
+            ipc_time = max(measure_transfer(dataset, n_workers, worker_backend) - factorize_time, 0.0)
+            if n_workers == 1: # a detector with one worker labels in the main process
+                results.append(f"{worker_backend} IPC {ipc_time:.2f} s")
+                continue
+            detector, detection_time = run_detection(dataset_path, n_workers, worker_backend)
+            mismatches += int(np.count_nonzero(detector.labels.values != expected_labels))
+            results.append(f"{worker_backend} IPC {ipc_time:.2f} s ({ipc_time / detection_time:.0%} of the detection {detection_time:.2f} s)")
+        print(f"{n_workers} workers: " + ", ".join(results))
+
+    print(f"Mismatches: \t{mismatches}")
+    assert mismatches == 0, "the labels of the worker backends differ from the detection in the main process"
+
+
+if __name__ == "__main__":
+    main()
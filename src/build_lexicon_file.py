@@ -0,0 +1,18 @@
+import time
+
+from lexicon import LEXICON_FILE_PATH, build_lexicon_file
+
+
+def main():
+    """
+    Rebuilds the memory-mapped lexicon file from the SpellChecker dictionary and the misspellings list. Run it from the src folder
+    with `python build_lexicon_file.py` after updating the misspellings (fetch_updated_misspellings_dict.sh does it). Without it,
+    the file is rebuilt on its first use after the sources changed.
+    """
+    start = time.perf_counter()
+    build_lexicon_file(LEXICON_FILE_PATH)
+    print(f"Built {LEXICON_FILE_PATH} in {time.perf_counter() - start:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
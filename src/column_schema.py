@@ -0,0 +1,47 @@
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+from utils.column_utils import factorize
+from utils.generic_label_rules import NumericRule
+
+IS_NOT_A_NUMBER = NumericRule()
+
+
+class ColumnType(Enum):
+    STRING = "string"
+    NUMBER = "number"
+
+
+class NumericView():
+    """
+    The parsed numbers of a raw string column, computed once per column and shared by all rules.
+    A cell counts as a number like in is_a_number (so "8743." and "08.1" don't), values holds the parsed float or NaN.
+    Missing cells are no numbers. Each unique value is only parsed once.
+    If is_number is given (e.g. from the generic labels of a column labeled with a strict NumericRule), the cells aren't checked
+    again and only the numbers are converted.
+    """
+    def __init__(self, column: pd.Series, is_number: np.ndarray = None):
+        if is_number is not None:
+            numbers = np.full(len(column), np.nan)
+            numbers[is_number] = column.to_numpy()[is_number].astype(float)
+            self.is_number = pd.Series(is_number, index=column.index, name=column.name)
+            self.values = pd.Series(numbers, index=column.index, name=column.name)
+            return
+
+        codes, unique_values = factorize(column)
+        if pd.api.types.infer_dtype(unique_values, skipna=False) == "string": # no missing values, checked without a Python loop
+            is_string = np.ones(len(unique_values), dtype=bool)
+        else:
+            is_string = np.fromiter((isinstance(value, str) for value in unique_values), dtype=bool, count=len(unique_values))
+        string_positions = np.flatnonzero(is_string)
+        string_labels = IS_NOT_A_NUMBER.label_values(unique_values[string_positions])
+
+        is_number = np.zeros(len(unique_values), dtype=bool)
+        is_number[string_positions] = string_labels == 0
+        numbers = np.full(len(unique_values), np.nan)
+        numbers[is_number] = unique_values[is_number].astype(float) # calls float() on each string, like is_a_number
+
+        self.is_number = pd.Series(is_number[codes], index=column.index, name=column.name)
+        self.values = pd.Series(numbers[codes], index=column.index, name=column.name)
@@ -1,3 +1,7 @@
+import os
+
+MISSPELLINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "misspellings") # one misspelled word per line
+
 KEYBOARD_NEIGHBORS = {
     'a': 'qwsxz',
     'b': 'vghn',
@@ -165,5 +169,5 @@ MEDICAL_SPECIALTY_VALUES = [
 
 
 def get_misspellings_list():
-    with open('/src/constants/misspellings', 'r') as f:
+    with open(MISSPELLINGS_PATH, 'r') as f:
         return f.read().splitlines()
\ No newline at end of file
@@ -0,0 +1,82 @@
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from column_schema import NumericView
+from utils.column_utils import factorize
+from error_types import ErrorType
+
+
+class CrossColumnRule():
+    """
+    A rule which compares the columns of each row, like the transposition rules. The mask returns for each row of the dataset
+    whether the rule applies, the cells of the labeled columns in these rows get the label.
+
+    Parameters:
+    - column_names: list[str] - The labeled columns.
+    - mask: callable - Gets the RowColumns of the dataset and returns one boolean per row (an array or a Series).
+    - label: int - The ErrorType value of the labeled cells, WORD_TRANSPOSITION by default.
+    """
+    def __init__(self, column_names: list[str], mask: Callable[["RowColumns"], np.ndarray], label: int = ErrorType.WORD_TRANSPOSITION.value):
+        self.column_names = column_names
+        self.mask = mask
+        self.label = label
+
+    @property
+    def name(self) -> str:
+        return getattr(self.mask, "__name__", type(self.mask).__name__)
+
+
+class RowColumns():
+    """
+    The columns of a dataset for the masks of the cross-column rules. Numbers come from the numeric views of the detector, so
+    each number column is parsed once for all rules. Nothing is copied, the arrays are aligned with the rows of the dataset.
+    """
+    def __init__(self, dataset: pd.DataFrame, get_numeric_view: Callable[[str], NumericView]):
+        self.dataset = dataset
+        self.get_numeric_view = get_numeric_view
+        self._factorized_columns = {}
+        self._equal_values = {}
+
+    def number(self, column_name: str) -> np.ndarray:
+        """
+        The parsed numbers of a NUMBER column, NaN where the cell is no number (so comparisons with them are False).
+        """
+        return self.get_numeric_view(column_name).values.to_numpy()
+
+    def is_number(self, column_name: str) -> np.ndarray:
+        return self.get_numeric_view(column_name).is_number.to_numpy()
+
+    def all_numbers(self, *column_names: str) -> np.ndarray:
+        """
+        Whether the cells of all given columns are numbers.
+        """
+        return np.logical_and.reduce([self.is_number(column_name) for column_name in column_names])
+
+    def equal(self, column_name: str, other_column_name: str) -> np.ndarray:
+        """
+        Whether the raw values of two columns are equal, like column == other_column (missing values are never equal).
+        Each pair is only compared once for all rules.
+        """
+        key = tuple(sorted((column_name, other_column_name)))
+        if key not in self._equal_values:
+            values, other_values = self.dataset[column_name].to_numpy(), self.dataset[other_column_name].to_numpy()
+            self._equal_values[key] = (values == other_values) & pd.notna(values)
+        return self._equal_values[key]
+
+    def lengths(self, column_name: str) -> np.ndarray:
+        """
+        The number of characters of the raw values, NaN for missing values.
+        """
+        return self.dataset[column_name].str.len().to_numpy()
+
+    def map_values(self, column_name: str, function: Callable) -> np.ndarray:
+        """
+        Applies the function to each unique raw value of a column (missing values included) and returns the results per row.
+        """
+        if column_name not in self._factorized_columns:
+            self._factorized_columns[column_name] = factorize(self.dataset[column_name])
+        codes, unique_values = self._factorized_columns[column_name]
+        return np.array([function(value) for value in unique_values])[codes]
+
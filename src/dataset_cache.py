@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError: # pyarrow is optional, without it the cache falls back to pickle files
+    pa = None
+
+CACHE_FOLDER_NAME = ".cache"
+CACHE_VERSION = 1 # increase when the parsing changes, so that old cache entries are not used anymore
+HASH_BLOCK_SIZE = 2**20
+
+
+class DatasetCache():
+    """
+    Content-addressed on-disk cache of frames derived from a dataset file (the parsed dataset, tokenized views).
+    Entries are stored in the .cache folder next to the dataset and are keyed by the SHA-256 of the file content, so an
+    edited file never gets a stale entry. The hash is only recomputed if the size or the mtime of the file changed.
+    Frames are stored as Feather files (columnar, fast to read) if pyarrow is installed, else pickled.
+    """
+    def __init__(self, dataset_path: str):
+        self.dataset_path = dataset_path
+        self.cache_folder = os.path.join(os.path.dirname(dataset_path), CACHE_FOLDER_NAME)
+        self.index_path = os.path.join(self.cache_folder, "index.json")
+
+    def load(self, name: str) -> pd.DataFrame:
+        """
+        Returns the cached frame or None, if there is no entry for the current content of the dataset file.
+        """
+        entry_path = self._get_entry_path(name)
+        extensions = [".feather", ".pkl"] if pa is not None else [".pkl"]
+        for extension in extensions:
+            if os.path.exists(entry_path + extension):
+                try:
+                    return _read_frame(entry_path + extension)
+                except (OSError, ValueError, EOFError, pickle.UnpicklingError): # a broken entry is treated like a missing one
+                    return None
+        return None
+
+    def save(self, name: str, frame: pd.DataFrame):
+        entry_path = self._get_entry_path(name)
+        os.makedirs(self.cache_folder, exist_ok=True)
+        if pa is not None:
+            try:
+                _write_feather(frame, entry_path + ".feather")
+                return
+            except (pa.ArrowException, TypeError, ValueError): # e.g. columns mixing strings and floats
+                pass
+
+        with open(entry_path + ".pkl.tmp", "wb") as f:
+            pickle.dump(frame, f)
+        os.replace(entry_path + ".pkl.tmp", entry_path + ".pkl")
+
+    def get_file_hash(self) -> str:
+        """
+        Returns the SHA-256 of the dataset file. The hash is stored in the cache index together with the size and the mtime of
+        the file, and only recomputed if one of them changed.
+        """
+        stat = os.stat(self.dataset_path)
+        index = self._read_index()
+        key = os.path.abspath(self.dataset_path)
+        entry = index.get(key)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+
+        sha256 = hashlib.sha256()
+        with open(self.dataset_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                sha256.update(block)
+
+        index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256.hexdigest()}
+        os.makedirs(self.cache_folder, exist_ok=True)
+        with open(self.index_path, "w") as f:
+            json.dump(index, f, indent=2)
+        return index[key]["sha256"]
+
+    def _get_entry_path(self, name: str) -> str:
+        return os.path.join(self.cache_folder, f"{self.get_file_hash()[:32]}_{name}_v{CACHE_VERSION}")
+
+    def _read_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def _write_feather(frame: pd.DataFrame, path: str):
+    if not isinstance(frame.index, pd.RangeIndex) or frame.index.start != 0 or frame.index.step != 1:
+        raise ValueError("Feather files can only store frames with a default index.")
+    # write to a temporary file first, so that an interrupted run doesn't leave a broken entry
+    feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def _read_frame(path: str) -> pd.DataFrame:
+    if path.endswith(".pkl"):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    table = feather.read_table(path, memory_map=True)
+    list_column_names = [column.name for column in table.schema if pa.types.is_list(column.type)]
+    frame = table.drop_columns(list_column_names).to_pandas()
+    for column_name, column in zip(frame.columns, table.drop_columns(list_column_names).columns):
+        if column.null_count > 0 and frame[column_name].dtype == object: # missing values come back as None instead of NaN
+            frame[column_name] = frame[column_name].where(frame[column_name].notna(), np.nan)
+
+    for column_name in list_column_names: # to_pandas would return arrays instead of the token lists
+        column = table.column(column_name).combine_chunks()
+        values = column.flatten().to_pylist()
+        offsets = column.offsets.to_numpy().tolist()
+        frame[column_name] = [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    return frame[table.column_names]
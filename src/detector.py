@@ -1,50 +1,272 @@
+import contextlib
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count, repeat
 
+import numpy as np
 import pandas as pd
 
-from error_types import ErrorType
+from column_schema import ColumnType, NumericView
+from cross_column_rules import CrossColumnRule, RowColumns
 from io_handler import IOHandler
+from label_matrix import GenericLabels, LabelMatrix
+from lexicon import preload_for_workers, set_process_role
+from profiler import Profiler, get_rule_name, measure
+from shared_dataset import SharedColumn, SharedDataset, start_resource_tracker
 from tokenizer import Tokenizer
+from utils.column_utils import factorize
+from utils.generic_label_rules import GenericLabelRule, NumericRule
+from utils.specific_label_utils import RULE_VERSION
+
+WORKER_BACKENDS = ("pickle", "shared_memory")
+COLUMNS_IN_FLIGHT_PER_WORKER = 2 # columns handed to the workers ahead of the collected results, with the shared memory backend
 
 
 class Detector(ABC):
-    def __init__(self, dataset_path: str):
-        self.io_handler = IOHandler(dataset_path)
-        self.dataset = self.io_handler.import_dataset()
-        self.labels = pd.DataFrame(ErrorType.NO_ERROR.value, index=self.dataset.index, columns=self.dataset.columns)
+    """
+    Base class of the dataset specific detectors.
+
+    Parameters:
+    - dataset_path: str - The path of the CSV file with errors.
+    - n_workers: int - The number of processes labeling columns in parallel. With 1, all columns are labeled in the main process.
+    - chunk_size: int - If set, the dataset is streamed in chunks of this many rows instead of being loaded at once. The labels of
+      each chunk are written to the output file as soon as the chunk is labeled, so only one chunk is in memory at a time.
+    - csv_engine: str - The pandas CSV parser, "c" or "pyarrow". The streaming mode always uses "c", pyarrow can't read in chunks.
+    - use_cache: bool - Whether the parsed dataset is loaded from (and stored in) the dataset cache next to the CSV file.
+    - incremental: bool - If set, the labels and row fingerprints of the last run are stored next to the error mappings and
+      only new or changed rows are labeled again. Can't be combined with chunk_size.
+    - profiler: Profiler - If set, the time and memory of each phase, column and rule are recorded in it.
+    - worker_backend: str - How the columns get to the workers with n_workers > 1: "pickle" sends each column and its labels
+      through the process pool, "shared_memory" puts the columns and the label matrix into shared memory (see SharedDataset).
+    """
+    def __init__(self, dataset_path: str, n_workers: int = 1, chunk_size: int = None, csv_engine: str = "c", use_cache: bool = True, incremental: bool = False, profiler: Profiler = None, worker_backend: str = "pickle"):
+        if incremental and chunk_size is not None:
+            raise ValueError("The incremental mode can't be combined with the streaming mode.")
+        if worker_backend not in WORKER_BACKENDS:
+            raise ValueError(f"Unknown worker backend '{worker_backend}', expected one of {WORKER_BACKENDS}.")
+
+        self.n_workers = n_workers
+        self.worker_backend = worker_backend
+        self.chunk_size = chunk_size
+        self.incremental = incremental
+        self.profiler = profiler
+        self.io_handler = IOHandler(dataset_path, use_cache)
+        if chunk_size is None:
+            with measure(profiler, "import"):
+                self.dataset = self.io_handler.import_dataset(self.get_column_schema(), engine=csv_engine)
+            self.labels = LabelMatrix(self.dataset.index, self.dataset.columns)
+        else:
+            self.dataset = None
+            self.labels = None
         self.generic_labeled_dataset = None
         self.tokenizer = Tokenizer()
+        self.unique_value_counts = {}
+        self.num_labeled_rows = 0
+        self.numeric_views = {}
+        self.row_fingerprints = None
 
     def export(self):
-        self.io_handler.export_labels(self.labels)
+        """
+        Exports the labels. In the streaming mode they were already written chunk by chunk during detect, so only the
+        statistics are printed.
+        """
+        if self.chunk_size is None:
+            self.io_handler.export_labels(self.labels.to_frame())
+            if self.incremental:
+                self.io_handler.save_detection_state(self.row_fingerprints, self.labels.values, self.dataset.columns, RULE_VERSION)
+        else:
+            self.io_handler.print_exported_label_statistics()
 
     def detect(self):
         """
         Detects the errors in the dataset.
+        Each column is labeled independently (generic labels, then specific labels), so with n_workers > 1 the columns are
+        distributed over a process pool. The cross-column rules only compare cells of the same row, they run after all columns
+        of the dataset (or of the chunk) are labeled.
         """
+        executor = None
+        if self.n_workers > 1:
+            preload_for_workers()
+            if self.worker_backend == "shared_memory":
+                start_resource_tracker()
+            executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_initialize_worker,
+                initargs=(self.get_column_generic_label_mapping(), self.get_column_specific_label_mapping()),
+            )
+
+        try:
+            with self.profiler.cprofile() if self.profiler is not None else contextlib.nullcontext():
+                self._detect(executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        num_unique_values = sum(self.unique_value_counts.values())
+        num_labeled_cells = self.num_labeled_rows * len(self.unique_value_counts)
+        print(f"Generically labelled all data ({num_unique_values} unique values for {num_labeled_cells} cells).")
+        print("Specifically labelled all data.")
 
-        self.generic_labeled_dataset = pd.DataFrame(0, index=self.dataset.index, columns=self.dataset.columns)
+    def _detect(self, executor: ProcessPoolExecutor = None):
+        if self.chunk_size is None:
+            print(f"Number of cells: {self.dataset.size}, Number of rows: {self.dataset.shape[0]}")
+            if self.incremental:
+                self._label_changed_rows(executor)
+            else:
+                self._label_columns(executor)
+                self._label_cross_column_errors()
+        else:
+            chunks = self.io_handler.import_dataset_in_chunks(self.chunk_size)
+            for chunk_number in count():
+                with measure(self.profiler, "import"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                self.dataset = chunk
+                self.numeric_views = {}
+                self.labels = LabelMatrix(chunk.index, chunk.columns)
+                self._label_columns(executor)
+                self._label_cross_column_errors()
+                self.io_handler.export_label_chunk(self.labels.to_frame(), is_first_chunk=chunk_number == 0)
+                print(f"Labelled {self.num_labeled_rows} rows.")
+            num_columns = 0 if self.dataset is None else self.dataset.shape[1]
+            print(f"Number of cells: {self.num_labeled_rows * num_columns}, Number of rows: {self.num_labeled_rows}")
+
+    def _label_columns(self, executor: ProcessPoolExecutor = None):
+        """
+        Labels all columns of self.dataset, in the given process pool or in the main process.
+        The results are collected in the order of the columns, so the labels are the same in both modes.
+        """
+        self.generic_labeled_dataset = GenericLabels(self.dataset.index, self.dataset.columns)
         column_generic_label_mapping = self.get_column_generic_label_mapping()
+        specific_column_label_mapping = self.get_column_specific_label_mapping()
         for column_name in self.dataset.columns:
-            #print(f"Generically labelling {column_name}")
             if column_name not in column_generic_label_mapping:
                 print(f"Warning: Column '{column_name}' not found in generic label mapping. Skipping.")
-                continue
 
-            label_function = column_generic_label_mapping[column_name]
+        with SharedDataset(self.dataset) if executor is not None and self.worker_backend == "shared_memory" else contextlib.nullcontext() as shared_dataset:
+            if executor is not None and shared_dataset is not None:
+                # the workers read the columns from the shared memory and write the labels into its label matrix, only the
+                # generic labels of the flawed cells are sent back. A column is only encoded when a result was collected, so
+                # the main process encodes it while the workers label the columns in flight
+                column_results = _map_in_order(
+                    executor,
+                    _detect_shared_column_in_worker,
+                    ((column_name, shared_dataset.get_handle(column_name) or self.dataset[column_name], self.profiler is not None) for column_name in self.dataset.columns),
+                    self.n_workers * COLUMNS_IN_FLIGHT_PER_WORKER,
+                )
+            elif executor is not None:
+                # the label mappings were sent to the workers by the initializer, the tasks only contain the column data
+                column_results = executor.map(
+                    _detect_column_in_worker,
+                    self.dataset.columns,
+                    (self.dataset[column_name] for column_name in self.dataset.columns),
+                    repeat(self.profiler is not None),
+                )
+            else:
+                column_results = (
+                    (*detect_column(self.dataset[column_name], column_generic_label_mapping.get(column_name), specific_column_label_mapping[column_name], self.profiler), None)
+                    for column_name in self.dataset.columns
+                )
+            if self.profiler is not None and self.profiler.progress:
+                from tqdm import tqdm
+                column_results = tqdm(column_results, total=len(self.dataset.columns), desc="Labelling columns", unit="column")
 
-            self.generic_labeled_dataset[column_name] = self.dataset[column_name].apply(label_function)
-        print("Generically labelled all data.")
+            for position, (column_name, (generic_labeled_column, label_column, num_unique_values, worker_profile_records)) in enumerate(zip(self.dataset.columns, column_results)):
+                if worker_profile_records is not None:
+                    self.profiler.merge(worker_profile_records)
+                self.generic_labeled_dataset[column_name] = generic_labeled_column
+                self.labels[column_name] = shared_dataset.labels[:, position] if label_column is None else label_column
+                if shared_dataset is not None:
+                    shared_dataset.release_column(column_name)
+                if num_unique_values is not None:
+                    self.unique_value_counts[column_name] = self.unique_value_counts.get(column_name, 0) + num_unique_values
+        self.num_labeled_rows += len(self.dataset)
 
-        specific_column_label_mapping = self.get_column_specific_label_mapping()
-        for column_name in self.dataset.columns:
-            #print(f"Specifically labelling {column_name}")
-            generic_labeled_cell_indices = self._get_generic_labeled_cell_indices(column_name)
+    def _label_changed_rows(self, executor: ProcessPoolExecutor = None):
+        """
+        Labels only the rows which are new or changed since the last incremental run and takes the labels of the other rows from
+        the stored state. Rows are compared by position, so appended and patched rows are relabeled. If rows were removed or the
+        columns changed, all rows are labeled.
+        Every rule labels a cell from the values of its own row (the unique words of a column are only deduplicated, each word is
+        classified on its own), so labeling a subset of the rows gives the same labels as a full run.
+        """
+        self.row_fingerprints = pd.util.hash_pandas_object(self.dataset, index=False).to_numpy()
+        previous_state = self.io_handler.load_detection_state(RULE_VERSION)
+        if previous_state is None:
+            previous_labels = None
+        else:
+            previous_fingerprints, previous_labels, previous_columns = previous_state
+            if list(previous_columns) != list(self.dataset.columns) or len(previous_fingerprints) > len(self.dataset):
+                previous_labels = None
 
-            # each column has its own mapping function how to assign specific error types to the generic labeled cells
-            label_function = specific_column_label_mapping[column_name]
-            self.labels[column_name] = label_function(self.dataset[column_name], generic_labeled_cell_indices, self.generic_labeled_dataset[column_name])
-        print("Specifically labelled all data.")
+        if previous_labels is None:
+            print("Incremental detection: no usable labels of a previous run, labelling all rows.")
+            self._label_columns(executor)
+            self._label_cross_column_errors()
+            return
+
+        is_changed = np.ones(len(self.dataset), dtype=bool)
+        is_changed[:len(previous_fingerprints)] = self.row_fingerprints[:len(previous_fingerprints)] != previous_fingerprints
+        changed_rows = np.flatnonzero(is_changed)
+        print(f"Incremental detection: {len(changed_rows)} of {len(self.dataset)} rows are new or changed.")
+
+        labels = LabelMatrix(self.dataset.index, self.dataset.columns)
+        labels.values[:len(previous_labels)] = previous_labels
+        if len(changed_rows) > 0:
+            dataset = self.dataset
+            self.dataset = dataset.iloc[changed_rows]
+            self.numeric_views = {}
+            self.labels = LabelMatrix(self.dataset.index, self.dataset.columns)
+            self._label_columns(executor)
+            self._label_cross_column_errors()
+            labels.values[changed_rows] = self.labels.values
+
+            self.dataset = dataset
+            self.numeric_views = {}
+        self.labels = labels
+
+    def _label_cross_column_errors(self):
+        """
+        Labels errors which can only be detected by comparing the columns of a row, like word transpositions.
+        The masks of all cross-column rules are computed on the same parsed columns, then all labels are written in one batch.
+        """
+        columns = RowColumns(self.dataset, self.get_numeric_view)
+        cell_labels = []
+        for rule in self.get_cross_column_rules():
+            with measure(self.profiler, "cross_column", rule=rule.name):
+                cell_labels.append((np.asarray(rule.mask(columns), dtype=bool), rule.column_names, rule.label))
+        with measure(self.profiler, "cross_column", rule="set_masked_cells"):
+            self.labels.set_masked_cells(cell_labels)
+
+    def get_cross_column_rules(self) -> list[CrossColumnRule]:
+        """
+        Returns the cross-column rules of the dataset in the order they are applied, where they overlap the later rule wins.
+        """
+        return []
+
+    def __getstate__(self) -> dict:
+        """
+        The label mappings contain bound methods, which pickle the detector with them. The data is sent to the workers per column,
+        so it is left out here.
+        """
+        state = self.__dict__.copy()
+        state["dataset"] = None
+        state["labels"] = None
+        state["generic_labeled_dataset"] = None
+        state["numeric_views"] = {}
+        return state
+
+    def print_dedup_report(self):
+        """
+        Prints the number of unique values and the dedup ratio (cells per unique value) of each generically labeled column.
+        In the streaming mode the unique values are counted per chunk.
+        """
+        print("Column dedup ratios (cells per unique value):")
+        for column_name, num_unique_values in sorted(self.unique_value_counts.items(), key=lambda item: item[1]):
+            dedup_ratio = self.num_labeled_rows / max(num_unique_values, 1)
+            print(f"  {column_name}: {num_unique_values} unique values, ratio {dedup_ratio:.1f}")
 
     @abstractmethod
     def get_column_generic_label_mapping(self) -> dict:
@@ -54,6 +276,37 @@ class Detector(ABC):
     def get_column_specific_label_mapping(self) -> dict:
         pass
 
+    @abstractmethod
+    def get_column_schema(self) -> dict:
+        """
+        Returns the ColumnType of each column. All columns are read as raw strings, NUMBER columns can also be accessed
+        as parsed numbers with get_numeric_view.
+        """
+        pass
+
+    def get_numeric_view(self, column_name: str) -> NumericView:
+        """
+        Returns the parsed numbers of a NUMBER column. They are parsed on the first access and cached for all rules.
+        """
+        if self.get_column_schema().get(column_name) != ColumnType.NUMBER:
+            raise ValueError(f"Column '{column_name}' is not a number column in the schema.")
+
+        if column_name not in self.numeric_views:
+            self.numeric_views[column_name] = NumericView(self.dataset[column_name], self._get_generic_numbers(column_name))
+        return self.numeric_views[column_name]
+
+    def _get_generic_numbers(self, column_name: str) -> np.ndarray:
+        """
+        Returns which cells of the column are numbers, if the generic labeling of self.dataset already decided it: a strict
+        NumericRule labels exactly the cells which are no numbers. Else None.
+        """
+        if self.generic_labeled_dataset is None or self.generic_labeled_dataset.index is not self.dataset.index:
+            return None
+        generic_label_function = self.get_column_generic_label_mapping().get(column_name)
+        if type(generic_label_function) is not NumericRule or not generic_label_function.strict:
+            return None
+        return ~self.generic_labeled_dataset.get_mask(column_name)
+
     def _get_generic_labeled_cell_indices(self, column_name: str) -> pd.Index:
         """
         Returns the indices of the cells that are labeled as generic.
@@ -61,7 +314,101 @@ class Detector(ABC):
         if column_name not in self.generic_labeled_dataset.columns:
             raise ValueError(f"Column '{column_name}' not found in generic labeled dataset.")
         
-        return self.generic_labeled_dataset[self.generic_labeled_dataset[column_name] != 0].index
+        return self.generic_labeled_dataset.get_labeled_cell_indices(column_name)
+
+
+
+def label_unique_values(label_function, unique_values: np.ndarray) -> np.ndarray:
+    """
+    Labels the unique values of a column with a generic label function or rule. Returns an object array with the label of each value.
+    """
+    if isinstance(label_function, GenericLabelRule):
+        return label_function.label_values(unique_values)
+
+    labels = np.empty(len(unique_values), dtype=object)
+    labels[:] = [label_function(value) for value in unique_values]
+    return labels
+
+
+def detect_column(data_column: pd.Series, generic_label_function, specific_label_function, profiler: Profiler = None, factorized: tuple[np.ndarray, np.ndarray] = None) -> tuple[pd.Series, pd.Series, int]:
+    """
+    Labels a single column. Returns the generic labels, the specific labels and the number of unique values of the column.
+    The generic labels are the offending values of the flawed cells only, indexed by their rows.
+    If the column has no generic label function, no cell is generically labeled and the number of unique values is None.
+    The codes and unique values of the column can be passed as factorized if they are already known (e.g. from a SharedColumn).
+    """
+    column_name = data_column.name
+    if generic_label_function is None:
+        generic_labeled_column = pd.Series([], index=data_column.index[:0], dtype=object)
+        num_unique_values = None
+    else:
+        # the label functions only see the unique values of a column, the labels are broadcast back to the flawed cells by code
+        with measure(profiler, "factorize", column_name):
+            codes, unique_values = factorize(data_column) if factorized is None else factorized
+        with measure(profiler, "generic", column_name, get_rule_name(generic_label_function), unique_values=len(unique_values)):
+            unique_labels = label_unique_values(generic_label_function, unique_values)
+            is_flawed_value = np.array([label != 0 for label in unique_labels], dtype=bool)
+            flawed_rows = np.flatnonzero(is_flawed_value[codes])
+            generic_labeled_column = pd.Series(unique_labels[codes[flawed_rows]], index=data_column.index[flawed_rows], dtype=object)
+        num_unique_values = len(unique_values)
+
+    # each column has its own mapping function how to assign specific error types to the generic labeled cells
+    generic_labeled_cell_indices = generic_labeled_column.index
+    num_flawed_values = None if profiler is None else generic_labeled_column.nunique()
+    with measure(profiler, "specific", column_name, get_rule_name(specific_label_function), unique_values=num_flawed_values):
+        label_column = specific_label_function(data_column, generic_labeled_cell_indices, generic_labeled_column)
+    return generic_labeled_column, label_column, num_unique_values
+
+
+def _map_in_order(executor: ProcessPoolExecutor, function, arguments, max_in_flight: int):
+    """
+    Like executor.map, but the arguments are only taken from the iterable when fewer than max_in_flight tasks are pending.
+    Yields the results in the order of the arguments.
+    """
+    pending = deque()
+    for task_arguments in arguments:
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, *task_arguments))
+    while pending:
+        yield pending.popleft().result()
+
+
+_worker_label_mappings = None
+
+def _initialize_worker(column_generic_label_mapping: dict, specific_column_label_mapping: dict):
+    """
+    Runs once per worker process, so the label mappings are only passed once per worker instead of once per column.
+    The spellchecker and the lexicons are inherited from the parent process (fork) or loaded on their first use in the worker,
+    which maps them from the lexicon file.
+    """
+    global _worker_label_mappings
+    _worker_label_mappings = (column_generic_label_mapping, specific_column_label_mapping)
+    set_process_role("worker")
+
+def _detect_column_in_worker(column_name: str, data_column: pd.Series, profile: bool = False) -> tuple[pd.Series, pd.Series, int, list[dict]]:
+    """
+    Like detect_column, with the profile records of the column as fourth result (or None), which the main process merges.
+    """
+    column_generic_label_mapping, specific_column_label_mapping = _worker_label_mappings
+    profiler = Profiler() if profile else None
+    results = detect_column(data_column, column_generic_label_mapping.get(column_name), specific_column_label_mapping[column_name], profiler)
+    return (*results, None if profiler is None else profiler.get_records())
+
+
+def _detect_shared_column_in_worker(column_name: str, column: SharedColumn | pd.Series, profile: bool = False) -> tuple[pd.Series, pd.Series, int, list[dict]]:
+    """
+    Like _detect_column_in_worker for a column in a SharedDataset: the labels are written into its label matrix and None is
+    returned in their place. Columns which aren't in the shared memory are passed as Series and labeled like in _detect_column_in_worker.
+    """
+    if not isinstance(column, SharedColumn):
+        return _detect_column_in_worker(column_name, column, profile)
 
-    def _label_word_transpositions(self, column_names: list[str], row_indices: pd.Index):
-        self.labels.loc[row_indices, column_names] = ErrorType.WORD_TRANSPOSITION.value
+    column_generic_label_mapping, specific_column_label_mapping = _worker_label_mappings
+    profiler = Profiler() if profile else None
+    data_column, codes, unique_values = column.load()
+    generic_labeled_column, label_column, num_unique_values = detect_column(
+        data_column, column_generic_label_mapping.get(column_name), specific_column_label_mapping[column_name], profiler, (codes, unique_values)
+    )
+    column.write_labels(label_column)
+    return generic_labeled_column, None, num_unique_values, None if profiler is None else profiler.get_records()
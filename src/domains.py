@@ -0,0 +1,138 @@
+import string
+from functools import lru_cache
+from typing import Callable
+
+import numpy as np
+
+from constants import KEYBOARD_NEIGHBORS, OCR_DICT
+
+MAX_DOMAIN_SIZE = 1_000_000 # values, larger domains get no variant table, it would take more memory than it saves time
+
+
+def get_reverse_keyboard_neighbors() -> dict:
+    """
+    Maps each character to the keys which have it as keyboard neighbor, i.e. the characters it can be mistyped as.
+    """
+    reverse_neighbors = {}
+    for key, neighbors in KEYBOARD_NEIGHBORS.items():
+        for neighbor in neighbors:
+            reverse_neighbors.setdefault(neighbor, []).append(key)
+    return reverse_neighbors
+
+
+class BoundedIntegerDomain():
+    """
+    The integers from min_value to max_value (both included) of a number column, e.g. the years of series_years, as strings.
+    Domains with at most MAX_DOMAIN_SIZE values get a table of their key errors: the values with one key mistyped as a
+    keyboard neighbor (like is_key_error checks them). The table is built once per domain, then checking a token is one set
+    lookup instead of generating its candidates and checking each against all values. Larger domains check the candidates.
+
+    Parameters:
+    - min_value: int - The smallest valid value.
+    - max_value: int - The largest valid value.
+    """
+    def __init__(self, min_value: int, max_value: int):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.key_error_variants = self._build_key_error_variants() if max_value - min_value + 1 <= MAX_DOMAIN_SIZE else None
+
+    def __contains__(self, word) -> bool:
+        """
+        Whether the word is one of the values, written like str(value).
+        """
+        try:
+            value = int(word)
+        except (TypeError, ValueError):
+            return False
+        return self.min_value <= value <= self.max_value and str(value) == word
+
+    def is_key_error(self, token: str) -> bool:
+        """
+        Whether the token is a value with one key mistyped as a keyboard neighbor (compared in lowercase, like is_key_error).
+        """
+        token = token.lower()
+        if self.key_error_variants is not None:
+            return token in self.key_error_variants
+        for position, char in enumerate(token):
+            for neighbor in KEYBOARD_NEIGHBORS.get(char, []):
+                if token[:position] + neighbor + token[position + 1:] in self:
+                    return True
+        return False
+
+    def _build_key_error_variants(self) -> frozenset:
+        reverse_neighbors = get_reverse_keyboard_neighbors()
+        variants = set()
+        for value in range(self.min_value, self.max_value + 1):
+            value = str(value)
+            for position, char in enumerate(value):
+                for key in reverse_neighbors.get(char, []):
+                    variants.add(value[:position] + key + value[position + 1:])
+        return frozenset(variants)
+
+
+@lru_cache(maxsize=None)
+def get_bounded_integer_domain(min_value: int, max_value: int) -> BoundedIntegerDomain:
+    """
+    Returns the domain of the integers from min_value to max_value, it is built once and shared by all columns.
+    """
+    return BoundedIntegerDomain(min_value, max_value)
+
+
+MAX_CATEGORICAL_VARIANTS = 20_000 # larger domains (e.g. the medical specialties) get no table, it would take longer to build than it saves
+INSERTED_CHARACTERS = frozenset(string.ascii_letters + string.digits + " -_.,'/()&>")
+
+
+class CategoricalDomain():
+    """
+    The closed set of valid values of a categorical column (e.g. No, Steady, Up and Down of the drug columns) with a table of
+    the labels of their variants: the values with one adjacent transposition, one key mistyped as a keyboard neighbor, one
+    inserted or doubled character (of INSERTED_CHARACTERS), one deleted character and one OCR confusion of OCR_DICT.
+    The labels of the table come from the classifier of the flawed words, so a word of the table gets the same label as if it
+    was classified. The table is built on the first lookup and shared by all columns with the same values.
+
+    Parameters:
+    - values: tuple[str, ...] - The valid values.
+    - classify_words: callable - Takes a list of flawed words and returns a dict with the ErrorType value of each word.
+    """
+    def __init__(self, values: tuple[str, ...], classify_words: Callable[[list], dict]):
+        self.values = tuple(values)
+        self.classify_words = classify_words
+        self.variant_labels = None
+
+    def lookup(self, words: np.ndarray) -> np.ndarray:
+        """
+        Returns the uint8 ErrorType value of each word from the table, 0 for words which aren't in it (e.g. with two errors).
+        """
+        if self.variant_labels is None:
+            self.variant_labels = self._build_variant_labels()
+        return np.fromiter((self.variant_labels.get(word, 0) if isinstance(word, str) else 0 for word in words), dtype=np.uint8, count=len(words))
+
+    def get_variants(self) -> set[str]:
+        reverse_neighbors = get_reverse_keyboard_neighbors()
+        ocr_confusions = [(original, confusion) for original, confusions in OCR_DICT.items() for confusion in confusions]
+        variants = set()
+        for value in self.values:
+            lowercase_value = value.lower()
+            for position in range(len(value)):
+                variants.add(value[:position] + value[position + 1:]) # deletion
+                if position + 1 < len(value):
+                    variants.add(value[:position] + value[position + 1] + value[position] + value[position + 2:])
+                for key in reverse_neighbors.get(lowercase_value[position], []): # is_key_error compares in lowercase
+                    variants.add(lowercase_value[:position] + key + lowercase_value[position + 1:])
+            for position in range(len(value) + 1):
+                for char in INSERTED_CHARACTERS:
+                    variants.add(value[:position] + char + value[position:])
+            for original, confusion in ocr_confusions:
+                start = value.find(original)
+                while start != -1:
+                    variants.add(value[:start] + confusion + value[start + len(original):])
+                    start = value.find(original, start + 1)
+        return variants - set(self.values) - {""}
+
+    def _build_variant_labels(self) -> dict:
+        variants = self.get_variants()
+        if len(variants) > MAX_CATEGORICAL_VARIANTS:
+            return {}
+        variants = sorted(variants)
+        word_labels = self.classify_words(variants)
+        return {word: int(word_labels[word]) for word in variants}
@@ -0,0 +1,113 @@
+import string
+
+import numpy as np
+
+from constants import KEYBOARD_NEIGHBORS
+
+MASK_CHARACTER = "\x00"
+DELETABLE_CHARACTERS = frozenset(string.ascii_lowercase)
+
+
+class EditIndex():
+    """
+    Precomputed one-edit neighbourhood of a vocabulary (SymSpell-style).
+    Instead of generating all candidate strings of a flawed word and probing the vocabulary with each of them, the keys of every
+    vocabulary word are generated once (on the first lookup) and stored as sorted arrays of hashes. A batch of flawed words is
+    then answered with a few vectorized hash lookups. A hit only says that a candidate might exist, the caller verifies it
+    against the vocabulary, so hash collisions can never change a result.
+
+    Parameters:
+    - words: frozenset - The vocabulary as used for membership checks.
+    - lowercase_words: frozenset - The lowercased vocabulary, used by the deletion check.
+    - lowercase_queries: bool - Whether the vocabulary is case-insensitive (like the SpellChecker) and queries have to be lowercased.
+    """
+    def __init__(self, words: frozenset, lowercase_words: frozenset, lowercase_queries: bool):
+        self.words = words
+        self.lowercase_words = lowercase_words
+        self.lowercase_queries = lowercase_queries
+
+        self.transposition_hashes = None
+        self.key_error_hashes = None
+        self.deletion_hashes = None
+
+    def normalize(self, word: str) -> str:
+        return word.lower() if self.lowercase_queries else word
+
+    def supports(self, word) -> bool:
+        """
+        The index only answers for ASCII words without whitespace. For all other words lowercasing or splitting could behave
+        differently than in the candidate generation, so they have to be classified the conventional way.
+        """
+        return isinstance(word, str) and word != "" and word.isascii() and word.isprintable() and " " not in word
+
+    def find_candidates(self, words: list[str]) -> np.ndarray:
+        """
+        Returns a boolean array of shape (len(words), 3). The columns tell for each word whether a transposition, a key error
+        or a deletion could map it to a vocabulary word.
+        """
+        if self.transposition_hashes is None:
+            self._build_hashes()
+
+        queries = [self.normalize(word) for word in words]
+        lowercased = [word.lower() for word in words]
+
+        candidates = np.zeros((len(words), 3), dtype=bool)
+        candidates[:, 0] = _contains_hashes(self.transposition_hashes, queries)
+        candidates[:, 2] = _contains_hashes(self.deletion_hashes, lowercased)
+
+        masked_keys = []
+        word_ids = []
+        for word_id, word in enumerate(lowercased):
+            for i, char in enumerate(word):
+                if char in KEYBOARD_NEIGHBORS:
+                    masked_keys.append(word[:i] + MASK_CHARACTER + word[i+1:])
+                    word_ids.append(word_id)
+        key_error_hits = _contains_hashes(self.key_error_hashes, masked_keys)
+        candidates[np.asarray(word_ids, dtype=np.int64)[key_error_hits], 1] = True
+        return candidates
+
+    def _build_hashes(self):
+        """
+        The hashes are only built on the first lookup, because building them for a large vocabulary takes a few seconds.
+        """
+        reverse_neighbors = {}
+        for char, neighbors in KEYBOARD_NEIGHBORS.items():
+            for neighbor in neighbors:
+                reverse_neighbors.setdefault(neighbor, []).append(char)
+
+        indexed_words = [word for word in self.words if isinstance(word, str)]
+        self.transposition_hashes = _sorted_hashes(
+            word[:i] + word[i+1] + word[i] + word[i+2:] for word in indexed_words for i in range(len(word) - 1)
+        )
+        self.key_error_hashes = _sorted_hashes(
+            word[:i] + MASK_CHARACTER + word[i+1:] for word in indexed_words for i in range(len(word)) if word[i] in reverse_neighbors
+        )
+        self.deletion_hashes = _sorted_hashes(
+            word[:i] + word[i+1:] for word in self.lowercase_words if isinstance(word, str) for i in range(len(word)) if word[i] in DELETABLE_CHARACTERS
+        )
+
+    def is_deletion(self, word: str, has_candidate: bool = True) -> bool:
+        """
+        Same result as utils.specific_label_utils.is_deletion for words supported by the index.
+        """
+        word = word.lower()
+        if has_candidate:
+            for i in range(len(word) + 1):
+                if any(word[:i] + char + word[i:] in self.lowercase_words for char in string.ascii_lowercase):
+                    return True
+
+        if word in self.lowercase_words:
+            return True
+        return any(word[:i] in self.lowercase_words and word[i:] in self.lowercase_words for i in range(1, len(word)))
+
+
+def _sorted_hashes(keys) -> np.ndarray:
+    return np.unique(np.fromiter((hash(key) for key in keys), dtype=np.int64))
+
+
+def _contains_hashes(sorted_hashes: np.ndarray, keys: list[str]) -> np.ndarray:
+    if not keys or sorted_hashes.size == 0:
+        return np.zeros(len(keys), dtype=bool)
+    hashes = np.fromiter((hash(key) for key in keys), dtype=np.int64, count=len(keys))
+    positions = np.minimum(np.searchsorted(sorted_hashes, hashes), sorted_hashes.size - 1)
+    return sorted_hashes[positions] == hashes
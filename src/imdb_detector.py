@@ -1,62 +1,71 @@
 import re
 from functools import partial
 
+import numpy as np
 import pandas as pd
 
+from column_schema import ColumnType
+from cross_column_rules import CrossColumnRule, RowColumns
 from detector import Detector
 from error_types import ErrorType
-from utils.generic_label_utils import (
-    check_with_spelling_library,
-    is_not_a_number,
-    is_a_number,
-)
+from profiler import Profiler
+from utils.generic_label_rules import NumericRule, RegexRule, SpellingRule, TokenRule
 from utils.specific_label_utils import (
     differentiate_errors_in_string_column,
     differentiate_errors_in_number_column,
+    label_flawed_words,
     label_year,
     set_all_labels_to_ocr,
 )
 
 
 class IMDBDetector(Detector):
-    def __init__(self, dataset_path: str):
-        super().__init__(dataset_path)
+    def __init__(self, dataset_path: str, n_workers: int = 1, chunk_size: int = None, csv_engine: str = "c", use_cache: bool = True, incremental: bool = False, profiler: Profiler = None, worker_backend: str = "pickle"):
+        super().__init__(dataset_path, n_workers, chunk_size, csv_engine, use_cache, incremental, profiler, worker_backend)
 
     def detect(self):
         print(f"--- IMDB Dataset ---")
-        print(f"Number of cells: {self.dataset.size}, Number of rows: {self.dataset.shape[0]}")
+        super().detect()
 
-        super().detect() 
-        self._label_cast_note_person_note_transpositions()
-        self._label_cast_id_cast_person_id_transpositions()
-        self._label_identical_columns()
+    def get_cross_column_rules(self) -> list[CrossColumnRule]:
+        return [
+            CrossColumnRule(["cast_note", "person_note"], self._get_cast_note_person_note_transpositions),
+            CrossColumnRule(["cast_id", "cast_person_id"], self._get_cast_id_cast_person_id_transpositions),
+            CrossColumnRule(["person_movie_id"], self._get_wrong_person_movie_ids, label=ErrorType.OCR.value),
+            CrossColumnRule(["cast_movie_id"], self._get_wrong_cast_movie_ids, label=ErrorType.OCR.value),
+            CrossColumnRule(["title_id"], self._get_wrong_title_ids, label=ErrorType.OCR.value),
+        ]
 
     def get_column_generic_label_mapping(self) -> dict:
+        is_not_a_number = NumericRule()
+        check_spelling = SpellingRule()
+        is_not_a_roman_numeral = RegexRule(r'M{0,3}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})') # valid up to 3999 (MMMCMXCIX)
+
         return {
             "cast_id": is_not_a_number,
             "cast_person_id": is_not_a_number,
             "cast_movie_id": is_not_a_number,
             "cast_person_role_id": self.is_not_a_cast_person_role_id,
-            "cast_note": check_with_spelling_library,
+            "cast_note": check_spelling,
             "cast_nr_order": is_not_a_number,
             "cast_role_id": is_not_a_number,
             "person_id": is_not_a_number,
             "person_movie_id": is_not_a_number,
             "person_info_type_id": is_not_a_number,
-            "extra_info": check_with_spelling_library,
-            "person_note": check_with_spelling_library,
+            "extra_info": check_spelling,
+            "person_note": check_spelling,
             "title_id": is_not_a_number,
-            "title": check_with_spelling_library,
-            "imdb_index": self._is_valid_roman_numeral,
+            "title": check_spelling,
+            "imdb_index": is_not_a_roman_numeral,
             "kind_id": is_not_a_number,
-            "production_year": self.is_not_a_production_year,
+            "production_year": TokenRule(self.is_not_a_production_year, is_valid_token_at=[is_a_year_token, str.isdigit]),
             "phonetic_code": self._is_valid_phonetic_code,
             "episode_of_id": is_not_a_number,
             "season_nr": is_not_a_number,
             "episode_nr": is_not_a_number,
-            "series_years": self.is_not_a_series_years,
+            "series_years": TokenRule(self.is_not_a_series_years, is_valid_token=is_a_year_token),
             "md5sum": self._is_not_a_valid_hash,
-            "name": check_with_spelling_library,
+            "name": check_spelling,
         }
 
 
@@ -88,16 +97,49 @@ class IMDBDetector(Detector):
             "md5sum": set_all_labels_to_ocr,                        # this column only contains OCRs
             "name": set_all_labels_to_ocr,                          # Manual check -> all OCRs
         }
+
+    def get_column_schema(self) -> dict:
+        return {
+            "cast_id": ColumnType.NUMBER,
+            "cast_person_id": ColumnType.NUMBER,
+            "cast_movie_id": ColumnType.NUMBER,
+            "cast_person_role_id": ColumnType.NUMBER,
+            "cast_note": ColumnType.STRING,
+            "cast_nr_order": ColumnType.NUMBER,
+            "cast_role_id": ColumnType.NUMBER,
+            "person_id": ColumnType.NUMBER,
+            "person_movie_id": ColumnType.NUMBER,
+            "person_info_type_id": ColumnType.NUMBER,
+            "extra_info": ColumnType.STRING,
+            "person_note": ColumnType.STRING,
+            "title_id": ColumnType.NUMBER,
+            "title": ColumnType.STRING,
+            "imdb_index": ColumnType.STRING,
+            "kind_id": ColumnType.NUMBER,
+            "production_year": ColumnType.NUMBER,
+            "phonetic_code": ColumnType.STRING,
+            "episode_of_id": ColumnType.NUMBER,
+            "season_nr": ColumnType.NUMBER,
+            "episode_nr": ColumnType.NUMBER,
+            "series_years": ColumnType.STRING,
+            "md5sum": ColumnType.STRING,
+            "name": ColumnType.STRING,
+        }
     
-    def _label_identical_columns(self):
-        all_numeric = self.dataset[self.dataset['title_id'].apply(is_a_number) & self.dataset['person_movie_id'].apply(is_a_number) & self.dataset['cast_movie_id'].apply(is_a_number)]
-        title_cast_match = all_numeric[(all_numeric['title_id'] != all_numeric['person_movie_id']) & (all_numeric['title_id'] == all_numeric['cast_movie_id'])] # person bad
-        title_person_match = all_numeric[(all_numeric['title_id'] != all_numeric['cast_movie_id']) & (all_numeric['title_id'] == all_numeric['person_movie_id'])] # cast bad
-        cast_person_match = all_numeric[(all_numeric['title_id'] != all_numeric['cast_movie_id']) & (all_numeric['cast_movie_id'] == all_numeric['person_movie_id'])] # title bad
+    def _get_wrong_person_movie_ids(self, columns: RowColumns) -> np.ndarray:
+        """
+        title_id, person_movie_id and cast_movie_id are the same movie. If two of them match, the third one has an OCR error.
+        """
+        return self._all_movie_ids_numeric(columns) & ~columns.equal('title_id', 'person_movie_id') & columns.equal('title_id', 'cast_movie_id')
+
+    def _get_wrong_cast_movie_ids(self, columns: RowColumns) -> np.ndarray:
+        return self._all_movie_ids_numeric(columns) & ~columns.equal('title_id', 'cast_movie_id') & columns.equal('title_id', 'person_movie_id')
+
+    def _get_wrong_title_ids(self, columns: RowColumns) -> np.ndarray:
+        return self._all_movie_ids_numeric(columns) & ~columns.equal('title_id', 'cast_movie_id') & columns.equal('cast_movie_id', 'person_movie_id')
 
-        self.labels.loc[title_cast_match.index, 'person_movie_id'] = ErrorType.OCR.value
-        self.labels.loc[title_person_match.index, 'cast_movie_id'] = ErrorType.OCR.value
-        self.labels.loc[cast_person_match.index, 'title_id'] = ErrorType.OCR.value
+    def _all_movie_ids_numeric(self, columns: RowColumns) -> np.ndarray:
+        return columns.all_numbers('title_id', 'person_movie_id', 'cast_movie_id')
 
     def _is_valid_phonetic_code(self, cell: str) -> int:
         """
@@ -109,23 +151,13 @@ class IMDBDetector(Detector):
             return 0
         return 1
 
-    def _is_valid_roman_numeral(self, cell: str) -> int:
-        """
-        Returns 0 if the cell is a valid Roman numeral, else 1.
-        Valid Roman numerals include I, II, III, IV, V, VI, VII, VIII, IX, X, etc.
-        This regex checks up to 3999 (MMMCMXCIX).
-        """
-        if re.fullmatch(r'M{0,3}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})', cell):
-            return 0
-        return 1
-
     def is_not_a_series_years(self, value: str) -> bool:
         """
         Check if a string is not a year (4-digit number).
         """
         tokens = self.tokenizer.tokenize_cell(value)
         for token in tokens:
-            if not token.isdigit() or len(token) != 4:
+            if not is_a_year_token(token):
                 return token
         return 0
 
@@ -134,7 +166,7 @@ class IMDBDetector(Detector):
         Check if a string is not a production year (4-digit number) in format YYYY.0.
         """
         tokens = self.tokenizer.tokenize_cell(value)
-        if not tokens[0].isdigit() or len(tokens[0]) != 4:
+        if not is_a_year_token(tokens[0]):
             return tokens[0]
         if not tokens[1].isdigit():
             return tokens[1]
@@ -150,42 +182,39 @@ class IMDBDetector(Detector):
             return 1
 
     def _label_phonetic_code(self, data_column: pd.Series, generic_labeled_cell_indices: pd.Index, generic_labeled_dataset) -> pd.Series:
-        label_column = pd.Series(0, index=data_column.index, dtype=int)
-        flawed_words_series = generic_labeled_dataset.loc[generic_labeled_cell_indices]
-        unique_flawed_words = flawed_words_series.unique()
-
-        error_word_map = {}
-        for word in unique_flawed_words:
-            if len(str(word)) > 5:
-                error_word_map[word] = ErrorType.TYPO.value
-            elif not str(word)[0].isupper():
-                error_word_map[word] = ErrorType.TYPO.value
-            else:
-                error_word_map[word] = ErrorType.OCR.value
-
-        # Remap results back to the original indices
-        for index, word in flawed_words_series.items():
-            if error_word_map.get(word, False):
-                label_column.loc[index] = error_word_map[word]
-
-        return label_column
+        return label_flawed_words(
+            data_column, generic_labeled_cell_indices, generic_labeled_dataset,
+            lambda unique_flawed_words: {word: self._classify_phonetic_code(word) for word in unique_flawed_words},
+        )
+
+    def _classify_phonetic_code(self, word) -> int:
+        if len(str(word)) > 5:
+            return ErrorType.TYPO.value
+        elif not str(word)[0].isupper():
+            return ErrorType.TYPO.value
+        return ErrorType.OCR.value
     
     def _is_not_a_valid_hash(self, value: str):
         return all(c in "0123456789abcdefABCDEF" for c in value)
 
-    def _label_cast_note_person_note_transpositions(self):
+    def _get_cast_note_person_note_transpositions(self, columns: RowColumns) -> np.ndarray:
         """
         The cast_note and person_note columns have transpositions. The rule we found (which does not hold in all cases) is that
         the cast_note is round braces, while the person_note is only sometimes in braces.
         """
-        person_note_in_braces = self.dataset[self.dataset['person_note'].str.startswith('(') & self.dataset['person_note'].str.endswith(')')]
-        self._label_word_transpositions(column_names=["cast_note", "person_note"], row_indices=person_note_in_braces.index)
+        return columns.map_values('person_note', is_in_round_braces)
  
-    def _label_cast_id_cast_person_id_transpositions(self):
+    def _get_cast_id_cast_person_id_transpositions(self, columns: RowColumns) -> np.ndarray:
         """
         The cast_id and cast_person_id columns have transpositions. cast_id always has 8 digits, cast_person_id always has 7 or less digits. 
         Therefore if cast_id has 7 digits, it was probably switched.
         """
-        both_numeric = self.dataset[self.dataset['cast_id'].apply(is_a_number) & self.dataset['cast_person_id'].apply(is_a_number)]
-        rainfall_contains_153712 = both_numeric[both_numeric['cast_id'].astype(str).str.len() != 8]
-        self._label_word_transpositions(column_names=["cast_id", "cast_person_id"], row_indices=rainfall_contains_153712.index)
\ No newline at end of file
+        return columns.all_numbers('cast_id', 'cast_person_id') & (columns.lengths('cast_id') != 8)
+
+
+def is_in_round_braces(value) -> bool:
+    return isinstance(value, str) and value.startswith('(') and value.endswith(')')
+
+
+def is_a_year_token(token: str) -> bool:
+    return token.isdigit() and len(token) == 4
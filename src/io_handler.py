@@ -1,8 +1,12 @@
+import hashlib
+import json
 import os
-import pickle
+from typing import Iterator
 
+import numpy as np
 import pandas as pd
 
+from dataset_cache import DatasetCache
 from error_types import ErrorType
 
 positives = {
@@ -30,20 +34,116 @@ positives = {
 }
 
 
+LABELS_STATE_VERSION = 2 # increase when the labeling rules change, so that the labels stored by incremental runs are recomputed
+
+
 class IOHandler():
-    def __init__(self, dataset_path):
+    def __init__(self, dataset_path, use_cache: bool = True):
         self.dataset_path = dataset_path
+        self.exported_label_counts = None
+        self.cache = DatasetCache(dataset_path) if use_cache else None
 
 
-    def import_dataset(self) -> pd.DataFrame:
+    def import_dataset(self, schema: dict = None, engine: str = "c") -> pd.DataFrame:
+        """
+        Reads the dataset. The columns of the schema are read as raw strings, which the label functions expect. Without a schema
+        pandas infers the types, which leaves mixed object columns.
+        Parameters:
+        - schema: dict - The ColumnType of each column, see Detector.get_column_schema.
+        - engine: str - The pandas CSV parser, "c" or "pyarrow" (faster on large files).
+        If the cache is enabled, the parsed dataset is stored in the dataset cache and later runs on the same file content
+        load it from there instead of parsing the CSV again.
+        """
         if not os.path.exists(self.dataset_path):
             raise FileNotFoundError(f"Dataset path {self.dataset_path} does not exist.")
-        dataset = pd.read_csv(self.dataset_path)
+
+        dtypes = self._get_dtypes(schema)
+        cache_name = "dataset_" + (hashlib.sha256(json.dumps(sorted(dtypes)).encode()).hexdigest()[:8] if dtypes else "inferred")
+        if self.cache is not None:
+            dataset = self.cache.load(cache_name)
+            if dataset is not None:
+                return dataset
+
+        dataset = pd.read_csv(self.dataset_path, dtype=dtypes, engine=engine)
+        if self.cache is not None:
+            self.cache.save(cache_name, dataset)
         return dataset
 
 
+    def import_dataset_in_chunks(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Reads the dataset in chunks of chunk_size rows. The row index continues over the chunks.
+        All values are read as strings (like the columns of the schema in the full import), so that the labels of a row don't
+        depend on whether the other rows of its chunk happen to be numbers.
+        """
+        if not os.path.exists(self.dataset_path):
+            raise FileNotFoundError(f"Dataset path {self.dataset_path} does not exist.")
+        return pd.read_csv(self.dataset_path, chunksize=chunk_size, dtype=str)
+
+
+    def _get_dtypes(self, schema: dict) -> dict:
+        if schema is None:
+            return None
+        return {column_name: str for column_name in schema}
+
+
     def export_labels(self, labels: pd.DataFrame):
+        labels.to_csv(self._get_labels_output_path(), index=False)
+
+        base_name, ext = os.path.splitext(os.path.basename(self.dataset_path))
+        self._print_percentage_of_labeled_cells(self._count_labels(labels), base_name)
+
+
+    def export_label_chunk(self, labels: pd.DataFrame, is_first_chunk: bool):
+        """
+        Appends the labels of a chunk to the labels file. The first chunk overwrites the file and writes the header.
+        The label counts are summed up for print_exported_label_statistics.
+        """
+        labels.to_csv(self._get_labels_output_path(), index=False, mode="w" if is_first_chunk else "a", header=is_first_chunk)
+
+        label_counts = self._count_labels(labels)
+        if is_first_chunk:
+            self.exported_label_counts = label_counts
+        else:
+            self.exported_label_counts = {key: self.exported_label_counts[key] + count for key, count in label_counts.items()}
+
+
+    def print_exported_label_statistics(self):
+        base_name, ext = os.path.splitext(os.path.basename(self.dataset_path))
+        self._print_percentage_of_labeled_cells(self.exported_label_counts, base_name)
+
+
+    def save_detection_state(self, row_fingerprints: np.ndarray, labels: np.ndarray, columns: pd.Index, rule_version: int):
+        """
+        Stores the row fingerprints and the label matrix of an incremental run next to the labels file, with the version of the
+        labeling rules they were computed with.
+        """
+        state_path = self._get_detection_state_path()
+        with open(state_path + ".tmp", "wb") as f:
+            np.savez(f, version=LABELS_STATE_VERSION, rule_version=rule_version, row_fingerprints=row_fingerprints, labels=labels, columns=np.asarray(columns, dtype=str))
+        os.replace(state_path + ".tmp", state_path)
+
+
+    def load_detection_state(self, rule_version: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the row fingerprints, the label matrix and the columns stored by the last incremental run, or None if there is
+        none or it was computed with another version of the labeling rules.
+        """
+        state_path = self._get_detection_state_path()
+        if not os.path.exists(state_path):
+            return None
+        with np.load(state_path) as state:
+            # the labels also depend on the classification of the flawed words, a new rule version invalidates them as well
+            if state["version"] != LABELS_STATE_VERSION or "rule_version" not in state or state["rule_version"] != rule_version:
+                return None
+            return state["row_fingerprints"], state["labels"], state["columns"]
+
+
+    def _get_detection_state_path(self) -> str:
+        return os.path.splitext(self._get_labels_output_path())[0] + "_state.npz"
+
 
+    def _get_labels_output_path(self) -> str:
         output_folder = os.path.dirname(self.dataset_path)
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
@@ -54,28 +154,41 @@ class IOHandler():
         else:
             labels_base_name = base_name + "_error_mappings"
 
-        labels_output_path = os.path.join(output_folder, f"{labels_base_name}{ext}")
-        labels.to_csv(labels_output_path, index=False)
+        return os.path.join(output_folder, f"{labels_base_name}{ext}")
 
-        self._print_percentage_of_labeled_cells(labels, base_name)
+
+    def _count_labels(self, labels: pd.DataFrame) -> dict:
+        """
+        Counts the cells of each error type. All counts are additive, so the counts of chunks can be summed up.
+        """
+        return {
+            "total_cells": labels.size,
+            "typos": labels.eq(ErrorType.TYPO.value).sum().sum(),
+            "misspellings": labels.eq(ErrorType.MISSPELLING.value).sum().sum(),
+            "ocrs": labels.eq(ErrorType.OCR.value).sum().sum(),
+            "transpositions": labels.eq(ErrorType.WORD_TRANSPOSITION.value).sum().sum(),
+            "labeled_rows": labels.ne(0).any(axis=1).sum(),
+        }
 
 
-    def _print_percentage_of_labeled_cells(self, labels: pd.DataFrame, base_name: str) -> float:
+    def _print_percentage_of_labeled_cells(self, label_counts: dict, base_name: str) -> float:
         """
         Returns the percentage of polluted cells in the dataset.
         """
-        total_cells = labels.size
-        num_typos = labels.eq(ErrorType.TYPO.value).sum().sum()
-        num_misspellings = labels.eq(ErrorType.MISSPELLING.value).sum().sum()
-        num_ocrs = labels.eq(ErrorType.OCR.value).sum().sum()
-        num_word_transpositions = labels.eq(ErrorType.WORD_TRANSPOSITION.value).sum().sum()
+        total_cells = label_counts["total_cells"]
+        num_typos = label_counts["typos"]
+        num_misspellings = label_counts["misspellings"]
+        num_ocrs = label_counts["ocrs"]
+        num_word_transpositions = label_counts["transpositions"]
         num_labeled_cells = num_typos + num_misspellings + num_ocrs + num_word_transpositions
-        num_labeled_rows = labels.ne(0).any(axis=1).sum()
+        num_labeled_rows = label_counts["labeled_rows"]
 
-        true_typos = positives[base_name]["typos"]
-        true_misspellings = positives[base_name]["misspellings"]
-        true_ocrs = positives[base_name]["ocrs"]
-        true_transpositions = positives[base_name]["transpositions"]
+        # the true numbers are only known for the original datasets
+        true_counts = positives.get(base_name, {})
+        true_typos = true_counts.get("typos", "?")
+        true_misspellings = true_counts.get("misspellings", "?")
+        true_ocrs = true_counts.get("ocrs", "?")
+        true_transpositions = true_counts.get("transpositions", "?")
 
         print(f"Number of labeled cells: {num_labeled_cells}, Number of labeled rows: {num_labeled_rows}.")
         print(f"Percentage of polluted cells: \t\t{num_labeled_cells / total_cells * 100:.2f}%")
@@ -85,29 +198,21 @@ class IOHandler():
         print(f"Percentage of transposition cells: \t{num_word_transpositions / total_cells * 100:.2f}%. \tTotal of {num_word_transpositions}/{true_transpositions} labeled.\n\n")
 
 
-    def save_pickled_dataset(self, dataset: pd.DataFrame):
-        output_folder = os.path.dirname(self.dataset_path)
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+    def save_tokenized_dataset(self, dataset: pd.DataFrame):
+        """
+        Stores a tokenized view of the dataset in the dataset cache. It is only loaded again for the same file content.
+        """
+        self._get_cache().save("tokenized", dataset)
 
-        base_name, ext = os.path.splitext(os.path.basename(self.dataset_path))
-        dataset_name = base_name.split('_')[0]
-        pickle_name = dataset_name + '_tokenized' 
 
-        dataset_output_path = os.path.join(output_folder, f"{pickle_name}.pkl")
-        with open(dataset_output_path, 'wb') as f:
-            pickle.dump(dataset, f)
+    def load_tokenized_dataset(self) -> pd.DataFrame:
+        dataset = self._get_cache().load("tokenized")
+        if dataset is None:
+            raise FileNotFoundError(f"No tokenized dataset is cached for the current content of {self.dataset_path}.")
+        return dataset
 
 
-    def load_pickled_dataset(self) -> pd.DataFrame:
-        base_name, ext = os.path.splitext(os.path.basename(self.dataset_path))
-        dataset_name = base_name.split('_')[0]
-        pickle_name = dataset_name + '_tokenized' 
-
-        dataset_output_path = os.path.join(os.path.dirname(self.dataset_path), f"{pickle_name}.pkl")
-        if not os.path.exists(dataset_output_path):
-            raise FileNotFoundError(f"Pickle file {dataset_output_path} does not exist.")
-        
-        with open(dataset_output_path, 'rb') as f:
-            dataset = pickle.load(f)
-        return dataset
+    def _get_cache(self) -> DatasetCache:
+        if self.cache is None:
+            raise ValueError("The dataset cache is disabled.")
+        return self.cache
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from error_types import ErrorType
+
+
+class LabelMatrix():
+    """
+    The ErrorType labels of a dataset as a contiguous uint8 matrix. It is stored column-major, because the detectors write the
+    labels column by column. One byte per cell instead of the eight of an int64 DataFrame.
+    Columns are read and written like in a DataFrame (labels[column_name]), cross-column rules use set_masked_cells.
+    """
+    def __init__(self, index: pd.Index, columns: pd.Index):
+        self.index = index
+        self.columns = columns
+        self.values = np.full((len(index), len(columns)), ErrorType.NO_ERROR.value, dtype=np.uint8, order="F")
+        self._column_positions = {column_name: position for position, column_name in enumerate(columns)}
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.values.shape
+
+    @property
+    def size(self) -> int:
+        return self.values.size
+
+    def __getitem__(self, column_name: str) -> pd.Series:
+        return pd.Series(self.values[:, self._column_positions[column_name]], index=self.index, name=column_name, copy=False)
+
+    def __setitem__(self, column_name: str, labels):
+        self.values[:, self._column_positions[column_name]] = np.asarray(labels, dtype=np.uint8)
+
+    def set_cells(self, row_indices: pd.Index, column_names: list[str], label: int):
+        """
+        Sets the label of the cells in the given rows (index labels) and columns.
+        """
+        row_positions = self.index.get_indexer(row_indices)
+        column_positions = [self._column_positions[column_name] for column_name in column_names]
+        self.values[np.ix_(row_positions, column_positions)] = label
+
+    def set_masked_cells(self, cell_labels: list[tuple[np.ndarray, list[str], int]]):
+        """
+        Sets the labels of several rules in one batch. Each rule is a (row mask, column names, label), the row mask has one
+        boolean per row. Where rules overlap, the later rule wins. Each column is written once.
+        """
+        column_rules = {}
+        for row_mask, column_names, label in cell_labels:
+            for column_name in column_names:
+                column_rules.setdefault(column_name, []).append((row_mask, label))
+
+        for column_name, rules in column_rules.items():
+            column_position = self._column_positions[column_name]
+            column_labels = self.values[:, column_position]
+            for row_mask, label in rules:
+                column_labels = np.where(row_mask, np.uint8(label), column_labels)
+            self.values[:, column_position] = column_labels
+
+    def replace(self, old_label: int, new_label: int):
+        """
+        Replaces a label in all cells, in place.
+        """
+        self.values[self.values == old_label] = new_label
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+
+
+class GenericLabels():
+    """
+    The results of the generic labeling. Which cells are flawed is stored as a boolean matrix, the offending values (the value or
+    token returned by the generic label function) are only stored for the flawed cells.
+    A column is returned as a Series of the offending values indexed by the flawed rows, which is what the specific label
+    functions select with generic_labeled_dataset.loc[generic_labeled_cell_indices].
+    """
+    def __init__(self, index: pd.Index, columns: pd.Index):
+        self.index = index
+        self.columns = columns
+        self.mask = np.zeros((len(index), len(columns)), dtype=bool, order="F")
+        self.offending_values = {}
+        self._column_positions = {column_name: position for position, column_name in enumerate(columns)}
+
+    def __getitem__(self, column_name: str) -> pd.Series:
+        if column_name not in self.offending_values:
+            return pd.Series([], index=self.index[:0], dtype=object)
+        return self.offending_values[column_name]
+
+    def __setitem__(self, column_name: str, offending_values: pd.Series):
+        """
+        Stores the offending values of a column. They have to be indexed by the flawed rows only.
+        """
+        column_position = self._column_positions[column_name]
+        self.mask[:, column_position] = False
+        self.mask[self.index.get_indexer(offending_values.index), column_position] = True
+        self.offending_values[column_name] = offending_values
+
+    def get_labeled_cell_indices(self, column_name: str) -> pd.Index:
+        return self.index[self.get_mask(column_name)]
+
+    def get_mask(self, column_name: str) -> np.ndarray:
+        """
+        Returns which cells of the column are flawed.
+        """
+        return self.mask[:, self._column_positions[column_name]]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the generic labels as a dense DataFrame with the offending value or 0 in each cell.
+        """
+        frame = pd.DataFrame(0, index=self.index, columns=self.columns, dtype=object)
+        for column_name, offending_values in self.offending_values.items():
+            frame.loc[offending_values.index, column_name] = offending_values
+        return frame
@@ -0,0 +1,237 @@
+import hashlib
+import multiprocessing
+import os
+import pkgutil
+import string
+import tempfile
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+from spellchecker import SpellChecker
+
+from constants import MISSPELLINGS_PATH, get_misspellings_list
+from lexicon_file import FORMAT_VERSION, LexiconFile, MappedStringTable, write_lexicon_file
+from resources import resources
+
+LEXICON_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "datasets", ".cache", "lexicons.bin")
+FALLBACK_LEXICON_FILE_PATH = os.path.join(tempfile.gettempdir(), "data_error_detection", "lexicons.bin") # if the cache folder is read-only
+PROCESS_ROLES = ("main", "worker")
+SPELLCHECKER_DICTIONARY = "resources/en.json.gz" # the English word frequency list of pyspellchecker
+
+
+class Lexicon():
+    """
+    An immutable, hashed collection of words. Membership checks are O(1) instead of the linear scan of a plain list.
+    The lowercased variant of all words is built once, so case-insensitive lookups don't have to rebuild a set per call.
+    """
+    def __init__(self, words: Iterable[str]):
+        self.words = frozenset(words)
+        self.lowercase_words = frozenset(word.lower() for word in self.words)
+
+    def __contains__(self, word) -> bool:
+        return word in self.words
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def contains_lowercase(self, word: str) -> bool:
+        return word.lower() in self.lowercase_words
+
+
+class MappedLexicon(Lexicon):
+    """
+    A lexicon whose words and lowercased words are tables of the memory-mapped lexicon file instead of frozensets.
+    """
+    def __init__(self, words: MappedStringTable, lowercase_words: MappedStringTable):
+        self.words = words
+        self.lowercase_words = lowercase_words
+
+
+class SpellVocabulary():
+    """
+    The dictionary of a SpellChecker, exported once into a frozenset (or mapped from the lexicon file). Lookups give the same
+    results as the SpellChecker, but don't go through its per-call unicode and case handling, and unknown_many checks a whole
+    batch of words at once instead of building a list and a set for every word like spell.unknown([word]).
+    The vocabulary is case-insensitive like the SpellChecker, its words are lowercase.
+    Parameters:
+    - words: frozenset | MappedStringTable - The words of the SpellChecker dictionary.
+    - longest_word_length: int - The length of the longest word, longer words are not checked by the SpellChecker.
+    """
+    def __init__(self, words: frozenset | MappedStringTable, longest_word_length: int):
+        self.words = words
+        self.lowercase_words = words
+        self.longest_word_length = longest_word_length
+
+    def __contains__(self, word) -> bool:
+        if isinstance(word, bytes):
+            word = word.decode("utf-8")
+        return word.lower() in self.words
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def is_unknown(self, word: str) -> bool:
+        """
+        Same as bool(spell.unknown([word])): words which the SpellChecker doesn't check (numbers, single punctuation characters,
+        very long words) are never unknown.
+        """
+        if isinstance(word, bytes):
+            word = word.decode("utf-8")
+        return word.lower() not in self.words and self._should_check(word)
+
+    def unknown_many(self, words: Iterable[str]) -> np.ndarray:
+        """
+        Returns a boolean array, which tells for each word whether it is unknown. All words are looked up at once, the more
+        expensive check whether the SpellChecker would check a word only runs for the words which are not in the vocabulary.
+        """
+        words = [word.decode("utf-8") if isinstance(word, bytes) else word for word in words]
+        vocabulary = self.words
+        is_unknown = np.fromiter((word.lower() not in vocabulary for word in words), dtype=bool, count=len(words))
+        for position in np.flatnonzero(is_unknown):
+            is_unknown[position] = self._should_check(words[position])
+        return is_unknown
+
+    def _should_check(self, word: str) -> bool:
+        """
+        Same as SpellChecker._check_if_should_check.
+        """
+        if len(word) == 1 and word in string.punctuation:
+            return False
+        if len(word) > self.longest_word_length + 3:
+            return False
+        if word.lower() == "nan": # nan passes the float conversion, but is checked by the SpellChecker
+            return True
+        try:
+            float(word)
+            return False
+        except ValueError:
+            return True
+
+
+def get_spell_checker_vocabulary(spell_checker: SpellChecker) -> SpellVocabulary:
+    return SpellVocabulary(frozenset(spell_checker.word_frequency.dictionary), spell_checker.word_frequency.longest_word_length)
+
+
+def build_lexicon_file(path: str = LEXICON_FILE_PATH):
+    """
+    Compiles the SpellChecker dictionary and the misspellings into the lexicon file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    spell_vocabulary = get_spell_checker_vocabulary(SpellChecker())
+    misspellings = Lexicon(get_misspellings_list())
+    write_lexicon_file(
+        path,
+        {
+            "spell_vocabulary": spell_vocabulary.words,
+            "misspellings": misspellings.words,
+            "misspellings_lowercase": misspellings.lowercase_words,
+        },
+        fingerprint=get_lexicon_sources_fingerprint(),
+        metadata={"spell_vocabulary": {"longest_word_length": spell_vocabulary.longest_word_length}},
+    )
+
+
+def get_lexicon_sources_fingerprint() -> str:
+    """
+    Hash of everything the lexicon file is built from, so that a file built from an old misspellings list or another
+    pyspellchecker version is rebuilt.
+    """
+    fingerprint = hashlib.sha256(str(FORMAT_VERSION).encode())
+    with open(MISSPELLINGS_PATH, "rb") as f:
+        fingerprint.update(f.read())
+    fingerprint.update(pkgutil.get_data("spellchecker", SPELLCHECKER_DICTIONARY))
+    return fingerprint.hexdigest()
+
+
+def load_lexicon_file() -> LexiconFile:
+    """
+    Maps the lexicon file. It is built first, if it is missing or was built from other sources. The file is kept in the
+    datasets/.cache folder, or in the temporary folder if that one can't be written.
+    """
+    fingerprint = get_lexicon_sources_fingerprint()
+    for path in (LEXICON_FILE_PATH, FALLBACK_LEXICON_FILE_PATH):
+        if os.path.exists(path):
+            try:
+                lexicon_file = LexiconFile(path)
+                if lexicon_file.fingerprint == fingerprint:
+                    return lexicon_file
+            except (OSError, ValueError): # a broken file is rebuilt
+                pass
+        try:
+            build_lexicon_file(path)
+        except OSError:
+            if path == FALLBACK_LEXICON_FILE_PATH:
+                raise
+            continue
+        return LexiconFile(path)
+
+
+def preload_for_workers():
+    """
+    Prepares the vocabularies before a process pool starts. Forked workers inherit the vocabularies loaded here, spawned workers
+    map the lexicon file, which is built here (if needed) instead of in every worker.
+    """
+    if multiprocessing.get_start_method() == "fork":
+        resources.preload(["misspellings", "spell_vocabulary"])
+    else:
+        resources.preload(["lexicon_file"])
+
+
+def set_process_role(role: str):
+    """
+    Sets whether this process is the "main" process (the default) or a "worker" of a detector. Workers map the vocabularies
+    from the lexicon file, so the detector sets the role in the initializer of its worker processes.
+    """
+    global _process_role
+    if role not in PROCESS_ROLES:
+        raise ValueError(f"Unknown process role {role}, expected one of {PROCESS_ROLES}.")
+    _process_role = role
+
+
+def _load_misspellings() -> Lexicon:
+    if _process_role == "worker": # workers share the pages of the mapped file, instead of each building its own sets
+        lexicon_file = resources.get("lexicon_file")
+        return MappedLexicon(lexicon_file.get_table("misspellings"), lexicon_file.get_table("misspellings_lowercase"))
+    return Lexicon(get_misspellings_list())
+
+
+def _load_spell_vocabulary() -> SpellVocabulary:
+    if _process_role == "worker":
+        lexicon_file = resources.get("lexicon_file")
+        return SpellVocabulary(lexicon_file.get_table("spell_vocabulary"), lexicon_file.get_metadata("spell_vocabulary")["longest_word_length"])
+    return get_spell_checker_vocabulary(SpellChecker())
+
+
+# The main process uses frozensets, which have the fastest lookups. Worker processes which are spawned (and don't inherit the
+# objects of the main process like forked workers) memory-map the vocabularies from the lexicon file instead.
+_process_role = "main"
+resources.register("lexicon_file", load_lexicon_file)
+resources.register("misspellings", _load_misspellings)
+resources.register("spell_vocabulary", _load_spell_vocabulary)
+
+
+def get_misspellings() -> Lexicon:
+    """
+    Returns the lexicon of common misspellings. It is loaded on the first call and shared by the whole process.
+    """
+    return resources.get("misspellings")
+
+
+def get_spell_vocabulary() -> SpellVocabulary:
+    """
+    Returns the vocabulary of the English SpellChecker. It is loaded on the first call and shared by the whole process.
+    """
+    return resources.get("spell_vocabulary")
+
+
+@lru_cache(maxsize=None)
+def get_categorical_lexicon(categorical_values: tuple[str, ...]) -> Lexicon:
+    """
+    Returns the lexicon for a list of categorical values. The lexicon is built once per distinct list of values
+    and shared by all detectors and columns using the same values.
+    """
+    return Lexicon(categorical_values)
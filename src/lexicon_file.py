@@ -0,0 +1,160 @@
+import json
+import mmap
+import os
+import tempfile
+import zlib
+from typing import Iterable
+
+import numpy as np
+
+MAGIC = b"LEXICONS"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+HEADER_LENGTH_SIZE = 8
+
+
+class MappedStringTable():
+    """
+    A read-only set of strings inside a memory-mapped lexicon file. The strings are stored sorted and UTF-8 encoded, one after
+    the other, with an offset table. Membership checks go through an open-addressing hash index (CRC-32, linear probing).
+    Nothing is copied into the heap of the process, so all processes mapping the same file share the physical pages.
+    A lookup takes about a microsecond, a few times more than in a frozenset.
+    """
+    def __init__(self, buffer: memoryview, table: dict):
+        self._offsets = _get_section(buffer, table["offsets"]).cast("I")
+        self._slots = _get_section(buffer, table["slots"]).cast("I")
+        self._data = _get_section(buffer, table["data"])
+        self._mask = len(self._slots) - 1
+        self._count = table["count"]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        """
+        Yields the strings in sorted order (by code point).
+        """
+        for position in range(self._count):
+            yield str(self._get_bytes(position), "utf-8", "surrogatepass")
+
+    def __contains__(self, word) -> bool:
+        if not isinstance(word, str):
+            return False
+        key = word.encode("utf-8", "surrogatepass")
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            entry = self._slots[slot]
+            if entry == 0:
+                return False
+            if self._get_bytes(entry - 1) == key:
+                return True
+            slot = (slot + 1) & self._mask
+
+    def contains_many(self, words: Iterable[str]) -> np.ndarray:
+        words = list(words)
+        return np.fromiter((word in self for word in words), dtype=bool, count=len(words))
+
+    def _get_bytes(self, position: int) -> memoryview:
+        return self._data[self._offsets[position]:self._offsets[position + 1]]
+
+
+class LexiconFile():
+    """
+    A read-only binary file with named string tables, memory-mapped on opening.
+    Layout: the magic bytes, the length of the JSON header, the header (fingerprint, metadata and the position of each section),
+    then the 8-byte aligned sections: per table the offsets (uint32), the hash index slots (uint32) and the string data.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a lexicon file.")
+        header_length = int.from_bytes(self._buffer[len(MAGIC):len(MAGIC) + HEADER_LENGTH_SIZE], "little")
+        header_start = len(MAGIC) + HEADER_LENGTH_SIZE
+        self.header = json.loads(bytes(self._buffer[header_start:header_start + header_length]))
+        if self.header["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {self.header['format_version']}, expected {FORMAT_VERSION}.")
+        self._tables = {}
+
+    @property
+    def fingerprint(self) -> str:
+        return self.header["fingerprint"]
+
+    def get_table(self, name: str) -> MappedStringTable:
+        if name not in self._tables:
+            self._tables[name] = MappedStringTable(self._buffer, self.header["tables"][name])
+        return self._tables[name]
+
+    def get_metadata(self, name: str) -> dict:
+        return self.header["tables"][name]["metadata"]
+
+
+def write_lexicon_file(path: str, tables: dict[str, Iterable[str]], fingerprint: str, metadata: dict[str, dict] = None):
+    """
+    Writes the string tables (name -> strings) into a lexicon file. Duplicates are removed, the strings are stored sorted.
+    The file is written to a unique temporary file in the same folder first and then moved, so processes which already mapped
+    the old file keep reading it, no process ever maps a partially written file and processes building it at once don't
+    write into the same file.
+    """
+    metadata = metadata or {}
+    header = {"format_version": FORMAT_VERSION, "fingerprint": fingerprint, "tables": {}}
+    sections = []
+    position = 0
+    for name, strings in tables.items():
+        encoded_strings = sorted({string.encode("utf-8", "surrogatepass") for string in strings})
+        offsets, slots, data = _build_table(encoded_strings)
+        table = {"count": len(encoded_strings), "metadata": metadata.get(name, {})}
+        for section_name, section in (("offsets", offsets.tobytes()), ("slots", slots.tobytes()), ("data", data)):
+            table[section_name] = [position, len(section)]
+            sections.append(section)
+            position += _get_padded_length(len(section))
+        header["tables"][name] = table
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (_get_padded_length(len(MAGIC) + HEADER_LENGTH_SIZE + len(header_bytes)) - len(MAGIC) - HEADER_LENGTH_SIZE - len(header_bytes))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header_bytes).to_bytes(HEADER_LENGTH_SIZE, "little"))
+            f.write(header_bytes)
+            for section in sections:
+                f.write(section)
+                f.write(b"\x00" * (_get_padded_length(len(section)) - len(section)))
+        os.chmod(temporary_path, 0o644) # mkstemp creates the file readable by the owner only
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _build_table(encoded_strings: list[bytes]) -> tuple[np.ndarray, np.ndarray, bytes]:
+    offsets = np.zeros(len(encoded_strings) + 1, dtype=np.uint32)
+    np.cumsum([len(string) for string in encoded_strings], out=offsets[1:])
+
+    number_of_slots = 1 << max(int(np.ceil(np.log2(max(len(encoded_strings), 1) * 2))), 1) # at most half of the slots are used
+    slots = np.zeros(number_of_slots, dtype=np.uint32)
+    mask = number_of_slots - 1
+    for position, string in enumerate(encoded_strings):
+        slot = zlib.crc32(string) & mask
+        while slots[slot] != 0:
+            slot = (slot + 1) & mask
+        slots[slot] = position + 1 # 0 marks an empty slot
+    return offsets, slots, b"".join(encoded_strings)
+
+
+def _get_section(buffer: memoryview, section: list[int]) -> memoryview:
+    """
+    The section positions in the header are relative to the end of the header.
+    """
+    magic_and_length = len(MAGIC) + HEADER_LENGTH_SIZE
+    sections_start = magic_and_length + int.from_bytes(buffer[len(MAGIC):magic_and_length], "little")
+    start, length = section
+    return buffer[sections_start + start:sections_start + start + length]
+
+
+def _get_padded_length(length: int) -> int:
+    return (length + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
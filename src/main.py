@@ -1,20 +1,46 @@
 from imdb_detector import IMDBDetector
 from medical_detector import MedicalDetector
+from profiler import Profiler
+from utils.specific_label_utils import word_classification_cache
 from weather_detector import WeatherDetector
 
+N_WORKERS = 1 # number of processes labeling columns in parallel, 1 labels all columns in the main process
+WORKER_BACKEND = "pickle" # how the columns get to the workers, "pickle" or "shared_memory"
+CHUNK_SIZE = None # number of rows streamed at once, None loads the whole dataset
+CSV_ENGINE = "c" # "pyarrow" parses large files faster
+USE_DATASET_CACHE = True # load the parsed datasets from datasets/.cache, if the CSV files didn't change
+INCREMENTAL = False # only relabel rows which changed since the last run (the state is stored next to the error mappings)
+PROFILE = False # print the time and memory of each phase, column and rule and store them in datasets/<dataset>_profile.json
+
 
 def main():
-    imdb_detector = IMDBDetector("../datasets/imdb_subset1_group1_w_errors.csv")
+    imdb_detector = IMDBDetector("../datasets/imdb_subset1_group1_w_errors.csv", n_workers=N_WORKERS, chunk_size=CHUNK_SIZE, csv_engine=CSV_ENGINE, use_cache=USE_DATASET_CACHE, incremental=INCREMENTAL, profiler=Profiler() if PROFILE else None, worker_backend=WORKER_BACKEND)
     imdb_detector.detect()
+    imdb_detector.print_dedup_report()
     imdb_detector.export()
+    print_profile(imdb_detector, "../datasets/imdb_profile.json")
 
-    weather_detector = WeatherDetector("../datasets/weather_subset1_group1_w_errors.csv")
+    weather_detector = WeatherDetector("../datasets/weather_subset1_group1_w_errors.csv", n_workers=N_WORKERS, chunk_size=CHUNK_SIZE, csv_engine=CSV_ENGINE, use_cache=USE_DATASET_CACHE, incremental=INCREMENTAL, profiler=Profiler() if PROFILE else None, worker_backend=WORKER_BACKEND)
     weather_detector.detect()
+    weather_detector.print_dedup_report()
     weather_detector.export()
+    print_profile(weather_detector, "../datasets/weather_profile.json")
 
-    medical_detector = MedicalDetector("../datasets/medical_subset1_group1_w_errors.csv")
+    medical_detector = MedicalDetector("../datasets/medical_subset1_group1_w_errors.csv", n_workers=N_WORKERS, chunk_size=CHUNK_SIZE, csv_engine=CSV_ENGINE, use_cache=USE_DATASET_CACHE, incremental=INCREMENTAL, profiler=Profiler() if PROFILE else None, worker_backend=WORKER_BACKEND)
     medical_detector.detect()
+    medical_detector.print_dedup_report()
     medical_detector.export()
+    print_profile(medical_detector, "../datasets/medical_profile.json")
+
+    if word_classification_cache is not None: # only the lookups of the main process, with N_WORKERS > 1 the workers' lookups are missing
+        statistics = word_classification_cache.get_statistics()
+        print(f"Word classification cache: {statistics['hits']} hits, {statistics['misses']} misses ({statistics['hit_rate'] * 100:.1f}% hit rate).")
+
+
+def print_profile(detector, report_path: str):
+    if detector.profiler is not None:
+        detector.profiler.print_report()
+        detector.profiler.save_report(report_path)
 
 if __name__ == "__main__":
     main()
@@ -1,40 +1,55 @@
 from functools import partial
 
+import numpy as np
+
+from column_schema import ColumnType
+from cross_column_rules import CrossColumnRule, RowColumns
 from detector import Detector
 from constants import MEDICAL_SPECIALTY_VALUES
-from utils.generic_label_utils import check_with_spelling_library, is_not_a_number, is_not_a_number_in_range
+from profiler import Profiler
+from utils.generic_label_rules import MemberOfSetRule, NumericRangeRule, NumericRule, SpellingRule
 from utils.specific_label_utils import (
     differentiate_errors_in_number_column,
     differentiate_errors_in_string_column,
     set_all_labels_to_ocr,
 )
 
+NO_STEADY_UP_DOWN_VALUES = ['No', 'Steady', 'Up', 'Down']
+MAX_GLU_SERUM_VALUES = ['Norm', 'Not Available', '>200', '>300']
+A1C_RESULT_VALUES = ['Norm','Not Available', '>7', '>8']
+RACE_VALUES = ['Caucasian', 'AfricanAmerican', 'Asian', 'Hispanic', 'Other']
+GENDER_VALUES = ['Male', 'Female']
+
 
 class MedicalDetector(Detector):
-    def __init__(self, dataset_path: str):
-        super().__init__(dataset_path)
+    def __init__(self, dataset_path: str, n_workers: int = 1, chunk_size: int = None, csv_engine: str = "c", use_cache: bool = True, incremental: bool = False, profiler: Profiler = None, worker_backend: str = "pickle"):
+        super().__init__(dataset_path, n_workers, chunk_size, csv_engine, use_cache, incremental, profiler, worker_backend)
 
     def detect(self):
         print(f"--- Medical Diabetes Dataset ---")
-        print(f"Number of cells: {self.dataset.size}, Number of rows: {self.dataset.shape[0]}")
-
         super().detect()
-        self._label_diabetesMed_change_transpositions()
+
+    def get_cross_column_rules(self) -> list[CrossColumnRule]:
+        return [CrossColumnRule(["diabetesMed", "change"], self._get_diabetesMed_change_transpositions)]
 
     def get_column_generic_label_mapping(self) -> dict:
+        is_not_a_number = NumericRule()
+        check_spelling = SpellingRule()
+        check_not_in_No_Steady_Up_Down = MemberOfSetRule(NO_STEADY_UP_DOWN_VALUES, strip=True)
+
         return {
             "encounter_id": is_not_a_number,
             "patient_nbr": is_not_a_number,
-            "race": self._is_not_a_valid_race,
-            "gender": self._is_not_male_female,
+            "race": MemberOfSetRule(RACE_VALUES),
+            "gender": MemberOfSetRule(GENDER_VALUES),
             "age": is_not_a_number,
             "weight": is_not_a_number,
             "admission_type_id": is_not_a_number,
             "discharge_disposition_id": is_not_a_number,
             "admission_source_id": is_not_a_number,
-            "time_in_hospital": partial(is_not_a_number_in_range, min_value=0, max_value=30),
+            "time_in_hospital": NumericRangeRule(min_value=0, max_value=30),
             "payer_code": self._check_payer_code_is_MC,
-            "medical_specialty": check_with_spelling_library,
+            "medical_specialty": check_spelling,
             "num_lab_procedures": is_not_a_number,
             "num_procedures": is_not_a_number,
             "num_medications": is_not_a_number,
@@ -42,46 +57,46 @@ class MedicalDetector(Detector):
             "number_emergency": is_not_a_number,
             "number_inpatient": is_not_a_number,
             "diag_1": is_not_a_number,
-            "diag_2": check_with_spelling_library,
-            "diag_3": check_with_spelling_library,
-            "number_diagnoses": check_with_spelling_library,
-            "max_glu_serum": self._not_a_max_glu_serum,
-            "A1Cresult": self._not_a_a1c_result,
-            "metformin": self._check_not_in_No_Steady_Up_Down,
-            "repaglinide": self._check_not_in_No_Steady_Up_Down,
-            "nateglinide": self._check_not_in_No_Steady_Up_Down,
-            "chlorpropamide": self._check_not_in_No_Steady_Up_Down,
-            "glimepiride": self._check_not_in_No_Steady_Up_Down,
-            "acetohexamide": self._check_not_in_No_Steady_Up_Down,
-            "glipizide": self._check_not_in_No_Steady_Up_Down,
-            "glyburide": self._check_not_in_No_Steady_Up_Down,
-            "tolbutamide": self._check_not_in_No_Steady_Up_Down,
-            "pioglitazone": self._check_not_in_No_Steady_Up_Down,
-            "rosiglitazone": self._check_not_in_No_Steady_Up_Down,
-            "acarbose": self._check_not_in_No_Steady_Up_Down,
-            "miglitol": self._check_not_in_No_Steady_Up_Down,
-            "troglitazone": self._check_not_in_No_Steady_Up_Down,
-            "tolazamide": self._check_not_in_No_Steady_Up_Down,
-            "examide": self._check_not_in_No_Steady_Up_Down,
-            "citoglipton": self._check_not_in_No_Steady_Up_Down,
-            "insulin": self._check_not_in_No_Steady_Up_Down,
-            "glyburide-metformin": self._check_not_in_No_Steady_Up_Down,
-            "glipizide-metformin": self._check_not_in_No_Steady_Up_Down,
-            "glimepiride-pioglitazone": self._check_not_in_No_Steady_Up_Down,
-            "metformin-rosiglitazone": self._check_not_in_No_Steady_Up_Down,
-            "metformin-pioglitazone": self._check_not_in_No_Steady_Up_Down,
-            "change": check_with_spelling_library,
-            "diabetesMed": check_with_spelling_library,
-            "readmitted": check_with_spelling_library,
-            "admission_type_desc": check_with_spelling_library,
-            "admission_source_desc": check_with_spelling_library,
-            "discharge_disposition_desc": check_with_spelling_library,
+            "diag_2": check_spelling,
+            "diag_3": check_spelling,
+            "number_diagnoses": check_spelling,
+            "max_glu_serum": MemberOfSetRule(MAX_GLU_SERUM_VALUES, strip=True),
+            "A1Cresult": MemberOfSetRule(A1C_RESULT_VALUES, strip=True),
+            "metformin": check_not_in_No_Steady_Up_Down,
+            "repaglinide": check_not_in_No_Steady_Up_Down,
+            "nateglinide": check_not_in_No_Steady_Up_Down,
+            "chlorpropamide": check_not_in_No_Steady_Up_Down,
+            "glimepiride": check_not_in_No_Steady_Up_Down,
+            "acetohexamide": check_not_in_No_Steady_Up_Down,
+            "glipizide": check_not_in_No_Steady_Up_Down,
+            "glyburide": check_not_in_No_Steady_Up_Down,
+            "tolbutamide": check_not_in_No_Steady_Up_Down,
+            "pioglitazone": check_not_in_No_Steady_Up_Down,
+            "rosiglitazone": check_not_in_No_Steady_Up_Down,
+            "acarbose": check_not_in_No_Steady_Up_Down,
+            "miglitol": check_not_in_No_Steady_Up_Down,
+            "troglitazone": check_not_in_No_Steady_Up_Down,
+            "tolazamide": check_not_in_No_Steady_Up_Down,
+            "examide": check_not_in_No_Steady_Up_Down,
+            "citoglipton": check_not_in_No_Steady_Up_Down,
+            "insulin": check_not_in_No_Steady_Up_Down,
+            "glyburide-metformin": check_not_in_No_Steady_Up_Down,
+            "glipizide-metformin": check_not_in_No_Steady_Up_Down,
+            "glimepiride-pioglitazone": check_not_in_No_Steady_Up_Down,
+            "metformin-rosiglitazone": check_not_in_No_Steady_Up_Down,
+            "metformin-pioglitazone": check_not_in_No_Steady_Up_Down,
+            "change": check_spelling,
+            "diabetesMed": check_spelling,
+            "readmitted": check_spelling,
+            "admission_type_desc": check_spelling,
+            "admission_source_desc": check_spelling,
+            "discharge_disposition_desc": check_spelling,
         }
 
 
     def get_column_specific_label_mapping(self) -> dict:
         # TODO: using a categorical_values_list greatly DECREASES the number of typos and misspelings and INCREASES the number of OCR errors, check if this is correct
-        no_steady_up_down_func = partial(differentiate_errors_in_string_column, categorical_values=['No', 'Steady', 'Up', 'Down'])
+        no_steady_up_down_func = partial(differentiate_errors_in_string_column, categorical_values=NO_STEADY_UP_DOWN_VALUES)
         medical_specialty_func = partial(differentiate_errors_in_string_column, categorical_values=MEDICAL_SPECIALTY_VALUES)
 
         return {
@@ -139,6 +154,63 @@ class MedicalDetector(Detector):
             "admission_source_desc": differentiate_errors_in_string_column,
             "discharge_disposition_desc": differentiate_errors_in_string_column,
         }
+
+    def get_column_schema(self) -> dict:
+        return {
+            "encounter_id": ColumnType.NUMBER,
+            "patient_nbr": ColumnType.NUMBER,
+            "race": ColumnType.STRING,
+            "gender": ColumnType.STRING,
+            "age": ColumnType.NUMBER,
+            "weight": ColumnType.NUMBER,
+            "admission_type_id": ColumnType.NUMBER,
+            "discharge_disposition_id": ColumnType.NUMBER,
+            "admission_source_id": ColumnType.NUMBER,
+            "time_in_hospital": ColumnType.NUMBER,
+            "payer_code": ColumnType.STRING,
+            "medical_specialty": ColumnType.STRING,
+            "num_lab_procedures": ColumnType.NUMBER,
+            "num_procedures": ColumnType.NUMBER,
+            "num_medications": ColumnType.NUMBER,
+            "number_outpatient": ColumnType.NUMBER,
+            "number_emergency": ColumnType.NUMBER,
+            "number_inpatient": ColumnType.NUMBER,
+            "diag_1": ColumnType.NUMBER,
+            "diag_2": ColumnType.STRING,
+            "diag_3": ColumnType.STRING,
+            "number_diagnoses": ColumnType.NUMBER,
+            "max_glu_serum": ColumnType.STRING,
+            "A1Cresult": ColumnType.STRING,
+            "metformin": ColumnType.STRING,
+            "repaglinide": ColumnType.STRING,
+            "nateglinide": ColumnType.STRING,
+            "chlorpropamide": ColumnType.STRING,
+            "glimepiride": ColumnType.STRING,
+            "acetohexamide": ColumnType.STRING,
+            "glipizide": ColumnType.STRING,
+            "glyburide": ColumnType.STRING,
+            "tolbutamide": ColumnType.STRING,
+            "pioglitazone": ColumnType.STRING,
+            "rosiglitazone": ColumnType.STRING,
+            "acarbose": ColumnType.STRING,
+            "miglitol": ColumnType.STRING,
+            "troglitazone": ColumnType.STRING,
+            "tolazamide": ColumnType.STRING,
+            "examide": ColumnType.STRING,
+            "citoglipton": ColumnType.STRING,
+            "insulin": ColumnType.STRING,
+            "glyburide-metformin": ColumnType.STRING,
+            "glipizide-metformin": ColumnType.STRING,
+            "glimepiride-pioglitazone": ColumnType.STRING,
+            "metformin-rosiglitazone": ColumnType.STRING,
+            "metformin-pioglitazone": ColumnType.STRING,
+            "change": ColumnType.STRING,
+            "diabetesMed": ColumnType.STRING,
+            "readmitted": ColumnType.STRING,
+            "admission_type_desc": ColumnType.STRING,
+            "admission_source_desc": ColumnType.STRING,
+            "discharge_disposition_desc": ColumnType.STRING,
+        }
     
     def _check_payer_code_is_MC(self, payer_code: str) -> bool:
         """
@@ -147,43 +219,9 @@ class MedicalDetector(Detector):
         """
         return not payer_code.strip().upper() == "MC"
 
-    def _check_not_in_No_Steady_Up_Down(self, word: str) -> bool:
-        """
-        Check if the word is not in the '[No, Steady, Up, Down]' list.
-        It returns the misspelled word, if it is not in the list (invalid), otherwise it returns 0 (valid).
-        """
-        if not str(word).strip() in ['No', 'Steady', 'Up', 'Down']:
-            return word
-        return 0
-
-    def _not_a_max_glu_serum(self, word: str) -> bool:
-        if not str(word).strip() in ['Norm', 'Not Available', '>200', '>300']:
-            return word
-        return 0
-    
-    def _not_a_a1c_result(self, word:str) -> bool:
-        if not str(word).strip() in ['Norm','Not Available', '>7', '>8']:
-            return word
-        return 0
-
-    def _is_not_a_valid_race(self, race: str) -> bool:
-        """
-        Check if the race is not a valid race.
-        It returns 1, if the race is not a valid race, otherwise it returns 0.
-        """
-        return not str(race) in ['Caucasian', 'AfricanAmerican', 'Asian', 'Hispanic', 'Other']
-
-    def _is_not_male_female(self, gender: str) -> bool:
-        """
-        Check if the gender is not a valid gender.
-        It returns 1, if the gender is not a valid gender, otherwise it returns 0.
-        """
-        return not str(gender) in ['Male', 'Female']
-
-    def _label_diabetesMed_change_transpositions(self):
+    def _get_diabetesMed_change_transpositions(self, columns: RowColumns) -> np.ndarray:
         """
         The diabetesMed and change columns have transpositions. The rule we found is that if Ch appears in the diabetesMed column,
         the columns are probably switched.
         """
-        change_in_diabetes_med = self.dataset[self.dataset['diabetesMed'] == "Ch"]
-        self._label_word_transpositions(column_names=["diabetesMed", "change"], row_indices=change_in_diabetes_med.index)
+        return columns.map_values('diabetesMed', lambda value: value == "Ch")
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from io_handler import IOHandler
+from rule_mining import TranspositionMiner, print_candidates, print_profiles
+
+CHUNK_SIZE = 500_000
+
+
+def main():
+    """
+    Profiles the columns of a dataset and proposes transposition rules ("a value typical for column A appears in column B"),
+    with their support in the target column. Run it from the src folder, e.g. with
+    `python mine_transposition_rules.py ../datasets/weather_subset1_group1_w_errors.csv --verify`.
+    The dataset is read in chunks and each column is summarized in sketches, so the memory doesn't grow with the rows.
+    """
+    parser = argparse.ArgumentParser(description="Propose transposition rules for a dataset.")
+    parser.add_argument("dataset_path")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--min-support", type=int, default=None, help="minimum number of rows of a candidate in the target column")
+    parser.add_argument("--max-candidates", type=int, default=30, help="number of printed candidates")
+    parser.add_argument("--verify", action="store_true", help="count the exact support of the printed candidates (reads the dataset again)")
+    parser.add_argument("--output", default=None, help="write the profiles and all candidates to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    io_handler = IOHandler(args.dataset_path, use_cache=False)
+    miner = TranspositionMiner()
+    for chunk in io_handler.import_dataset_in_chunks(args.chunk_size):
+        miner.update(chunk)
+    profile_time = time.perf_counter() - start
+    start = time.perf_counter()
+    candidates = miner.get_candidates() if args.min_support is None else miner.get_candidates(min_support=args.min_support)
+    pair_time = time.perf_counter() - start
+
+    print_profiles(miner.get_profiles())
+    print()
+    print_candidates(candidates, args.max_candidates)
+    print(f"Profiled {len(miner.sketches)} columns in {profile_time:.2f} s, scanned {len(miner.sketches) * (len(miner.sketches) - 1)} column pairs in {pair_time:.3f} s.")
+
+    if args.verify:
+        printed_candidates = candidates[:args.max_candidates]
+        exact_supports = [0] * len(printed_candidates)
+        for chunk in io_handler.import_dataset_in_chunks(args.chunk_size):
+            exact_supports = [total + support for total, support in zip(exact_supports, miner.verify(chunk, printed_candidates))]
+        print("Exact support of the printed candidates (sketch estimate):")
+        for candidate, exact_support in zip(printed_candidates, exact_supports):
+            print(f"  {candidate.source_column} -> {candidate.target_column} {candidate.value!r}: {exact_support} ({candidate.support})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"profiles": miner.get_profiles(), "candidates": [candidate.to_dict() for candidate in candidates]}, f, indent=2, default=str)
+        print(f"Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import math
+import re
+from functools import lru_cache
+
+from constants import OCR_LETTER_TO_NUMBER_MAPPING, OCR_NUMBER_TO_NUMBER_MAPPING
+
+MAX_SEARCHED_CHARACTERS = 50 # longer numbers are no plausible values of a range
+RELATIVE_TOLERANCE = 1e-12 # the bounds of the pruning are widened by this, so the rounding of float() never prunes a valid correction
+NUMBER_CHARACTERS = "0-9" + "".join(sorted(char for char in OCR_LETTER_TO_NUMBER_MAPPING if len(char) == 1))
+SEARCHABLE_NUMBER = re.compile(f"([+-]?)([{NUMBER_CHARACTERS}]*)(?:\\.([{NUMBER_CHARACTERS}]*))?")
+DIGIT_CHOICES = {
+    **{digit: (digit, *OCR_NUMBER_TO_NUMBER_MAPPING.get(digit, [])) for digit in "0123456789"},
+    **{letter: tuple(numbers) for letter, numbers in OCR_LETTER_TO_NUMBER_MAPPING.items()}, # letters have to be replaced
+}
+
+
+def is_searchable(word: str) -> bool:
+    """
+    Whether find_ocr_correction_in_range can search the word: a plain decimal number (optional sign, digits, at most one point)
+    whose digits may be OCR letters of OCR_LETTER_TO_NUMBER_MAPPING.
+    """
+    match = SEARCHABLE_NUMBER.fullmatch(word)
+    return match is not None and 0 < len(match.group(2)) + len(match.group(3) or "") <= MAX_SEARCHED_CHARACTERS
+
+
+@lru_cache(maxsize=2**16)
+def find_ocr_correction_in_range(word: str, min_value: float, max_value: float) -> str:
+    """
+    Searches a reading of the number word with min_value <= float(reading) <= max_value, where each digit may be kept or replaced
+    by one of its OCR confusions in OCR_NUMBER_TO_NUMBER_MAPPING (independently at every position, e.g. "78" -> "10" for the
+    range 0 to 10) and each OCR letter is replaced by its numbers in OCR_LETTER_TO_NUMBER_MAPPING. At least one character has
+    to be replaced, a word which is in range as it is has no OCR correction. Returns the first reading found (with the fewest
+    replacements at the front) or None. The word has to be searchable (see is_searchable).
+
+    The readings are enumerated digit by digit from the front. The value of a prefix plus the smallest and the largest value the
+    remaining digits can add give an interval of all its readings, and prefixes whose interval misses the range are skipped.
+    If the interval lies inside the range, any reading of the prefix with a replacement is a match. The values are exact
+    integers (the number times 10 to the number of decimals) and the bounds are rounded to integers, so the pruning doesn't
+    depend on the length of the word. The place values shrink by 10 per digit, so only a few prefixes per digit are open at
+    once and even 20-digit IDs take a few hundred steps instead of 3^20 readings. Results are memoized per (word, range).
+    """
+    sign, integer_part, fraction_part = SEARCHABLE_NUMBER.fullmatch(word).groups()
+    characters = integer_part + (fraction_part or "")
+    choices = [DIGIT_CHOICES[char] for char in characters]
+    place_values = [10 ** (len(characters) - 1 - position) for position in range(len(characters))]
+    scale = 10 ** len(fraction_part or "")
+
+    suffix_min, suffix_max = [0] * (len(characters) + 1), [0] * (len(characters) + 1)
+    last_replaceable = -1 # the last position with a digit other than the character itself
+    for position in range(len(characters) - 1, -1, -1):
+        suffix_min[position] = suffix_min[position + 1] + min(int(digit) for digit in choices[position]) * place_values[position]
+        suffix_max[position] = suffix_max[position + 1] + max(int(digit) for digit in choices[position]) * place_values[position]
+        if last_replaceable == -1 and choices[position] != (characters[position],):
+            last_replaceable = position
+    if last_replaceable == -1:
+        return None
+
+    # the search runs on the magnitude, a minus sign mirrors the range
+    low, high = (-max_value, -min_value) if sign == "-" else (min_value, max_value)
+    tolerance = RELATIVE_TOLERANCE * max(abs(low), abs(high), 1.0)
+    outer_low, outer_high = _to_scaled_bounds(low, high, -tolerance, scale)
+    inner_low, inner_high = _to_scaled_bounds(low, high, tolerance, scale)
+
+    def to_reading(digits: list[str]) -> str:
+        return sign + "".join(digits[:len(integer_part)]) + ("." + "".join(digits[len(integer_part):]) if fraction_part is not None else "")
+
+    def is_match(digits: list[str]) -> bool:
+        return min_value <= float(to_reading(digits)) <= max_value
+
+    def search(position: int, prefix_value: int, digits: list[str], is_replaced: bool) -> str:
+        if not is_replaced and position > last_replaceable: # only the reading without replacements is left
+            return None
+        smallest, largest = prefix_value + suffix_min[position], prefix_value + suffix_max[position]
+        if largest < outer_low or smallest > outer_high:
+            return None
+        if position == len(characters):
+            return to_reading(digits) if is_match(digits) else None
+        if inner_low <= smallest and largest <= inner_high: # all readings of the prefix are in range, take the first with a replacement
+            first_reading = digits + [choice[0] for choice in choices[position:]]
+            if not is_replaced and first_reading[position:] == list(characters[position:]): # no OCR letter left
+                first_reading[last_replaceable] = next(digit for digit in choices[last_replaceable] if digit != characters[last_replaceable])
+            if is_match(first_reading):
+                return to_reading(first_reading)
+        for digit in choices[position]:
+            reading = search(position + 1, prefix_value + int(digit) * place_values[position], digits + [digit], is_replaced or digit != characters[position])
+            if reading is not None:
+                return reading
+        return None
+
+    return search(0, 0, [], False)
+
+
+def _to_scaled_bounds(low: float, high: float, margin: float, scale: int) -> tuple[float, float]:
+    """
+    Returns the smallest and the largest scaled integer in the range from low + margin to high - margin (infinite bounds stay
+    infinite). The bounds are computed exactly from the ratios of the floats.
+    """
+    margin_numerator, margin_denominator = float(margin).as_integer_ratio()
+    scaled_bounds = []
+    for bound, sign in ((low, 1), (high, -1)):
+        if not math.isfinite(bound):
+            scaled_bounds.append(bound)
+            continue
+        numerator, denominator = float(bound).as_integer_ratio()
+        numerator = (numerator * margin_denominator + sign * margin_numerator * denominator) * scale
+        denominator *= margin_denominator
+        scaled_bounds.append(-(-numerator // denominator) if sign == 1 else numerator // denominator)
+    return tuple(scaled_bounds)
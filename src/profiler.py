@@ -0,0 +1,138 @@
+import contextlib
+import cProfile
+import json
+import os
+import time
+from functools import partial
+
+from utils.generic_label_rules import GenericLabelRule, TokenRule
+
+
+class Profiler():
+    """
+    Records the wall time, the CPU time, the number of calls, the number of unique values and the memory delta (RSS) of each
+    (phase, column, rule) of a detection. The phases are "import", "factorize", "generic", "specific" and "cross_column".
+    Columns labeled in worker processes are measured there and merged into the profiler of the main process, so the CPU time
+    and the memory delta are the ones of the worker.
+
+    Parameters:
+    - cprofile_path: str - If set, the detection in the main process runs under cProfile and the stats are written to this file
+      (open it with pstats or snakeviz). The sections are plain function calls, so py-spy shows them under the same names.
+    - progress: bool - Whether a tqdm progress bar over the columns is shown.
+    """
+    def __init__(self, cprofile_path: str = None, progress: bool = False):
+        self.cprofile_path = cprofile_path
+        self.progress = progress
+        self.records = {}
+        import psutil # takes about 50 ms to import, which runs without profiling don't need
+        self._process = psutil.Process()
+
+    @contextlib.contextmanager
+    def measure(self, phase: str, column: str = None, rule: str = None, unique_values: int = None):
+        memory_before = self._process.memory_info().rss
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add_record(phase, column, rule, {
+                "calls": 1,
+                "wall_seconds": time.perf_counter() - wall_start,
+                "cpu_seconds": time.process_time() - cpu_start,
+                "unique_values": unique_values or 0,
+                "memory_delta_mb": (self._process.memory_info().rss - memory_before) / 2**20,
+            })
+
+    def add_record(self, phase: str, column: str, rule: str, values: dict):
+        """
+        Adds the values to the record of the (phase, column, rule), repeated calls (e.g. per chunk) are summed up.
+        """
+        record = self.records.setdefault((phase, column, rule), dict.fromkeys(values, 0))
+        for key, value in values.items():
+            record[key] += value
+
+    def merge(self, records: list[dict]):
+        """
+        Merges the records of another profiler, e.g. of a worker process (see get_records).
+        """
+        for record in records:
+            values = {key: value for key, value in record.items() if key not in ("phase", "column", "rule")}
+            self.add_record(record["phase"], record["column"], record["rule"], values)
+
+    def get_records(self) -> list[dict]:
+        return [{"phase": phase, "column": column, "rule": rule, **values} for (phase, column, rule), values in self.records.items()]
+
+    @contextlib.contextmanager
+    def cprofile(self):
+        if self.cprofile_path is None:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(self.cprofile_path)
+
+    def get_report(self) -> dict:
+        """
+        Returns the records sorted by wall time and the totals per phase.
+        """
+        phases = {}
+        for record in self.get_records():
+            phase = phases.setdefault(record["phase"], {"wall_seconds": 0.0, "cpu_seconds": 0.0})
+            phase["wall_seconds"] += record["wall_seconds"]
+            phase["cpu_seconds"] += record["cpu_seconds"]
+        return {
+            "phases": phases,
+            "records": sorted(self.get_records(), key=lambda record: record["wall_seconds"], reverse=True),
+            "cprofile_path": self.cprofile_path,
+        }
+
+    def save_report(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.get_report(), f, indent=2)
+
+    def print_report(self, max_records: int = 25):
+        """
+        Prints the totals per phase and the slowest records as a table.
+        """
+        report = self.get_report()
+        print("Profile per phase:")
+        for phase, totals in report["phases"].items():
+            print(f"  {phase}: {totals['wall_seconds']:.3f} s wall, {totals['cpu_seconds']:.3f} s CPU")
+        print(f"{'phase':<13} {'column':<28} {'rule':<40} {'calls':>6} {'wall s':>8} {'cpu s':>8} {'uniques':>9} {'mem MB':>8}")
+        for record in report["records"][:max_records]:
+            print(
+                f"{record['phase']:<13} {str(record['column'] or '-'):<28.28} {str(record['rule'] or '-'):<40.40} {record['calls']:>6} "
+                f"{record['wall_seconds']:>8.3f} {record['cpu_seconds']:>8.3f} {record['unique_values']:>9} {record['memory_delta_mb']:>8.1f}"
+            )
+        if len(report["records"]) > max_records:
+            print(f"... {len(report['records']) - max_records} more records in the JSON report.")
+
+
+def measure(profiler: Profiler, phase: str, column: str = None, rule: str = None, unique_values: int = None):
+    """
+    Profiler.measure, or a no-op context if profiling is disabled (profiler is None).
+    """
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.measure(phase, column, rule, unique_values)
+
+
+def get_rule_name(function) -> str:
+    """
+    A readable name of a label function or rule, e.g. "SpellingRule", "TokenRule(is_not_a_production_year)" or
+    "differentiate_errors_in_number_column(label_year)".
+    """
+    if function is None:
+        return None
+    if isinstance(function, TokenRule) and type(function) is TokenRule:
+        return f"TokenRule({get_rule_name(function.label_function)})"
+    if isinstance(function, GenericLabelRule):
+        return type(function).__name__
+    if isinstance(function, partial): # callable arguments by their name, other arguments by their keyword
+        arguments = [get_rule_name(value) if callable(value) else keyword for keyword, value in function.keywords.items()]
+        return f"{get_rule_name(function.func)}({', '.join(arguments)})"
+    return getattr(function, "__name__", type(function).__name__)
@@ -0,0 +1,45 @@
+import time
+from typing import Callable
+
+
+class ResourceRegistry():
+    """
+    Heavy objects shared by all detectors and columns, like the SpellChecker vocabulary or the misspellings. They are not
+    loaded at import time, but on their first use, and only once per process.
+    Worker processes which are forked after preload() inherit the loaded objects (copy-on-write) instead of loading them again,
+    spawned workers load each object on its first use.
+    """
+    def __init__(self):
+        self._loaders = {}
+        self._resources = {}
+        self.load_times = {}
+
+    def register(self, name: str, loader: Callable):
+        """
+        Registers the function which loads a resource. It is only called on the first get.
+        """
+        self._loaders[name] = loader
+
+    def get(self, name: str):
+        if name not in self._resources:
+            start = time.perf_counter()
+            self._resources[name] = self._loaders[name]()
+            self.load_times[name] = time.perf_counter() - start
+        return self._resources[name]
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._loaders)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._resources
+
+    def preload(self, names: list[str] = None):
+        """
+        Loads the given resources (all registered resources by default), e.g. before worker processes are forked.
+        """
+        for name in names if names is not None else self.names:
+            self.get(name)
+
+
+resources = ResourceRegistry()
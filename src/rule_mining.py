@@ -0,0 +1,296 @@
+import string
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from column_schema import NumericView
+from cross_column_rules import CrossColumnRule, RowColumns
+from utils.column_utils import factorize
+
+SKETCH_WIDTH = 2**16 # counters per row of a count-min sketch, the overestimate is at most about 2 * rows / width with high probability
+SKETCH_DEPTH = 4
+SKETCH_SEEDS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5], dtype=np.uint64)
+TRACKED_VALUES = 64 # most frequent values and shapes kept per column
+DOMINANT_SHARE = 0.05 # values and shapes with at least this share of a column are its dominant ones
+MAX_TARGET_SHARE_RATIO = 0.2 # a dominant value of A is a candidate in B if its share there is at most this fraction of its share in A
+MIN_SUPPORT = 10 # rows
+SHAPE_TABLE = str.maketrans(string.digits + string.ascii_lowercase + string.ascii_uppercase, "9" * 10 + "a" * 26 + "A" * 26)
+MAX_SHAPE_LENGTH = 24
+WHITESPACE = set(string.whitespace)
+PUNCTUATION = set(string.punctuation)
+
+
+class CountMinSketch():
+    """
+    Counts hashed values in a fixed table of depth x width counters. An estimate is never below the true count, and two
+    sketches of the same size can be added, e.g. the sketches of the chunks of a dataset.
+    """
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def add(self, hashes: np.ndarray, counts: np.ndarray):
+        for row, positions in enumerate(self._get_positions(hashes)):
+            self.table[row] += np.bincount(positions, weights=counts, minlength=self.width).astype(np.int64)
+
+    def estimate(self, hashes: np.ndarray) -> np.ndarray:
+        return np.min([self.table[row][positions] for row, positions in enumerate(self._get_positions(hashes))], axis=0)
+
+    def merge(self, other: "CountMinSketch"):
+        self.table += other.table
+
+    def _get_positions(self, hashes: np.ndarray) -> list[np.ndarray]:
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"): # the multiplications wrap around on purpose
+            return [((hashes ^ seed) * np.uint64(0xFF51AFD7ED558CCD) >> np.uint64(32)) % np.uint64(self.width) for seed in SKETCH_SEEDS[:self.depth]]
+
+
+def hash_values(values: np.ndarray) -> np.ndarray:
+    """
+    Hashes raw values so that the same value gets the same hash in every column and chunk.
+    """
+    return pd.util.hash_array(np.asarray(values, dtype=object), categorize=False)
+
+
+def get_shape(value: str) -> str:
+    """
+    The shape of a value: digits become 9, letters a or A, other characters are kept, e.g. "tt0012345" -> "aa9999999" and
+    "15.3712" -> "99.9999". Long values are cut off with a trailing "~".
+    """
+    shape = value.translate(SHAPE_TABLE)
+    return shape if len(shape) <= MAX_SHAPE_LENGTH else shape[:MAX_SHAPE_LENGTH] + "~"
+
+
+class ColumnSketch():
+    """
+    The value distribution of a column, updated chunk by chunk: a count-min sketch of the values and of the shapes, the
+    most frequent values and shapes, the lengths, the character classes and the range of the numbers.
+    Each chunk is factorized, so the Python work is per unique value and the counts are added with numpy.
+    """
+    def __init__(self, column_name: str):
+        self.column_name = column_name
+        self.rows = 0
+        self.missing = 0
+        self.value_sketch = CountMinSketch()
+        self.shape_sketch = CountMinSketch()
+        self.top_values = {}
+        self.top_shapes = {}
+        self.length_sum = 0
+        self.min_length = None
+        self.max_length = None
+        self.charsets = set()
+        self.numbers = 0
+        self.min_number = None
+        self.max_number = None
+
+    def update(self, column: pd.Series):
+        codes, unique_values = factorize(column)
+        counts = np.bincount(codes, minlength=len(unique_values))
+        self.rows += len(column)
+        is_missing = pd.isna(unique_values)
+        self.missing += int(counts[is_missing].sum())
+        unique_values, counts = unique_values[~is_missing], counts[~is_missing]
+        if len(unique_values) == 0:
+            return
+        unique_values = unique_values.astype(str).astype(object) # Python strings, also for the dictionaries of the top values
+
+        self.value_sketch.add(hash_values(unique_values), counts)
+        self._update_top(self.top_values, unique_values, counts)
+        shape_codes, shapes = factorize(pd.Series([get_shape(value) for value in unique_values], dtype=object))
+        shape_counts = np.bincount(shape_codes, weights=counts, minlength=len(shapes)).astype(np.int64)
+        self.shape_sketch.add(hash_values(shapes), shape_counts)
+        self._update_top(self.top_shapes, shapes, shape_counts)
+
+        lengths = np.fromiter((len(value) for value in unique_values), dtype=np.int64, count=len(unique_values))
+        self.length_sum += int(lengths @ counts)
+        self.min_length = int(lengths.min()) if self.min_length is None else min(self.min_length, int(lengths.min()))
+        self.max_length = int(lengths.max()) if self.max_length is None else max(self.max_length, int(lengths.max()))
+        characters = set("".join(shapes)) # digits and letters are 9, a and A in the shapes, other characters are kept
+        self.charsets.update(name for name, placeholder in (("digits", "9"), ("lowercase", "a"), ("uppercase", "A")) if placeholder in characters)
+        self.charsets.update(name for name, charset in (("whitespace", WHITESPACE), ("punctuation", PUNCTUATION)) if characters & charset)
+        if characters - set("9aA") - WHITESPACE - PUNCTUATION:
+            self.charsets.add("other")
+
+        numeric_view = NumericView(pd.Series(unique_values, dtype=object))
+        is_number = numeric_view.is_number.to_numpy()
+        if is_number.any():
+            numbers = numeric_view.values.to_numpy()[is_number]
+            self.numbers += int(counts[is_number].sum())
+            self.min_number = float(numbers.min()) if self.min_number is None else min(self.min_number, float(numbers.min()))
+            self.max_number = float(numbers.max()) if self.max_number is None else max(self.max_number, float(numbers.max()))
+
+    @property
+    def present(self) -> int:
+        return self.rows - self.missing
+
+    def get_share(self, count: float) -> float:
+        return count / self.present if self.present else 0.0
+
+    def get_dominant_values(self) -> list[tuple[str, int]]:
+        return self._get_dominant(self.top_values)
+
+    def get_dominant_shapes(self) -> list[tuple[str, int]]:
+        return self._get_dominant(self.top_shapes)
+
+    def get_profile(self) -> dict:
+        return {
+            "column": self.column_name,
+            "rows": self.rows,
+            "missing": self.missing,
+            "dominant_values": self.get_dominant_values(),
+            "dominant_shapes": self.get_dominant_shapes(),
+            "min_length": self.min_length,
+            "mean_length": self.length_sum / self.present if self.present else None,
+            "max_length": self.max_length,
+            "charsets": sorted(self.charsets),
+            "number_share": self.get_share(self.numbers),
+            "min_number": self.min_number,
+            "max_number": self.max_number,
+        }
+
+    def _get_dominant(self, top: dict) -> list[tuple[str, int]]:
+        return [(value, count) for value, count in sorted(top.items(), key=lambda item: -item[1]) if self.get_share(count) >= DOMINANT_SHARE]
+
+    @staticmethod
+    def _update_top(top: dict, values: np.ndarray, counts: np.ndarray):
+        """
+        Keeps the TRACKED_VALUES most frequent values. Values of a chunk are added to the counts of the earlier chunks, so a
+        value that was dropped before restarts from 0 (like in the Space-Saving algorithm, the counts of frequent values are exact).
+        """
+        chunk_top = np.argsort(-counts, kind="stable")[:TRACKED_VALUES]
+        for value, count in zip(values[chunk_top], counts[chunk_top]):
+            top[value] = top.get(value, 0) + int(count)
+        if len(top) > TRACKED_VALUES:
+            for value, _ in sorted(top.items(), key=lambda item: item[1])[:len(top) - TRACKED_VALUES]:
+                del top[value]
+
+
+class TranspositionCandidate():
+    """
+    A candidate rule "a value (or shape) typical for column A appears in column B", i.e. the cells of B may hold the value of
+    A because the values of the columns were swapped.
+
+    Parameters:
+    - source_column: str - Column A, where the value is dominant.
+    - target_column: str - Column B, where the value is rare.
+    - kind: str - "value" for a raw value, "shape" for a shape like "99999999" (see get_shape).
+    - value: str - The value or the shape.
+    - support: int - The estimated number of rows of B with the value (from the sketch, at least the true count).
+    - source_share: float - The share of the value in A.
+    - target_share: float - The estimated share of the value in B.
+    """
+    def __init__(self, source_column: str, target_column: str, kind: str, value: str, support: int, source_share: float, target_share: float):
+        self.source_column = source_column
+        self.target_column = target_column
+        self.kind = kind
+        self.value = value
+        self.support = support
+        self.source_share = source_share
+        self.target_share = target_share
+
+    @property
+    def lift(self) -> float:
+        return self.source_share / self.target_share if self.target_share else float("inf")
+
+    def get_mask(self, columns) -> np.ndarray:
+        """
+        The rows where the target column has the value (or the shape), for a CrossColumnRule.
+        """
+        if self.kind == "value":
+            return columns.map_values(self.target_column, lambda value: value == self.value)
+        return columns.map_values(self.target_column, lambda value: isinstance(value, str) and get_shape(value) == self.value)
+
+    def to_rule(self) -> CrossColumnRule:
+        """
+        The candidate as a rule which labels both columns as transposed, e.g. to try it out in get_cross_column_rules.
+        """
+        return CrossColumnRule([self.source_column, self.target_column], self.get_mask)
+
+    def to_dict(self) -> dict:
+        return {**vars(self), "lift": self.lift}
+
+
+class TranspositionMiner():
+    """
+    Proposes transposition rules for a dataset without scanning the pairs of columns row by row: each column is summarized once
+    in a ColumnSketch (O(rows) per column), then for each pair of columns the dominant values and shapes of one column are looked
+    up in the sketches of the other (O(columns² x dominant values) lookups).
+    The candidates are rated by their support in the target column and their lift (share in the source / share in the target).
+    """
+    def __init__(self, column_names: Iterable[str] = None):
+        self.sketches = {} if column_names is None else {column_name: ColumnSketch(column_name) for column_name in column_names}
+
+    def update(self, dataset: pd.DataFrame):
+        for column_name in dataset.columns:
+            self.sketches.setdefault(column_name, ColumnSketch(column_name)).update(dataset[column_name])
+
+    def get_profiles(self) -> list[dict]:
+        return [sketch.get_profile() for sketch in self.sketches.values()]
+
+    def get_candidates(self, min_support: int = MIN_SUPPORT, max_target_share_ratio: float = MAX_TARGET_SHARE_RATIO) -> list[TranspositionCandidate]:
+        """
+        Returns the candidates sorted by support. Only values and shapes which are dominant in a single column are typical for
+        it, e.g. the shape "99.9" of most number columns doesn't tell from which column a value came.
+        """
+        candidates = []
+        for kind in ("value", "shape"):
+            dominant = {sketch.column_name: sketch.get_dominant_values() if kind == "value" else sketch.get_dominant_shapes() for sketch in self.sketches.values()}
+            dominant_columns = {}
+            for column_name, values in dominant.items():
+                for value, _ in values:
+                    dominant_columns[value] = dominant_columns.get(value, 0) + 1
+            for source in self.sketches.values():
+                typical = [(value, count) for value, count in dominant[source.column_name] if dominant_columns[value] == 1]
+                if not typical:
+                    continue
+                values = np.array([value for value, _ in typical], dtype=object)
+                hashes = hash_values(values)
+                source_shares = np.array([source.get_share(count) for _, count in typical])
+                for target in self.sketches.values():
+                    if target is source or not target.present:
+                        continue
+                    supports = (target.value_sketch if kind == "value" else target.shape_sketch).estimate(hashes)
+                    target_shares = supports / target.present
+                    for value, support, source_share, target_share in zip(values, supports, source_shares, target_shares):
+                        if support >= min_support and target_share <= source_share * max_target_share_ratio:
+                            candidates.append(TranspositionCandidate(source.column_name, target.column_name, kind, value, int(support), float(source_share), float(target_share)))
+        value_supports = {}
+        for candidate in candidates:
+            if candidate.kind == "value":
+                key = (candidate.source_column, candidate.target_column)
+                value_supports[key] = value_supports.get(key, 0) + candidate.support
+        # a shape is only a candidate of its own if the dominant values with this shape don't explain it
+        candidates = [
+            candidate for candidate in candidates
+            if candidate.kind == "value" or value_supports.get((candidate.source_column, candidate.target_column), 0) < candidate.support * 0.9
+        ]
+        return sorted(candidates, key=lambda candidate: (-candidate.support, -candidate.lift))
+
+    def verify(self, dataset: pd.DataFrame, candidates: list[TranspositionCandidate]) -> list[int]:
+        """
+        The exact number of rows of the dataset where the target column has the value or the shape of each candidate.
+        """
+        columns = RowColumns(dataset, get_numeric_view=lambda column_name: NumericView(dataset[column_name]))
+        return [int(np.count_nonzero(candidate.get_mask(columns))) for candidate in candidates]
+
+
+def print_profiles(profiles: list[dict]):
+    print(f"{'column':<28} {'missing':>8} {'length':>15} {'numbers':>8} {'number range':>25}  charsets / dominant values")
+    for profile in profiles:
+        lengths = "-" if profile["min_length"] is None else f"{profile['min_length']}-{profile['mean_length']:.1f}-{profile['max_length']}"
+        numbers = "-" if profile["min_number"] is None else f"{profile['min_number']:g}..{profile['max_number']:g}"
+        dominant = ", ".join(f"{value!r} ({count})" for value, count in profile["dominant_values"][:3])
+        print(f"{profile['column']:<28.28} {profile['missing']:>8} {lengths:>15} {profile['number_share']:>8.1%} {numbers:>25}  {'/'.join(profile['charsets'])}: {dominant}")
+
+
+def print_candidates(candidates: list[TranspositionCandidate], max_candidates: int = 30):
+    print(f"{'source':<22} {'target':<22} {'kind':<6} {'value':<26} {'support':>8} {'source %':>9} {'target %':>9} {'lift':>8}")
+    for candidate in candidates[:max_candidates]:
+        print(
+            f"{candidate.source_column:<22.22} {candidate.target_column:<22.22} {candidate.kind:<6} {candidate.value!r:<26.26} "
+            f"{candidate.support:>8} {candidate.source_share:>9.2%} {candidate.target_share:>9.2%} {candidate.lift:>8.1f}"
+        )
+    if len(candidates) > max_candidates:
+        print(f"... {len(candidates) - max_candidates} more candidates.")
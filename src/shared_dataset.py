@@ -0,0 +1,190 @@
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from error_types import ErrorType
+from utils.column_utils import factorize
+
+ALIGNMENT = 8
+
+
+class SharedColumn():
+    """
+    A picklable handle of one column of a SharedDataset, which is sent to a worker instead of the column data.
+    The column block has four sections, (start, length) byte ranges: the codes of the cells (intp), the character offsets of
+    the unique values (int64), which unique values are missing (bool) and the UTF-8 data of the unique values.
+    A RangeIndex is sent with the handle, other integer indexes are stored behind the label matrix in the label block.
+    """
+    def __init__(self, column_name: str, position: int, shape: tuple[int, int], index: pd.Index, labels_name: str, column_memory_name: str, sections: dict):
+        self.column_name = column_name
+        self.position = position
+        self.shape = shape
+        self.index = index
+        self.labels_name = labels_name
+        self.column_memory_name = column_memory_name
+        self.sections = sections
+
+    def load(self) -> tuple[pd.Series, np.ndarray, np.ndarray]:
+        """
+        Returns the column as an object Series like in the dataset, its codes and its unique values (like factorize).
+        Only the unique values are decoded, the cells reference them. The codes are copied out of the column block, so it is
+        closed again right away, and the Series is a new object array in the worker, not a view of the shared memory.
+        """
+        num_rows = self.shape[0]
+        index = self.index
+        if index is None:
+            index = pd.Index(np.frombuffer(_attach_labels(self.labels_name), dtype=np.int64, count=num_rows, offset=_align(num_rows * self.shape[1])).copy())
+
+        memory = shared_memory.SharedMemory(name=self.column_memory_name)
+        try:
+            codes = np.frombuffer(memory.buf, dtype=np.intp, count=num_rows, offset=self.sections["codes"][0]).copy()
+            offsets = np.frombuffer(memory.buf, dtype=np.int64, count=self.sections["offsets"][1] // 8, offset=self.sections["offsets"][0]).tolist()
+            is_missing = np.frombuffer(memory.buf, dtype=bool, count=len(offsets) - 1, offset=self.sections["missing"][0]).copy()
+            data_start, data_length = self.sections["data"]
+            text = str(memory.buf[data_start:data_start + data_length], "utf-8", "surrogatepass")
+        finally:
+            memory.close()
+
+        unique_values = np.empty(len(offsets) - 1, dtype=object)
+        unique_values[:] = [text[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        unique_values[is_missing] = np.nan
+        column = pd.Series(unique_values[codes], index=index, name=self.column_name, dtype=object, copy=False)
+        return column, codes, unique_values
+
+    def write_labels(self, labels):
+        """
+        Writes the labels of the column in place into the shared label matrix.
+        """
+        label_matrix = np.ndarray(self.shape, dtype=np.uint8, buffer=_attach_labels(self.labels_name), order="F")
+        label_matrix[:, self.position] = np.asarray(labels, dtype=np.uint8)
+
+
+class SharedDataset():
+    """
+    A dataset in shared memory, so the columns aren't pickled to the worker processes and their labels aren't pickled back.
+    The label matrix (column-major like a LabelMatrix) is one block, created at once, each worker writes the uint8 labels of its
+    columns into it in place. Each column gets its own block, which is written when its handle is requested and released
+    when its labels are collected. The detector only requests the handle of the next column when the result of an earlier one
+    was collected, so the main process encodes it while the workers label the columns in flight. The columns are stored dictionary-encoded: the
+    codes of the cells plus the unique values as offsets and a UTF-8 data buffer (like a MappedStringTable).
+    The handoff of the columns is not zero-copy: the label functions need Python strings, so each worker copies the codes out
+    of the block, decodes the unique values and builds an object Series of the column (one pointer per cell). It only saves
+    the pickling of every cell and the factorization in the worker.
+    Columns with other values than strings and NaN get no block and are sent to the workers as they are.
+    Use it as a context manager, the shared memory is released on exit.
+
+    Parameters:
+    - dataset: pd.DataFrame - The dataset (or chunk), all columns read as raw strings.
+    """
+    def __init__(self, dataset: pd.DataFrame):
+        self.dataset = dataset
+        self.column_blocks = {}
+        shape = dataset.shape
+        has_index_section = not isinstance(dataset.index, pd.RangeIndex) and dataset.index.dtype == np.int64
+        index_start = _align(shape[0] * shape[1])
+        self.label_block = shared_memory.SharedMemory(create=True, size=max(index_start + (shape[0] * 8 if has_index_section else 0), 1))
+        self.labels = np.ndarray(shape, dtype=np.uint8, buffer=self.label_block.buf, order="F")
+        self.labels[:] = ErrorType.NO_ERROR.value
+        if has_index_section:
+            self.label_block.buf[index_start:index_start + shape[0] * 8] = dataset.index.to_numpy(dtype=np.int64).view(np.uint8)
+        self._index = None if has_index_section else dataset.index
+        self._column_positions = {column_name: position for position, column_name in enumerate(dataset.columns)}
+
+    def get_handle(self, column_name: str) -> SharedColumn:
+        """
+        Writes the column into a new block and returns its handle, or None if the column can't be stored.
+        """
+        sections = _encode_column(self.dataset[column_name])
+        if sections is None:
+            return None
+
+        layout, size = {}, 0
+        for section_name, section in sections.items():
+            layout[section_name] = (size, section.nbytes)
+            size += _align(section.nbytes)
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.column_blocks[column_name] = block
+        for section_name, section in sections.items():
+            start, length = layout[section_name]
+            block.buf[start:start + length] = section.view(np.uint8).ravel()
+        return SharedColumn(column_name, self._column_positions[column_name], self.dataset.shape, self._index, self.label_block.name, block.name, layout)
+
+    def release_column(self, column_name: str):
+        """
+        Releases the block of a column, once the worker has loaded it (and written its labels).
+        """
+        block = self.column_blocks.pop(column_name, None)
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    def close(self):
+        """
+        Releases the shared memory. Workers which still have the label block attached keep their mapping until they attach
+        the one of the next dataset (or chunk).
+        """
+        self.labels = None
+        for block in [self.label_block, *self.column_blocks.values()]:
+            block.close()
+            block.unlink()
+        self.column_blocks = {}
+
+    def __enter__(self) -> "SharedDataset":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _encode_column(column: pd.Series) -> dict:
+    """
+    Returns the sections of a column (codes, offsets, missing, data), or None if it has values which are neither strings nor
+    NaN (e.g. None, which the workers would get back as NaN) or if it isn't an object column.
+    """
+    if column.dtype != object:
+        return None
+    codes, unique_values = factorize(column)
+    is_missing = pd.isna(unique_values)
+    strings = unique_values[~is_missing]
+    if len(strings) > 0 and pd.api.types.infer_dtype(strings, skipna=False) != "string":
+        return None
+    if is_missing.any(): # pd.factorize returns None as NaN
+        missing_cells = column.to_numpy(dtype=object)[np.isin(codes, np.flatnonzero(is_missing))]
+        if not all(type(value) is float for value in missing_cells):
+            return None
+
+    lengths = np.zeros(len(unique_values), dtype=np.int64)
+    lengths[~is_missing] = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    offsets = np.zeros(len(unique_values) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    data = np.frombuffer("".join(strings).encode("utf-8", "surrogatepass"), dtype=np.uint8)
+    return {"codes": np.ascontiguousarray(codes, dtype=np.intp), "offsets": offsets, "missing": is_missing.astype(bool), "data": data}
+
+
+def _align(length: int) -> int:
+    return (length + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+_attached_label_block = None
+
+def _attach_labels(labels_name: str) -> memoryview:
+    """
+    Returns the buffer of the label block in a worker. The block of the current dataset stays attached for all its columns,
+    the block of the previous dataset (or chunk) is closed.
+    The workers are children of the main process and share its resource tracker, so attaching doesn't register a block twice.
+    """
+    global _attached_label_block
+    if _attached_label_block is None or _attached_label_block.name != labels_name:
+        if _attached_label_block is not None:
+            _attached_label_block.close()
+        _attached_label_block = shared_memory.SharedMemory(name=labels_name)
+    return _attached_label_block.buf
+
+
+def start_resource_tracker():
+    """
+    Starts the resource tracker of the shared memory blocks in the main process, before the workers are started, so that they
+    inherit it. Otherwise each worker would start its own tracker, which unlinks the blocks the worker attached when it exits.
+    """
+    resource_tracker.ensure_running()
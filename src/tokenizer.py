@@ -1,24 +1,101 @@
 import re
+from itertools import chain
+from typing import Iterable
 
+import numpy as np
 import pandas as pd
 
+from utils.column_utils import factorize
+
 REGEX = r'\W+'
+TOKEN_PATTERN = re.compile(r'\w+') # the tokens are the non-empty parts of re.split(REGEX, value)
+
+
+class TokenizedColumn():
+    """
+    The tokens of a column as one flat array with offsets: the tokens of row i are tokens[offsets[i]:offsets[i + 1]].
+    Token-level rules check all tokens of a column at once and map the results back to the rows, without per-cell lists.
+    """
+    def __init__(self, tokens: np.ndarray, offsets: np.ndarray, index: pd.Index):
+        self.tokens = tokens
+        self.offsets = offsets
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def row_positions(self) -> np.ndarray:
+        """
+        The row position of each token.
+        """
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    @property
+    def token_positions(self) -> np.ndarray:
+        """
+        The position of each token within its cell.
+        """
+        return np.arange(len(self.tokens)) - np.repeat(self.offsets[:-1], self.lengths)
+
+    def get_first_tokens(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Returns for each row the flat position of the first token selected by the boolean mask, or -1 if no token is selected.
+        """
+        selected_tokens = np.flatnonzero(mask)
+        rows, first_selected = np.unique(self.row_positions[selected_tokens], return_index=True)
+        first_tokens = np.full(len(self), -1, dtype=np.int64)
+        first_tokens[rows] = selected_tokens[first_selected]
+        return first_tokens
+
+    def to_lists(self) -> pd.Series:
+        return pd.Series(
+            [self.tokens[start:end].tolist() for start, end in zip(self.offsets[:-1], self.offsets[1:])], index=self.index, dtype=object,
+        )
+
 
 class Tokenizer():
     def tokenize_dataset(self, dataset: pd.DataFrame) -> pd.DataFrame:
         tokenized_dataset = pd.DataFrame(list(), index=dataset.index, columns=dataset.columns)
         for column in dataset.columns:
-            tokenized_dataset[column] = dataset[column].apply(
-                lambda cell: self.tokenize_cell(cell)
-            )
+            tokenized_dataset[column] = self.tokenize_column(dataset[column])
         return tokenized_dataset
     
     def tokenize_column(self, one_column_data: pd.Series) -> pd.Series:
-        return one_column_data.apply(
-            lambda cell: self.tokenize_cell(cell)
-        )
+        return self.tokenize_column_flat(one_column_data).to_lists()
     
     def tokenize_cell(self, cell_value: str) -> list:
-        all_tokens = re.split(REGEX, str(cell_value))
-        non_empty_tokens = [token for token in all_tokens if token]
-        return non_empty_tokens
+        return TOKEN_PATTERN.findall(str(cell_value))
+
+    def tokenize_values(self, values: Iterable) -> TokenizedColumn:
+        """
+        Tokenizes each value once, in order. The result is indexed by the position of the value.
+        """
+        token_lists = [TOKEN_PATTERN.findall(str(value)) for value in values]
+        offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists)), out=offsets[1:])
+
+        tokens = np.empty(offsets[-1], dtype=object)
+        tokens[:] = list(chain.from_iterable(token_lists))
+        return TokenizedColumn(tokens, offsets, pd.RangeIndex(len(token_lists)))
+
+    def tokenize_column_flat(self, one_column_data: pd.Series) -> TokenizedColumn:
+        """
+        Tokenizes a column into flat token arrays. Each unique value is only tokenized once, its tokens are copied to all of its
+        cells with one gather.
+        """
+        if pd.api.types.infer_dtype(one_column_data, skipna=False) != "string":
+            # values which are equal but have a different string (None and NaN, 1 and 1.0) must not share their tokens
+            one_column_data = pd.Series([str(value) for value in one_column_data], index=one_column_data.index, dtype=object)
+        codes, unique_values = factorize(one_column_data)
+        unique_tokens = self.tokenize_values(unique_values)
+
+        lengths = unique_tokens.lengths[codes]
+        offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        token_sources = np.repeat(unique_tokens.offsets[:-1][codes] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return TokenizedColumn(unique_tokens.tokens[token_sources], offsets, one_column_data.index)
@@ -0,0 +1,30 @@
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+
+def factorize(column: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the codes and the unique values (as object array) of a column, like pd.factorize but with missing values as their own unique value.
+    """
+    values = column.to_numpy(dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=False) == "string" and "\x00" in "".join(values):
+        # pandas hashes columns with only strings as C strings, which are cut off at null characters
+        unique_value_codes = {}
+        codes = np.fromiter((unique_value_codes.setdefault(value, len(unique_value_codes)) for value in values), dtype=np.intp, count=len(values))
+        unique_values = np.empty(len(unique_value_codes), dtype=object)
+        unique_values[:] = list(unique_value_codes)
+        return codes, unique_values
+
+    codes, unique_values = pd.factorize(values, use_na_sentinel=False)
+    return codes, np.asarray(unique_values, dtype=object)
+
+
+def trim_cache(cache: dict, max_size: int):
+    """
+    Removes the oldest entries of a dict used as a cache (dicts keep the insertion order), so it holds at most max_size entries.
+    """
+    if len(cache) > max_size:
+        for key in list(islice(cache, len(cache) - max_size)):
+            del cache[key]
@@ -0,0 +1,383 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from lexicon import get_spell_vocabulary
+from tokenizer import TokenizedColumn, Tokenizer
+from utils.column_utils import factorize, trim_cache
+from utils.generic_label_utils import SPELLING_CACHE_SIZE, check_with_spelling_library, is_known_word, is_not_a_number, is_not_a_number_in_range
+
+MAX_VECTORIZED_LENGTH = 64 # longer strings are labeled with the scalar check, so that one long value doesn't blow up the character matrix
+
+tokenizer = Tokenizer()
+
+# character classes and transition tables of the automatons, which match a whole column of strings at once
+OTHER, DIGIT, DOT, SIGN, EXPONENT, DASH = range(6)
+CHARACTER_CLASSES = np.full(128, OTHER, dtype=np.int8)
+CHARACTER_CLASSES[ord("0"):ord("9") + 1] = DIGIT
+CHARACTER_CLASSES[ord(".")] = DOT
+CHARACTER_CLASSES[[ord("+"), ord("-")]] = SIGN
+CHARACTER_CLASSES[[ord("e"), ord("E")]] = EXPONENT
+
+# [+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)? - the decimal literals without underscores, which float() accepts
+NUMBER_TRANSITIONS = np.array([
+    # OTHER, DIGIT, DOT, SIGN, EXPONENT, DASH
+    [9, 2, 4, 1, 9, 9], # 0: start
+    [9, 2, 4, 9, 9, 9], # 1: sign
+    [9, 2, 3, 9, 6, 9], # 2: integer part
+    [9, 3, 9, 9, 6, 9], # 3: fraction after integer part
+    [9, 5, 9, 9, 9, 9], # 4: leading dot
+    [9, 5, 9, 9, 6, 9], # 5: fraction after leading dot
+    [9, 8, 9, 7, 9, 9], # 6: exponent
+    [9, 8, 9, 9, 9, 9], # 7: exponent sign
+    [9, 8, 9, 9, 9, 9], # 8: exponent digits
+    [9, 9, 9, 9, 9, 9], # 9: no match
+], dtype=np.int8)
+NUMBER_ACCEPTING_STATES = [2, 3, 5, 8]
+
+# \d+-\d+-\d+
+DATE_TRANSITIONS = np.array([
+    # OTHER, DIGIT, DOT, SIGN, EXPONENT, DASH
+    [6, 1, 6, 6, 6, 6], # 0: start
+    [6, 1, 6, 6, 6, 2], # 1: year
+    [6, 3, 6, 6, 6, 6], # 2: first dash
+    [6, 3, 6, 6, 6, 4], # 3: month
+    [6, 5, 6, 6, 6, 6], # 4: second dash
+    [6, 5, 6, 6, 6, 6], # 5: day
+    [6, 6, 6, 6, 6, 6], # 6: no match
+], dtype=np.int8)
+DATE_ACCEPTING_STATES = [5]
+DATE_CHARACTER_CLASSES = CHARACTER_CLASSES.copy()
+DATE_CHARACTER_CLASSES[ord("-")] = DASH
+
+# float() also accepts whitespace, underscores, "inf" and "nan", which the number automaton doesn't match
+FLOAT_SPECIAL_CHARACTERS = np.zeros(128, dtype=bool)
+FLOAT_SPECIAL_CHARACTERS[[ord(char) for char in " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f_nN"]] = True
+
+
+class GenericLabelRule(ABC):
+    """
+    A declarative generic labeling rule. Like the generic label functions it labels each cell with the offending value or 0,
+    but it evaluates the unique values of a column at once with vectorized NumPy operations instead of calling a Python
+    function per cell.
+    """
+    def label_column(self, column: pd.Series) -> pd.Series:
+        codes, unique_values = factorize(column) # columns repeat the same values, so each value is only checked once
+        labels = self.label_values(unique_values)
+        return pd.Series(labels[codes], index=column.index, dtype=object)
+
+    @abstractmethod
+    def label_values(self, values: np.ndarray) -> np.ndarray:
+        """
+        Labels an object array of values. Returns an object array with the offending value or 0 for each value.
+        """
+        pass
+
+    @abstractmethod
+    def label_value(self, value):
+        """
+        Labels a single value. Returns the offending value or 0.
+        """
+        pass
+
+
+class StringRule(GenericLabelRule):
+    """
+    A rule which checks the string values of a column as a StringArray. Values which the vectorized check can't decide exactly
+    (non-strings, non-ASCII or very long strings) are labeled with label_value.
+    """
+    def label_values(self, values: np.ndarray) -> np.ndarray:
+        is_string = _is_string(values)
+
+        offending = np.zeros(len(values), dtype=bool)
+        undecided = ~is_string
+        if is_string.any():
+            offending[is_string], undecided[is_string] = self._label_strings(StringArray(values[is_string]))
+
+        labels = np.where(offending, values, 0)
+        labels[undecided] = [self.label_value(value) for value in values[undecided]]
+        return labels
+
+    @abstractmethod
+    def _label_strings(self, strings: "StringArray") -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns two boolean arrays: which strings are offending, and which strings have to be labeled with label_value.
+        """
+        pass
+
+
+class NumericRule(StringRule):
+    """
+    Vectorized version of is_not_a_number.
+    With strict=False only the float conversion is checked, without the checks for numbers like 08.1 or 8743. in is_a_number.
+    """
+    def __init__(self, strict: bool = True):
+        self.strict = strict
+
+    def label_value(self, value):
+        if self.strict:
+            return is_not_a_number(value)
+        try:
+            float(value)
+            return 0
+        except ValueError:
+            return value
+
+    def _label_strings(self, strings: "StringArray") -> tuple[np.ndarray, np.ndarray]:
+        is_number, undecided = self._parse_numbers(strings)
+        return ~is_number & ~undecided, undecided
+
+    def _parse_numbers(self, strings: "StringArray") -> tuple[np.ndarray, np.ndarray]:
+        matches_number = strings.match(NUMBER_TRANSITIONS, NUMBER_ACCEPTING_STATES)
+        maybe_float = ~matches_number & (~strings.is_ascii | strings.contains_any(FLOAT_SPECIAL_CHARACTERS))
+
+        if self.strict:
+            ends_with_dot = strings.char_at(-1) == ord(".")
+            has_leading_zero = (strings.lengths > 1) & (strings.char_at(0) == ord("0")) & (strings.char_at(1) != ord("."))
+            is_wrongly_formatted = ends_with_dot | has_leading_zero
+            matches_number &= ~is_wrongly_formatted
+            maybe_float = (maybe_float & ~is_wrongly_formatted) | (strings.lengths == 0) # is_a_number fails for empty strings
+
+        undecided = ~strings.is_vectorized | maybe_float
+        return matches_number & ~undecided, undecided
+
+
+class NumericRangeRule(NumericRule):
+    """
+    Vectorized version of is_not_a_number_in_range. Labels all values which are no number or not within [min_value, max_value].
+    """
+    def __init__(self, min_value: float, max_value: float, strict: bool = True):
+        super().__init__(strict)
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def label_value(self, value):
+        if self.strict:
+            return is_not_a_number_in_range(value, self.min_value, self.max_value)
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        return value if number < self.min_value or number > self.max_value else 0
+
+    def _label_strings(self, strings: "StringArray") -> tuple[np.ndarray, np.ndarray]:
+        is_number, undecided = self._parse_numbers(strings)
+        offending = ~is_number & ~undecided
+
+        numbers = strings.to_float(is_number)
+        offending[is_number] = (numbers < self.min_value) | (numbers > self.max_value)
+        return offending, undecided
+
+
+class MemberOfSetRule(StringRule):
+    """
+    Labels all values which are not in the given set of valid values. With strip=True surrounding whitespace is ignored,
+    like in str(value).strip() in valid_values.
+    """
+    def __init__(self, valid_values: Iterable[str], strip: bool = False):
+        self.valid_values = frozenset(valid_values)
+        self.strip = strip
+
+    def label_value(self, value):
+        candidate = str(value).strip() if self.strip else value
+        return value if candidate not in self.valid_values else 0
+
+    def _label_strings(self, strings: "StringArray") -> tuple[np.ndarray, np.ndarray]:
+        if not self.strip:
+            return ~pd.Series(strings.values).isin(self.valid_values).to_numpy(), np.zeros(len(strings), dtype=bool)
+
+        undecided = ~strings.is_vectorized | ~strings.is_ascii
+        stripped = np.strings.strip(strings.unicode)
+        return ~np.isin(stripped, list(self.valid_values)) & ~undecided, undecided
+
+
+class RegexRule(StringRule):
+    """
+    Labels all values which don't fully match the regular expression.
+    """
+    def __init__(self, pattern: str):
+        self.pattern = re.compile(pattern)
+
+    def label_value(self, value):
+        return value if not self.pattern.fullmatch(value) else 0
+
+    def _label_strings(self, strings: "StringArray") -> tuple[np.ndarray, np.ndarray]:
+        matches = pd.Series(strings.values).str.fullmatch(self.pattern).to_numpy(dtype=bool)
+        return ~matches, np.zeros(len(strings), dtype=bool)
+
+
+class DateRule(StringRule):
+    """
+    Labels all values which are not a date in format "YYYY-MM-DD" with a month between 1 and 12 and a day between 1 and 31.
+    """
+    def label_value(self, value):
+        if not isinstance(value, str):
+            return value
+        parts = value.split("-")
+        if len(parts) != 3:
+            return value
+        year, month, day = parts
+        if not (year.isdigit() and month.isdigit() and day.isdigit()):
+            return value
+        if not (1 <= int(month) <= 12 and 1 <= int(day) <= 31):
+            return value
+        return 0
+
+    def _label_strings(self, strings: "StringArray") -> tuple[np.ndarray, np.ndarray]:
+        undecided = ~strings.is_vectorized | ~strings.is_ascii
+        is_valid_date = strings.match(DATE_TRANSITIONS, DATE_ACCEPTING_STATES, DATE_CHARACTER_CLASSES) & ~undecided
+
+        dates = strings.split_numbers(ord("-"), 3)
+        month, day = dates[:, 1], dates[:, 2]
+        is_valid_date &= (1 <= month) & (month <= 12) & (1 <= day) & (day <= 31)
+        return ~is_valid_date & ~undecided, undecided
+
+
+class TokenRule(GenericLabelRule):
+    """
+    Labels each value with its first offending token or 0, like the token loops of check_with_spelling_library or
+    IMDBDetector.is_not_a_series_years. The unique values are tokenized into one flat array and each distinct token is only
+    checked once, also across calls, so the same tokens in other columns or chunks are not checked again.
+    Parameters:
+    - label_function: callable - The scalar label function with the same result. It labels the values the token checks can't decide.
+    - is_valid_token: callable - Checks a single token. All tokens of a value are checked.
+    - is_valid_token_at: list[callable] - Alternatively one check per token position. Only the first len(is_valid_token_at) tokens
+      are checked, values with fewer tokens are labeled with label_function.
+    """
+    def __init__(self, label_function: callable, is_valid_token: callable = None, is_valid_token_at: list[callable] = None):
+        if (is_valid_token is None) == (is_valid_token_at is None):
+            raise ValueError("Either is_valid_token or is_valid_token_at has to be given.")
+        self.label_function = label_function
+        self.token_checks = [is_valid_token] if is_valid_token is not None else list(is_valid_token_at)
+        self.checks_all_tokens = is_valid_token is not None
+        self._token_validity = [{} for _ in self.token_checks] # token -> result of the check, per check
+
+    def label_value(self, value):
+        return self.label_function(value)
+
+    def label_values(self, values: np.ndarray) -> np.ndarray:
+        tokenized = tokenizer.tokenize_values(values)
+        is_offending_token = np.zeros(len(tokenized.tokens), dtype=bool)
+        undecided = np.zeros(len(values), dtype=bool)
+
+        if self.checks_all_tokens:
+            is_offending_token[:] = ~self._check_tokens(0, tokenized.tokens)
+        else:
+            token_positions = tokenized.token_positions
+            for position in range(len(self.token_checks)):
+                at_position = token_positions == position
+                is_offending_token[at_position] = ~self._check_tokens(position, tokenized.tokens[at_position])
+            undecided = tokenized.lengths < len(self.token_checks)
+
+        first_offending_tokens = tokenized.get_first_tokens(is_offending_token)
+        is_offending = (first_offending_tokens >= 0) & ~undecided
+        labels = np.zeros(len(values), dtype=object)
+        labels[is_offending] = tokenized.tokens[first_offending_tokens[is_offending]]
+        labels[undecided] = [self.label_value(value) for value in values[undecided]]
+        return labels
+
+    def _check_tokens(self, check_position: int, tokens: np.ndarray) -> np.ndarray:
+        """
+        Returns whether each token passes the check. Each distinct token is only checked once, the results of the last
+        SPELLING_CACHE_SIZE tokens are kept.
+        """
+        validity = self._token_validity[check_position]
+        token_codes, unique_tokens = pd.factorize(tokens) # tokens are \w+ matches, so they never contain the null characters pandas cuts off
+        for token in unique_tokens:
+            if token not in validity:
+                validity[token] = bool(self.token_checks[check_position](token))
+        is_valid = np.fromiter((validity[token] for token in unique_tokens), dtype=bool, count=len(unique_tokens))
+        trim_cache(validity, SPELLING_CACHE_SIZE)
+        return is_valid[token_codes]
+
+
+class SpellingRule(TokenRule):
+    """
+    Vectorized version of check_with_spelling_library. The distinct tokens are checked with one batched vocabulary lookup.
+    """
+    def __init__(self):
+        super().__init__(check_with_spelling_library, is_valid_token=is_known_word)
+
+    def _check_tokens(self, check_position: int, tokens: np.ndarray) -> np.ndarray:
+        token_codes, unique_tokens = pd.factorize(tokens)
+        return ~get_spell_vocabulary().unknown_many(unique_tokens)[token_codes]
+
+
+def _is_string(values: np.ndarray) -> np.ndarray:
+    inferred_type = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred_type == "string": # only strings and missing values
+        return ~pd.isna(values)
+    if inferred_type != "mixed":
+        return np.zeros(len(values), dtype=bool)
+    return np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=len(values))
+
+
+class StringArray():
+    """
+    A column of strings as a matrix of unicode code points, so that character checks run over all strings at once.
+    Strings longer than MAX_VECTORIZED_LENGTH or with trailing null characters (which NumPy strips) are not vectorized.
+    """
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+        short_values = np.where(lengths <= MAX_VECTORIZED_LENGTH, values, "")
+        self.unicode = short_values.astype(str) if len(values) else np.array([], dtype="U1")
+
+        width = max(self.unicode.itemsize // 4, 1)
+        self.codes = self.unicode.view(np.uint32).reshape(len(values), width)
+        self.lengths = np.strings.str_len(self.unicode).astype(np.int64)
+        self.is_vectorized = self.lengths == lengths
+        self.is_ascii = self.codes.max(axis=1, initial=0) < 128
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def char_at(self, position: int) -> np.ndarray:
+        """
+        Returns the code point at the position of each string (negative positions count from the end), or 0 if the string is too short.
+        """
+        positions = self.lengths + position if position < 0 else np.full(len(self), position)
+        in_range = (positions >= 0) & (positions < self.lengths)
+        chars = np.zeros(len(self), dtype=np.uint32)
+        chars[in_range] = self.codes[np.flatnonzero(in_range), positions[in_range]]
+        return chars
+
+    def contains_any(self, characters: np.ndarray) -> np.ndarray:
+        """
+        Checks whether the strings contain any of the ASCII characters marked in the lookup table.
+        """
+        return characters[np.minimum(self.codes, 127)].any(axis=1)
+
+    def match(self, transitions: np.ndarray, accepting_states: list[int], character_classes: np.ndarray = CHARACTER_CLASSES) -> np.ndarray:
+        """
+        Runs the automaton over all strings at once, one character position at a time. Non-ASCII characters never match.
+        """
+        classes = np.where(self.codes < 128, character_classes[np.minimum(self.codes, 127)], OTHER)
+        states = np.zeros(len(self), dtype=np.int8)
+        for position in range(self.codes.shape[1]):
+            is_active = position < self.lengths
+            states = np.where(is_active, transitions[states, classes[:, position]], states)
+        return np.isin(states, accepting_states) & self.is_vectorized
+
+    def split_numbers(self, separator: int, number_of_parts: int) -> np.ndarray:
+        """
+        Returns the values of the first digit sequences between the separators as floats, one column per part.
+        Only meaningful for strings matching a pattern of digits and separators.
+        """
+        part_ids = np.cumsum(self.codes == separator, axis=1)
+        digits = self.codes.astype(np.int64) - ord("0")
+        is_digit = (digits >= 0) & (digits <= 9) & (np.arange(self.codes.shape[1]) < self.lengths[:, None]) & (part_ids < number_of_parts)
+
+        numbers = np.zeros((len(self), number_of_parts), dtype=np.float64)
+        for position in range(self.codes.shape[1]):
+            rows = np.flatnonzero(is_digit[:, position])
+            parts = part_ids[rows, position]
+            numbers[rows, parts] = numbers[rows, parts] * 10 + digits[rows, position]
+        return numbers
+
+    def to_float(self, mask: np.ndarray) -> np.ndarray:
+        with np.errstate(over="ignore"): # like float(), values like 1e400 are converted to inf
+            return self.unicode[mask].astype(np.float64)
@@ -1,10 +1,13 @@
+from functools import lru_cache
+
 import pandas as pd
-from spellchecker import SpellChecker
 
+from lexicon import get_spell_vocabulary
 from tokenizer import Tokenizer
 
+SPELLING_CACHE_SIZE = 2**20
+
 tokenizer = Tokenizer()
-spell = SpellChecker()
 
 def empty_method(value: str):
     pass
@@ -40,10 +43,14 @@ def is_a_number(value: str) -> bool:
     except ValueError:
         return False
     
+@lru_cache(maxsize=SPELLING_CACHE_SIZE) # the same cell values come back in every chunk of a streamed dataset
 def check_with_spelling_library(value: str) -> bool:
     tokenized_values = tokenizer.tokenize_cell(value)
     for token in tokenized_values:
-        if spell.unknown([token]):
+        if not is_known_word(token):
             return token # return the first misspelled token (early return)
     return 0
 
+def is_known_word(token: str) -> bool:
+    return not get_spell_vocabulary().is_unknown(token)
+
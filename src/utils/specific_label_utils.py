@@ -1,16 +1,32 @@
+import hashlib
 from functools import lru_cache
 
+import numpy as np
 import pandas as pd
 import string
-from spellchecker import SpellChecker
 
-from constants import KEYBOARD_NEIGHBORS, MISSPELLING_PATTERNS, OCR_DICT, OCR_LETTER_TO_NUMBER_MAPPING, OCR_NUMBER_TO_NUMBER_MAPPING, get_misspellings_list
+from constants import KEYBOARD_NEIGHBORS, MISSPELLING_PATTERNS, OCR_DICT, OCR_LETTER_TO_NUMBER_MAPPING, OCR_NUMBER_TO_NUMBER_MAPPING
+from domains import CategoricalDomain, get_bounded_integer_domain
+from edit_index import EditIndex
 from error_types import ErrorType
+from lexicon import Lexicon, SpellVocabulary, get_categorical_lexicon, get_misspellings, get_spell_vocabulary
+from ocr_range_search import find_ocr_correction_in_range, is_searchable
 from tokenizer import Tokenizer
+from utils.column_utils import factorize, trim_cache
+from word_cache import WordClassificationCache
 
-MISSPELLINGS_LIST = get_misspellings_list()
 tokenizer = Tokenizer()
-spell = SpellChecker()
+
+EDIT_INDEX_MIN_WORDS = 1000
+VECTORIZED_NUMBERS_MIN_WORDS = 300
+MAX_PACKED_NUMBER_LENGTH = 64 # longer flawed numbers are labeled one by one, so one long value doesn't widen the byte matrix of all
+RULE_VERSION = 2 # increase when the classification of flawed words changes, so that the persistent word cache isn't used anymore
+
+word_classification_cache = WordClassificationCache() # set to None to disable the persistent cache
+
+FLAWED_WORD_CACHE_SIZE = 2**20 # classified words kept per vocabulary, the oldest are dropped so streamed datasets don't grow the memory
+
+_flawed_word_labels = {} # vocabulary -> {word: label}, shared by all columns and kept across the chunks of a streamed dataset
 
 def no_labels(data_column: pd.Series, generic_labeled_cell_indices: pd.Index, generic_labeled_dataset: pd.DataFrame) -> pd.Series:
     return pd.Series(0, index=data_column.index, dtype=int)
@@ -21,36 +37,194 @@ def set_all_labels_to_ocr(data_column: pd.Series, generic_labeled_cell_indices:
     return label_column
 
 def differentiate_errors_in_string_column(data_column: pd.Series, generic_labeled_cell_indices: pd.Index, generic_labeled_dataset: pd.DataFrame, categorical_values: list[str] = None) -> pd.Series:
+    if categorical_values is not None:
+        return label_flawed_words(
+            data_column, generic_labeled_cell_indices, generic_labeled_dataset,
+            lambda unique_flawed_words: label_categorical_words(unique_flawed_words, tuple(categorical_values)),
+        )
+    return label_flawed_words(
+        data_column, generic_labeled_cell_indices, generic_labeled_dataset,
+        lambda unique_flawed_words: classify_flawed_words(unique_flawed_words, get_spell_vocabulary()),
+    )
+
+
+def label_categorical_words(words: np.ndarray, categorical_values: tuple[str, ...]) -> np.ndarray:
+    """
+    Labels the flawed words of a column with a closed set of values. The variants with one error of the values are looked up
+    in the table of the CategoricalDomain, only the other words are classified against the categorical lexicon.
+    The labels are the same as classify_flawed_words gives. Returns the ErrorType value of each word.
+    """
+    labels = get_categorical_domain(categorical_values).lookup(words)
+    unknown_positions = np.flatnonzero(labels == 0)
+    if len(unknown_positions):
+        unknown_words = words[unknown_positions]
+        word_labels = classify_flawed_words(unknown_words, get_categorical_lexicon(categorical_values))
+        labels[unknown_positions] = [int(word_labels.get(word, 0) or 0) for word in unknown_words]
+    return labels
+
+@lru_cache(maxsize=None)
+def get_categorical_domain(categorical_values: tuple[str, ...]) -> CategoricalDomain:
+    """
+    Returns the domain of a list of categorical values. The table of its variants is classified without the word caches, it
+    is built once per process and doesn't have to be stored.
+    """
+    lexicon = get_categorical_lexicon(categorical_values)
+    return CategoricalDomain(categorical_values, lambda words: _classify_new_flawed_words(words, lexicon))
+
+
+def label_flawed_words(data_column: pd.Series, generic_labeled_cell_indices: pd.Index, generic_labeled_dataset: pd.Series, classify_words: callable) -> pd.Series:
+    """
+    Shared remapping step of the specific label functions. The unique flawed words of the column are classified at once and
+    the labels are written back to all flawed cells with a single vectorized assignment.
+    Parameters:
+    - data_column: pd.Series - The column of data to be labeled.
+    - generic_labeled_cell_indices: pd.Index - The indices of the cells that have been labeled in the generic dataset.
+    - generic_labeled_dataset: pd.Series - The generic labels (flawed words) of the column.
+    - classify_words: callable - Takes the array of unique flawed words and returns a dict with the ErrorType value of each word,
+      or an array with the ErrorType value of each word in the same order.
+    """
     label_column = pd.Series(0, index=data_column.index, dtype=int)
     flawed_words_series = generic_labeled_dataset.loc[generic_labeled_cell_indices]
-    unique_flawed_words = flawed_words_series.unique()
+    if flawed_words_series.empty:
+        return label_column
+
+    codes, unique_flawed_words = factorize(flawed_words_series)
+    word_labels = classify_words(unique_flawed_words)
+    if isinstance(word_labels, np.ndarray): # one label per unique word, e.g. from label_numbers_with_ocr_or_typo
+        unique_labels = word_labels.astype(np.int64)
+    else:
+        unique_labels = np.fromiter((int(word_labels.get(word, 0) or 0) for word in unique_flawed_words), dtype=np.int64, count=len(unique_flawed_words))
+
+    label_values = label_column.to_numpy(copy=True)
+    label_values[label_column.index.get_indexer(flawed_words_series.index)] = unique_labels[codes]
+    return pd.Series(label_values, index=data_column.index)
 
-    correct_words_list = categorical_values if categorical_values is not None else spell
-    
-    typo_word_map = {}
 
-    for word in unique_flawed_words:
-        if is_misspelling(word, correct_words_list):
-            typo_word_map[word] = ErrorType.MISSPELLING.value
-        elif is_transposition(word, correct_words_list):
-            typo_word_map[word] = ErrorType.TYPO.value
-        elif is_key_error(word, correct_words_list):
-            typo_word_map[word] = ErrorType.TYPO.value
-        elif is_insertion_or_replication(word, correct_words_list):
-            typo_word_map[word] = ErrorType.TYPO.value
-        elif has_linguistic_misspelling_pattern(word, correct_words_list):
-            typo_word_map[word] = ErrorType.MISSPELLING.value
-        elif is_deletion(word, correct_words_list):
-            typo_word_map[word] = ErrorType.TYPO.value
+def classify_flawed_words(words, correct_words_list) -> dict:
+    """
+    Assigns an error type to each flawed word. Columns with many flawed words are first looked up in the edit index of the
+    vocabulary, so the candidate generation of the single checks only runs for words with a vocabulary word one edit away.
+    The result is the same as calling classify_flawed_word for every word. The last FLAWED_WORD_CACHE_SIZE classified words of
+    each vocabulary are kept, so words coming back are only classified once.
+    """
+    cached_labels = _flawed_word_labels.setdefault(correct_words_list, {})
+    new_words = list(dict.fromkeys(word for word in words if word not in cached_labels))
+    if new_words:
+        cached_labels.update(_classify_uncached_flawed_words(new_words, correct_words_list))
+    word_labels = {word: cached_labels[word] for word in words}
+    trim_cache(cached_labels, FLAWED_WORD_CACHE_SIZE)
+    return word_labels
+
+def _classify_uncached_flawed_words(words: list, correct_words_list) -> dict:
+    """
+    Takes the labels of words classified in earlier runs from the persistent word cache and only classifies the other words.
+    """
+    if word_classification_cache is None:
+        return _classify_new_flawed_words(words, correct_words_list)
+
+    vocabulary_id = get_vocabulary_id(correct_words_list)
+    storable_words = [word for word in words if _is_storable_word(word)]
+    typo_word_map = word_classification_cache.get_labels(storable_words, vocabulary_id, RULE_VERSION)
+
+    missing_words = [word for word in words if word not in typo_word_map]
+    if missing_words:
+        new_labels = _classify_new_flawed_words(missing_words, correct_words_list)
+        word_classification_cache.put_labels(
+            {word: label for word, label in new_labels.items() if _is_storable_word(word)}, vocabulary_id, RULE_VERSION,
+        )
+        typo_word_map.update(new_labels)
+    return typo_word_map
+
+def _is_storable_word(word) -> bool:
+    if not isinstance(word, str) or "\x00" in word:
+        return False
+    try:
+        word.encode("utf-8")
+        return True
+    except UnicodeEncodeError: # lone surrogates
+        return False
+
+def _classify_new_flawed_words(words: list, correct_words_list) -> dict:
+    edit_index = get_edit_index(correct_words_list)
+    indexed_words = [word for word in words if edit_index.supports(word)]
+    if len(indexed_words) >= EDIT_INDEX_MIN_WORDS:
+        candidates = edit_index.find_candidates(indexed_words)
+    else: # building the index of a large vocabulary is not worth it for a few words, so all candidates are checked directly
+        candidates = np.ones((len(indexed_words), 3), dtype=bool)
+    indexed_word_candidates = dict(zip(indexed_words, candidates))
+
+    typo_word_map = {}
+    for word in words:
+        if word in indexed_word_candidates:
+            typo_word_map[word] = _classify_indexed_word(word, edit_index, *indexed_word_candidates[word])
         else:
-            typo_word_map[word] = ErrorType.OCR.value
+            typo_word_map[word] = classify_flawed_word(word, correct_words_list)
+    return typo_word_map
 
-    # Remap results back to the original indices
-    for index, word in flawed_words_series.items():
-        if typo_word_map.get(word, False):
-            label_column.loc[index] = typo_word_map[word]
+def classify_flawed_word(word, correct_words_list) -> int:
+    if is_misspelling(word, correct_words_list):
+        return ErrorType.MISSPELLING.value
+    elif is_transposition(word, correct_words_list):
+        return ErrorType.TYPO.value
+    elif is_key_error(word, correct_words_list):
+        return ErrorType.TYPO.value
+    elif is_insertion_or_replication(word, correct_words_list):
+        return ErrorType.TYPO.value
+    elif has_linguistic_misspelling_pattern(word, correct_words_list):
+        return ErrorType.MISSPELLING.value
+    elif is_deletion(word, correct_words_list):
+        return ErrorType.TYPO.value
+    return ErrorType.OCR.value
 
-    return label_column
+def _classify_indexed_word(word: str, edit_index: EditIndex, transposition_candidate: bool, key_error_candidate: bool, deletion_candidate: bool) -> int:
+    """
+    Same checks in the same order as classify_flawed_word, but against the frozen vocabulary of the edit index. Checks without a
+    candidate in the index are skipped.
+    """
+    vocabulary = edit_index.words
+    query = edit_index.normalize(word)
+
+    if word in get_misspellings() and not query in vocabulary:
+        return ErrorType.MISSPELLING.value
+    elif transposition_candidate and is_transposition(query, vocabulary):
+        return ErrorType.TYPO.value
+    elif key_error_candidate and is_key_error(word, vocabulary):
+        return ErrorType.TYPO.value
+    elif is_insertion_or_replication(query, vocabulary):
+        return ErrorType.TYPO.value
+    elif has_linguistic_misspelling_pattern(word, vocabulary):
+        return ErrorType.MISSPELLING.value
+    elif edit_index.is_deletion(word, deletion_candidate):
+        return ErrorType.TYPO.value
+    return ErrorType.OCR.value
+
+@lru_cache(maxsize=None)
+def get_edit_index(correct_words_list) -> EditIndex:
+    """
+    Returns the edit index of the SpellChecker dictionary or of a categorical lexicon. It is built once and shared by all columns.
+    """
+    if isinstance(correct_words_list, Lexicon):
+        return EditIndex(correct_words_list.words, correct_words_list.lowercase_words, lowercase_queries=False)
+
+    return EditIndex(correct_words_list.words, correct_words_list.lowercase_words, lowercase_queries=True)
+
+
+@lru_cache(maxsize=None)
+def get_vocabulary_id(correct_words_list) -> str:
+    """
+    Returns a content hash of a vocabulary (and of the misspellings, which the classification also depends on). It identifies
+    the vocabulary in the persistent word cache.
+    """
+    if isinstance(correct_words_list, Lexicon):
+        kind, words = "lexicon", correct_words_list.words
+    else:
+        kind, words = "spellchecker", correct_words_list.words
+
+    vocabulary_hash = hashlib.sha256(kind.encode())
+    for word_list in (words, get_misspellings().words):
+        vocabulary_hash.update("\n".join(sorted(word for word in word_list if isinstance(word, str))).encode("utf-8", "surrogatepass"))
+        vocabulary_hash.update(b"\x00")
+    return vocabulary_hash.hexdigest()[:32]
 
 
 #  --- Typo detection ---
@@ -78,7 +252,9 @@ def is_key_error(word, correct_words_list):
 
 def is_deletion(word, correct_words_list):
     word = word.lower()
-    if correct_words_list != spell:
+    if isinstance(correct_words_list, (Lexicon, SpellVocabulary)):
+        correct_words_list = correct_words_list.lowercase_words
+    else:
         correct_words_list = set(w.lower() for w in correct_words_list)
 
     for i in range(len(word) + 1):
@@ -114,24 +290,16 @@ def differentiate_errors_in_number_column(data_column: pd.Series, generic_labele
     - min_value: float - The minimum value of the number.
     - max_value: float - The maximum value of the number.
     """
-    label_column = pd.Series(0, index=data_column.index, dtype=int)
-    flawed_words_series = generic_labeled_dataset.loc[generic_labeled_cell_indices]
-    unique_flawed_words = flawed_words_series.unique()
-
-    typo_word_map = {}
-
-    for word in unique_flawed_words:
-        if label_func:
-            typo_word_map[word] = label_func(word, min_value, max_value) 
-        else:
-            typo_word_map[word] = label_number_with_ocr_or_typo(word, min_value, max_value)
-
-    # Remap results back to the original indices
-    for index, word in flawed_words_series.items():
-        if typo_word_map.get(word, False):
-            label_column.loc[index] = typo_word_map[word]
+    if label_func is None: # the vectorized label_number_with_ocr_or_typo
+        return label_flawed_words(
+            data_column, generic_labeled_cell_indices, generic_labeled_dataset,
+            lambda unique_flawed_words: label_numbers_with_ocr_or_typo(unique_flawed_words, min_value, max_value),
+        )
 
-    return label_column
+    return label_flawed_words(
+        data_column, generic_labeled_cell_indices, generic_labeled_dataset,
+        lambda unique_flawed_words: {word: label_func(word, min_value, max_value) for word in unique_flawed_words},
+    )
 
 def label_number_with_ocr_or_typo(word: str | int | float, min_value: float = None, max_value: float = None):
     """
@@ -166,6 +334,109 @@ def label_number_with_ocr_or_typo(word: str | int | float, min_value: float = No
     return ErrorType.TYPO.value
 
 
+def label_numbers_with_ocr_or_typo(words: np.ndarray, min_value: float = None, max_value: float = None) -> np.ndarray:
+    """
+    Labels an array of flawed numbers like label_number_with_ocr_or_typo, but with numpy instead of a Python loop per word.
+    The ASCII words are packed into a matrix of bytes, and one lookup in NUMBER_CHARACTER_CLASSES gives the character
+    classes of each word (space, OCR letter of OCR_LETTER_TO_NUMBER_MAPPING, letter). With a value range, the 0-prefix swaps are
+    parsed with float() at once and the OCR range search runs on the words with digits only. Words which aren't ASCII strings,
+    can't be indexed like in the single checks (e.g. "" or "0") or aren't plain decimal numbers in the range search are labeled
+    with label_number_with_ocr_or_typo, so the labels (and errors) are the same. Returns the uint8 ErrorType value of each word.
+    """
+    words = np.asarray(words, dtype=object)
+    if len(words) < VECTORIZED_NUMBERS_MIN_WORDS: # the setup of the arrays takes longer than the single checks of a few words
+        return np.fromiter((label_number_with_ocr_or_typo(word, min_value, max_value) for word in words), dtype=np.uint8, count=len(words))
+    labels = np.zeros(len(words), dtype=np.uint8)
+    packed_positions, characters, lengths = _pack_ascii(words)
+    is_vectorizable = np.zeros(len(words), dtype=bool)
+    is_vectorizable[packed_positions] = True
+    packed_words = words[packed_positions]
+
+    first, second = characters[:, 0], characters[:, 1]
+    has_0_prefix = (first == ord("0")) & (second != ord("."))
+    is_vectorizable[packed_positions[(lengths == 0) | (has_0_prefix & (lengths == 1))]] = False # word[-1] and word[1] fail
+    ends_with_ocr = NUMBER_OCR_SUFFIX_TABLE[characters[np.arange(len(characters)), np.maximum(lengths - 1, 0)]]
+    character_classes = np.bitwise_or.reduce(NUMBER_CHARACTER_CLASSES[characters], axis=1)
+    is_ocr = ends_with_ocr | has_0_prefix | (character_classes & (SPACE_CLASS | OCR_LETTER_CLASS) != 0)
+    packed_labels = np.where(is_ocr, ErrorType.OCR.value, ErrorType.TYPO.value).astype(np.uint8) # letters and the rest are typos
+
+    if min_value is not None and max_value is not None:
+        zero_prefixed = np.flatnonzero(~ends_with_ocr & has_0_prefix & (lengths > 1))
+        swapped = [word[1] + word[0] + word[2:] for word in packed_words[zero_prefixed]]
+        numbers, is_number = _parse_floats(swapped)
+        packed_labels[zero_prefixed[is_number & (min_value <= numbers) & (numbers <= max_value)]] = ErrorType.TYPO.value
+
+        digits_only = np.flatnonzero(~is_ocr & (character_classes & LETTER_CLASS == 0))
+        searchable = np.fromiter((is_searchable(word) for word in packed_words[digits_only]), dtype=bool, count=len(digits_only))
+        in_range = np.fromiter(
+            (find_ocr_correction_in_range(word, min_value, max_value) is not None for word in packed_words[digits_only[searchable]]),
+            dtype=bool, count=np.count_nonzero(searchable),
+        )
+        packed_labels[digits_only[searchable][in_range]] = ErrorType.OCR.value
+        is_vectorizable[packed_positions[digits_only[~searchable]]] = False
+
+    labels[packed_positions] = packed_labels
+    for position in np.flatnonzero(~is_vectorizable):
+        labels[position] = label_number_with_ocr_or_typo(words[position], min_value, max_value)
+    return labels
+
+def _pack_ascii(words: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Packs the ASCII strings of words into a uint8 matrix with one row per word, padded with 0 and with at least two columns.
+    The strings are joined and encoded at once and cut into the rows by their offsets. Strings with other characters and
+    strings longer than MAX_PACKED_NUMBER_LENGTH aren't packed. Returns the positions of the packed words, the matrix and the
+    lengths of the packed words.
+    """
+    if pd.api.types.infer_dtype(words, skipna=False) == "string":
+        positions = np.arange(len(words))
+    else:
+        positions = np.flatnonzero(np.fromiter((isinstance(word, str) for word in words), dtype=bool, count=len(words)))
+    strings = words[positions].tolist()
+    lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    is_packable = lengths <= MAX_PACKED_NUMBER_LENGTH
+    joined = "".join(strings)
+    if not joined.isascii():
+        is_packable &= np.fromiter(map(str.isascii, strings), dtype=bool, count=len(strings))
+    if not is_packable.all():
+        positions, lengths = positions[is_packable], lengths[is_packable]
+        joined = "".join(np.asarray(strings, dtype=object)[is_packable].tolist())
+
+    buffer = np.frombuffer(joined.encode("ascii") + b"\x00", dtype=np.uint8)
+    columns = np.arange(max(int(lengths.max(initial=0)), 2))
+    offsets = np.cumsum(lengths) - lengths
+    in_word = columns < lengths[:, None]
+    characters = np.where(in_word, buffer[np.where(in_word, offsets[:, None] + columns, len(buffer) - 1)], 0).astype(np.uint8)
+    return positions, characters, lengths
+
+def _parse_floats(words: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parses the words with float() and returns the numbers and whether each word is one (NaN and False otherwise).
+    """
+    try:
+        return np.array(words, dtype=object).astype(float), np.ones(len(words), dtype=bool)
+    except ValueError: # only the words which are no numbers are parsed again one by one
+        numbers, is_number = np.full(len(words), np.nan), np.zeros(len(words), dtype=bool)
+        for position, word in enumerate(words):
+            try:
+                numbers[position], is_number[position] = float(word), True
+            except ValueError:
+                pass
+        return numbers, is_number
+
+def _get_character_table(characters, value=True, dtype=bool) -> np.ndarray:
+    table = np.zeros(128, dtype=dtype)
+    table[[ord(char) for char in characters]] = value
+    return table
+
+SPACE_CLASS, OCR_LETTER_CLASS, LETTER_CLASS = 1, 2, 4
+NUMBER_OCR_SUFFIX_TABLE = _get_character_table(".,-")
+NUMBER_CHARACTER_CLASSES = (
+    _get_character_table(" ", SPACE_CLASS, np.uint8)
+    | _get_character_table((char for char in OCR_LETTER_TO_NUMBER_MAPPING if len(char) == 1 and char.isascii()), OCR_LETTER_CLASS, np.uint8)
+    | _get_character_table(string.ascii_letters, LETTER_CLASS, np.uint8)
+)
+
+
 def contains_letter(word: str) -> bool:
     """
     Check if the given word contains any letter (a-z or A-Z).
@@ -191,9 +462,15 @@ def has_letter_mapping_to_ocr_number(word: str | int | float):
 def is_replaced_ocr_in_range(word: str | int | float, min_value: float, max_value: float):
     """
     This function checks if a word is an OCR and whether the corrected number is within the given range.
-    It replaces all occurences of the OCR with the replacement and checks if the resulting number is within the given range.
+    Any number of digits can be replaced with their OCR confusions at once, so cases like 78 in range (0, 10) are found as well
+    (see find_ocr_correction_in_range). At least one digit has to be replaced, a word in range as it is isn't an OCR.
+    Words which are no plain decimal numbers are checked the simple way: all occurrences of one digit are replaced with one
+    alternative at a time.
     This function assumes that there are no letters in the word.
     """
+    if is_searchable(str(word)):
+        return find_ocr_correction_in_range(str(word), min_value, max_value) is not None
+
     for char in str(word):
         alternative_numbers = OCR_NUMBER_TO_NUMBER_MAPPING.get(char)
         if not alternative_numbers: # standard / forward lookup in OCR_NUMBER_TO_NUMBER_MAPPING
@@ -202,15 +479,13 @@ def is_replaced_ocr_in_range(word: str | int | float, min_value: float, max_valu
         for replacement_num in alternative_numbers:
             if min_value <= float(word.replace(char, replacement_num)) <= max_value: # this replaces all occurences of the char in the word
                 return True
-
-    # TODO: We only check for one OCR replacement at a time. This is usually sufficient for cases like 77 in range (0, 30), but there could be cases like 78 in range (0, 10) where we would have to replace both 7 and 8 simultaneously.
     return False
 
 
 #  --- Misspelling detection ---
 
 def is_misspelling(word, correct_words_list):
-    if word in MISSPELLINGS_LIST and not word in correct_words_list:
+    if word in get_misspellings() and not word in correct_words_list:
         return True
     return False
 
@@ -240,9 +515,9 @@ def label_year(token: str, min_value: float = None, max_value: float = None) ->
     token = token.lower()
     if len(token) != 4: # cases like 20213 or 203
         return ErrorType.TYPO.value
-    
-    string_years = [str(i) for i in range(min_value, max_value)]
-    if is_key_error(token, string_years): # case of exactly 4 numbers
+
+    years = get_bounded_integer_domain(min_value, max_value - 1) # the years from min_value to max_value (excluded)
+    if years.is_key_error(token): # case of exactly 4 numbers
         return ErrorType.TYPO.value
 
     return ErrorType.OCR.value # otherwise assume it's OCR
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "datasets", ".cache", "word_classifications.sqlite")
+DEFAULT_MAX_ENTRIES = 2_000_000
+EVICTION_SHARE = 0.1 # share of the entries removed at once when the cache is full, so eviction doesn't run on every write
+SQLITE_MAX_VARIABLES = 900
+
+
+class WordClassificationCache():
+    """
+    Persistent cache of flawed word classifications, shared by all columns, datasets and runs.
+    Entries are keyed by (word, vocabulary id, rule version), so a changed vocabulary or changed rules never return old labels.
+    When the cache holds more than max_entries words, the least recently used ones are evicted. The entries are counted once
+    per connection and then by the rows each put writes, the table is only counted again when that estimate exceeds
+    max_entries. Puts of other processes aren't in the estimate, so the cache can grow beyond max_entries until the next count.
+    The hits and misses of this process are counted in hits and misses, lookups of worker processes are not included.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._connection_pid = None
+        self._number_of_entries = 0 # estimate of this process, rows replaced by a put are counted again
+
+    def get_labels(self, words: list[str], vocabulary_id: str, rule_version: int) -> dict:
+        """
+        Returns the cached labels of the given words. Words without an entry are missing in the result.
+        """
+        labels = {}
+        for start in range(0, len(words), SQLITE_MAX_VARIABLES):
+            batch = words[start:start + SQLITE_MAX_VARIABLES]
+            rows = self._get_connection().execute(
+                f"SELECT word, label FROM words WHERE vocabulary = ? AND rule_version = ? AND word IN ({','.join('?' * len(batch))})",
+                [vocabulary_id, rule_version, *batch],
+            ).fetchall()
+            labels.update(rows)
+
+        if labels:
+            with self._get_connection() as connection:
+                connection.executemany(
+                    "UPDATE words SET last_used = ? WHERE word = ? AND vocabulary = ? AND rule_version = ?",
+                    [(time.time_ns(), word, vocabulary_id, rule_version) for word in labels],
+                )
+        self.hits += len(labels)
+        self.misses += len(words) - len(labels)
+        return labels
+
+    def put_labels(self, labels: dict, vocabulary_id: str, rule_version: int):
+        last_used = time.time_ns()
+        with self._get_connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO words (word, vocabulary, rule_version, label, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(word, vocabulary_id, rule_version, int(label), last_used) for word, label in labels.items()],
+            )
+        self._number_of_entries += len(labels)
+        if self._number_of_entries > self.max_entries:
+            self._evict()
+
+    def get_statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def _evict(self):
+        """
+        Counts the entries and removes the least recently used ones if there are more than max_entries.
+        """
+        self._number_of_entries = self._count_entries()
+        if self._number_of_entries <= self.max_entries:
+            return
+
+        number_of_evicted_entries = self._number_of_entries - int(self.max_entries * (1 - EVICTION_SHARE))
+        with self._get_connection() as connection:
+            connection.execute(
+                "DELETE FROM words WHERE rowid IN (SELECT rowid FROM words ORDER BY last_used LIMIT ?)",
+                (number_of_evicted_entries,),
+            )
+        self._number_of_entries -= number_of_evicted_entries
+
+    def _count_entries(self) -> int:
+        return self._get_connection().execute("SELECT COUNT(*) FROM words").fetchone()[0]
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """
+        The connection is opened on the first use, and again in forked worker processes, so every process has its own connection.
+        """
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection_pid = os.getpid()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL") # allows parallel workers to read while one writes
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS words ("
+                "word TEXT NOT NULL, vocabulary TEXT NOT NULL, rule_version INTEGER NOT NULL, label INTEGER NOT NULL, last_used INTEGER NOT NULL, "
+                "PRIMARY KEY (word, vocabulary, rule_version))"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS words_last_used ON words (last_used)")
+            self._connection.commit()
+            self._number_of_entries = self._count_entries()
+        return self._connection
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state